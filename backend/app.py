@@ -8,6 +8,7 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 
 from models import db, Locale, LocaleLog
+from migrations import upgrade
 from crypto import CryptoManager
 from retry_utils import retry_request
 
@@ -44,9 +45,10 @@ db.init_app(app)
 # Inizializza crypto manager
 crypto = CryptoManager()
 
-# Crea le tabelle
+# Applica le migrazioni mancanti (dove prima c'era db.create_all): anche con il solo
+# "gunicorn app:app" un database PostgreSQL esistente riceve le colonne nuove
 with app.app_context():
-    db.create_all()
+    upgrade(db.engine)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -60,7 +62,9 @@ def get_locali():
     """Ottiene la lista di tutti i locali"""
     try:
         locali = Locale.query.order_by(Locale.nome).all()
-        return jsonify([locale.to_dict() for locale in locali]), 200
+        # Ultimo log di tutti i locali con una sola query (non una per locale)
+        ultimi_logs = LocaleLog.latest_by_locale()
+        return jsonify([locale.to_dict(ultimi_logs) for locale in locali]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -224,6 +228,17 @@ def get_locale_logs(locale_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/locali/<int:locale_id>/logs/<int:log_id>/steps', methods=['GET'])
+def get_locale_log_steps(locale_id, log_id):
+    """Ottiene i tempi delle fasi di un'esecuzione"""
+    try:
+        log = LocaleLog.query.filter_by(id=log_id, locale_id=locale_id).first_or_404()
+        return jsonify([step.to_dict() for step in log.steps]), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 def _trigger_github_workflow(api_url: str, payload: dict, headers: dict):
     """
     Helper function per chiamare GitHub Actions API con retry automatico
@@ -344,7 +359,8 @@ def create_locale_log(locale_id):
             successo=data.get('successo', False),
             messaggio=data.get('messaggio'),
             file_scaricato=data.get('file_scaricato'),
-            sheet_aggiornato=data.get('sheet_aggiornato', False)
+            sheet_aggiornato=data.get('sheet_aggiornato', False),
+            upload_saltato=data.get('upload_saltato', False)
         )
 
         db.session.add(log)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle query più frequenti su locale_logs, prima e dopo gli indici
+
+Crea una tabella sintetica di log (di default 2 milioni di righe su 50 locali,
+una o più esecuzioni all'ora negli ultimi anni), applica le migrazioni fino
+alla 3 (tabelle senza indici su locale_logs), misura le query, applica la
+migrazione 4 (indici) e le misura di nuovo. Le query sono quelle usate da
+backend e bot:
+
+- log di un locale (GET /api/locali/<id>/logs): ultimi 50 per data;
+- "già eseguito oggi" di should_run_locale: primo log riuscito da mezzanotte;
+- ultimi 10 log di tutti i locali (GET /api/stats);
+- ultimo log di ogni locale (LocaleLog.latest_by_locale, GET /api/locali).
+
+Di default usa un database SQLite temporaneo; con --database-url si può usare
+un database PostgreSQL, che deve essere vuoto (il benchmark scrive le tabelle
+dei modelli).
+
+    python backend/benchmark_logs.py [--logs 2000000] [--locali 50] [--repeat 5]
+"""
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from flask import Flask
+from sqlalchemy import insert
+
+from models import db, Locale, LocaleLog
+from migrations import upgrade
+
+
+# Righe per INSERT
+INSERT_BATCH = 50000
+# Locali su cui vengono ripetute le query per locale
+SAMPLE_LOCALI = 10
+
+
+def populate(locali: int, logs: int, end: datetime, seed: int = 0):
+    """
+    Inserisce locali e log sintetici, in ordine di esecuzione come in produzione
+
+    Args:
+        locali: Numero di locali
+        logs: Numero di log
+        end: Data dell'ultimo log
+        seed: Seme del generatore casuale
+    """
+    rng = random.Random(seed)
+    db.session.execute(insert(Locale.__table__), [
+        {
+            'nome': f'Locale {idx:04d}', 'username': f'user{idx}', 'password_encrypted': 'x',
+            'orario_esecuzione': '03:00', 'google_sheet_id': 'sheet', 'attivo': True, 'esegui_ora': False,
+        }
+        for idx in range(1, locali + 1)
+    ])
+    locale_ids = [row.id for row in db.session.query(Locale.id)]
+
+    # Un'esecuzione per locale ogni `step` secondi, a ritroso da `end`
+    rounds = -(-logs // locali)
+    step = 3600
+    start = end - timedelta(seconds=step * rounds)
+    batch = []
+    for idx in range(logs):
+        successo = rng.random() < 0.9
+        batch.append({
+            'locale_id': locale_ids[idx % locali],
+            'eseguito_at': start + timedelta(seconds=step * (idx // locali) + rng.randint(0, step - 1)),
+            'successo': successo,
+            'messaggio': 'Completato' if successo else 'Errore durante il download',
+            'sheet_aggiornato': successo,
+            'upload_saltato': False,
+        })
+        if len(batch) >= INSERT_BATCH:
+            db.session.execute(insert(LocaleLog.__table__), batch)
+            batch = []
+            print(f"\r   {idx + 1:,}/{logs:,} log", end='', flush=True)
+    if batch:
+        db.session.execute(insert(LocaleLog.__table__), batch)
+    db.session.commit()
+    print(f"\r   {logs:,}/{logs:,} log")
+
+
+def hot_queries(locale_ids: List[int], today_start: datetime) -> Dict[str, Callable]:
+    """Query da misurare (stesse espressioni di app.py e run_bot.py)"""
+    return {
+        'log di un locale (50)': lambda: [
+            LocaleLog.query.filter_by(locale_id=locale_id).order_by(
+                LocaleLog.eseguito_at.desc()
+            ).limit(50).all()
+            for locale_id in locale_ids
+        ],
+        'già eseguito oggi': lambda: [
+            LocaleLog.query.filter(
+                LocaleLog.locale_id == locale_id,
+                LocaleLog.eseguito_at >= today_start,
+                LocaleLog.successo == True
+            ).first()
+            for locale_id in locale_ids
+        ],
+        'ultimi 10 log (stats)': lambda: LocaleLog.query.order_by(
+            LocaleLog.eseguito_at.desc()
+        ).limit(10).all(),
+        'ultimo log per locale': lambda: LocaleLog.latest_by_locale(),
+    }
+
+
+def measure(queries: Dict[str, Callable], repeat: int) -> Dict[str, float]:
+    """Tempo mediano (s) di ogni query su repeat esecuzioni"""
+    timings = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            samples.append(time.perf_counter() - start)
+            # Le istanze caricate non devono falsare le esecuzioni successive
+            db.session.expunge_all()
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def analyze():
+    """Aggiorna le statistiche del planner (stessa condizione prima e dopo gli indici)"""
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+
+
+def main():
+    """Entry point del benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark delle query su locale_logs con e senza indici')
+    parser.add_argument('--logs', type=int, default=2_000_000, help='Righe della tabella locale_logs')
+    parser.add_argument('--locali', type=int, default=50, help='Numero di locali')
+    parser.add_argument('--repeat', type=int, default=5, help='Ripetizioni (si considera la mediana)')
+    parser.add_argument('--database-url', help='Database vuoto da usare (default: SQLite temporaneo)')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    database_url = args.database_url
+    if not database_url:
+        tmp_dir = tempfile.TemporaryDirectory(prefix='benchmark_logs_')
+        database_url = f"sqlite:///{Path(tmp_dir.name) / 'benchmark.db'}"
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    try:
+        with app.app_context():
+            # Schema senza gli indici di locale_logs (migrazione 4)
+            upgrade(db.engine, target=3)
+            if Locale.query.first() is not None:
+                print("❌ Il database non è vuoto: usa un database dedicato al benchmark")
+                return 1
+
+            end = datetime(2026, 1, 1, 12, 0)
+            print(f"Popolamento: {args.locali} locali, {args.logs:,} log ({db.engine.dialect.name})")
+            start = time.perf_counter()
+            populate(args.locali, args.logs, end)
+            print(f"   {time.perf_counter() - start:.1f}s")
+
+            locale_ids = [row.id for row in db.session.query(Locale.id).limit(SAMPLE_LOCALI)]
+            queries = hot_queries(locale_ids, end.replace(hour=0, minute=0))
+
+            analyze()
+            before = measure(queries, args.repeat)
+
+            start = time.perf_counter()
+            upgrade(db.engine)
+            print(f"   Indici creati in {time.perf_counter() - start:.1f}s")
+            analyze()
+            after = measure(queries, args.repeat)
+
+            print(f"\n{'Query':<26}{'Senza indici':>14}{'Con indici':>14}{'Speedup':>10}")
+            for name in queries:
+                print(f"{name:<26}{before[name] * 1000:>12.1f}ms{after[name] * 1000:>12.1f}ms"
+                      f"{before[name] / after[name]:>9.1f}x")
+            print(f"(le query per locale sono ripetute su {len(locale_ids)} locali)")
+    finally:
+        if tmp_dir is not None:
+            with app.app_context():
+                db.engine.dispose()
+            tmp_dir.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
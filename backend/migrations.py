@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Migrazioni versionate del database (SQLite in locale, PostgreSQL in produzione)
+
+Ogni migrazione ha un numero di versione crescente; quelle applicate sono
+registrate nella tabella schema_migrations, quindi ogni migrazione viene
+eseguita una sola volta per database. Le migrazioni sono idempotenti (creano
+tabelle, colonne e indici solo se mancano): funzionano sia su un database
+nuovo sia su uno creato con le versioni precedenti (db.create_all e migrate_db.py).
+
+Le tabelle sono definite qui come erano quando la migrazione le ha create, non
+lette dai modelli: una migrazione già rilasciata produce sempre lo stesso
+schema, anche quando i modelli cambiano. Ogni modifica ai modelli richiede una
+nuova migrazione in fondo a MIGRATIONS.
+
+Su PostgreSQL un advisory lock impedisce che backend e bot applichino le
+stesse migrazioni contemporaneamente.
+
+    python backend/migrations.py            # applica le migrazioni mancanti
+    python backend/migrations.py --status   # mostra le migrazioni applicate e mancanti
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData, String,
+    Table, Text, UniqueConstraint, create_engine, inspect, select, text
+)
+
+
+# Chiave dell'advisory lock di PostgreSQL usato durante le migrazioni
+MIGRATIONS_LOCK_ID = 48151623
+
+_schema = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _schema,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+# Tabelle come create dalle migrazioni (locali e locale_logs: schema iniziale,
+# prima delle colonne aggiunte dalle migrazioni successive)
+_tables = MetaData()
+
+locali = Table(
+    'locali', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('nome', String(200), nullable=False, unique=True),
+    Column('username', String(200), nullable=False),
+    Column('password_encrypted', Text, nullable=False),
+    Column('pin_encrypted', Text, nullable=True),
+    Column('orario_esecuzione', String(5), nullable=False),
+    Column('google_sheet_id', String(200), nullable=False),
+    Column('locale_selector', String(500), nullable=True),
+    Column('attivo', Boolean, nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+locale_logs = Table(
+    'locale_logs', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('locale_id', Integer, ForeignKey('locali.id'), nullable=False),
+    Column('eseguito_at', DateTime, nullable=False),
+    Column('successo', Boolean, nullable=False),
+    Column('messaggio', Text, nullable=True),
+    Column('file_scaricato', String(500), nullable=True),
+    Column('sheet_aggiornato', Boolean),
+)
+
+locale_log_steps = Table(
+    'locale_log_steps', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('log_id', Integer, ForeignKey('locale_logs.id'), nullable=False),
+    Column('step', String(50), nullable=False),
+    Column('stage', String(20), nullable=False),
+    Column('start_s', Float, nullable=False),
+    Column('end_s', Float, nullable=False),
+    Column('retries', Integer, nullable=False),
+    Column('bytes', Integer, nullable=True),
+    Column('rows', Integer, nullable=True),
+    Column('successo', Boolean, nullable=False),
+    Index('ix_locale_log_steps_log_id', 'log_id'),
+)
+
+locale_checkpoints = Table(
+    'locale_checkpoints', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('locale_id', Integer, ForeignKey('locali.id'), nullable=False),
+    Column('report_start', Date, nullable=False),
+    Column('report_end', Date, nullable=False),
+    Column('stage', String(20), nullable=False),
+    Column('file_name', String(255), nullable=True),
+    Column('file_hash', String(64), nullable=True),
+    Column('file_size', Integer, nullable=True),
+    Column('rows', Integer, nullable=True),
+    Column('cols', Integer, nullable=True),
+    Column('updated_at', DateTime),
+    UniqueConstraint('locale_id', 'report_start', 'report_end', name='uq_checkpoint_locale_report'),
+)
+
+sheet_fingerprints = Table(
+    'sheet_fingerprints', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('sheet_id', String(200), nullable=False),
+    Column('worksheet_name', String(200), nullable=False),
+    Column('worksheet_id', Integer, nullable=True),
+    Column('rows', Integer, nullable=False),
+    Column('cols', Integer, nullable=False),
+    Column('row_hashes', LargeBinary, nullable=True),
+    Column('updated_at', DateTime),
+    UniqueConstraint('sheet_id', 'worksheet_name', name='uq_fingerprint_sheet_worksheet'),
+)
+
+sheet_contents = Table(
+    'sheet_contents', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('locale_id', Integer, ForeignKey('locali.id'), nullable=False),
+    Column('sheet_id', String(200), nullable=False),
+    Column('worksheet_name', String(200), nullable=False),
+    Column('worksheet_id', Integer, nullable=True),
+    Column('rows', Integer, nullable=False),
+    Column('cols', Integer, nullable=False),
+    Column('content_hash', String(64), nullable=True),
+    Column('updated_at', DateTime),
+    UniqueConstraint('locale_id', 'sheet_id', 'worksheet_name', name='uq_content_locale_sheet_worksheet'),
+)
+
+history_partitions = Table(
+    'history_partitions', _tables,
+    Column('id', Integer, primary_key=True),
+    Column('locale_id', Integer, ForeignKey('locali.id'), nullable=False),
+    Column('report_start', Date, nullable=False),
+    Column('report_end', Date, nullable=False),
+    Column('sheet_id', String(200), nullable=False),
+    Column('worksheet_name', String(200), nullable=False),
+    Column('start_row', Integer, nullable=False),
+    Column('rows', Integer, nullable=False),
+    Column('cols', Integer, nullable=False),
+    Column('updated_at', DateTime),
+    UniqueConstraint('locale_id', 'report_start', 'report_end', name='uq_history_locale_report'),
+    Index('ix_history_partitions_sheet_id', 'sheet_id'),
+)
+
+
+def _create_table(conn, table: Table):
+    """Crea una tabella (con i suoi indici) se manca"""
+    if inspect(conn).has_table(table.name):
+        return
+    print(f"   Creazione tabella '{table.name}'")
+    table.create(bind=conn)
+
+
+def _add_column(conn, table: str, column: str, definition: str):
+    """Aggiunge una colonna se manca (ALTER TABLE valido su SQLite e PostgreSQL)"""
+    if column in {info['name'] for info in inspect(conn).get_columns(table)}:
+        return
+    print(f"   Aggiunta colonna '{column}' alla tabella '{table}'")
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+
+def _create_index(conn, table: str, name: str, *columns: str):
+    """Crea un indice se manca"""
+    if name in {info['name'] for info in inspect(conn).get_indexes(table)}:
+        return
+    print(f"   Creazione indice '{name}' su {table}({', '.join(columns)})")
+    conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+def _initial_tables(conn):
+    # Database creati con db.create_all o migrate_db.py: tabelle già presenti
+    _create_table(conn, locali)
+    _create_table(conn, locale_logs)
+
+
+def _locali_esegui_ora(conn):
+    _add_column(conn, 'locali', 'esegui_ora', 'BOOLEAN DEFAULT FALSE NOT NULL')
+
+
+def _locale_logs_upload_saltato(conn):
+    _add_column(conn, 'locale_logs', 'upload_saltato', 'BOOLEAN DEFAULT FALSE NOT NULL')
+
+
+def _locale_logs_indexes(conn):
+    # Log di un locale per data (GET /api/locali/<id>/logs, ultimo log di ogni locale)
+    _create_index(conn, 'locale_logs', 'ix_locale_logs_locale_eseguito', 'locale_id', 'eseguito_at')
+    # "Già eseguito oggi con successo" di should_run_locale
+    _create_index(conn, 'locale_logs', 'ix_locale_logs_locale_successo_eseguito',
+                  'locale_id', 'successo', 'eseguito_at')
+    # Ultimi log di tutti i locali (GET /api/stats)
+    _create_index(conn, 'locale_logs', 'ix_locale_logs_eseguito', 'eseguito_at')
+
+
+# (versione, descrizione, funzione): le nuove migrazioni vanno aggiunte in fondo
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'Tabelle locali e locale_logs', _initial_tables),
+    (2, 'Colonna locali.esegui_ora', _locali_esegui_ora),
+    (3, 'Colonna locale_logs.upload_saltato', _locale_logs_upload_saltato),
+    (4, 'Indici di locale_logs per locale, data ed esito', _locale_logs_indexes),
+    (5, 'Tabella locale_log_steps', lambda conn: _create_table(conn, locale_log_steps)),
+    (6, 'Tabella locale_checkpoints', lambda conn: _create_table(conn, locale_checkpoints)),
+    (7, 'Tabella sheet_fingerprints', lambda conn: _create_table(conn, sheet_fingerprints)),
+    (8, 'Tabella sheet_contents', lambda conn: _create_table(conn, sheet_contents)),
+    (9, 'Tabella history_partitions', lambda conn: _create_table(conn, history_partitions)),
+]
+
+
+def _lock(conn):
+    """Serializza le migrazioni tra processi (solo PostgreSQL, fino alla fine della transazione)"""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATIONS_LOCK_ID})
+
+
+def applied_versions(engine) -> Set[int]:
+    """Versioni già applicate al database"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return set()
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(engine, target: Optional[int] = None) -> List[int]:
+    """
+    Applica le migrazioni mancanti, ognuna nella propria transazione
+
+    Args:
+        engine: Engine SQLAlchemy del database (es. db.engine)
+        target: Ultima versione da applicare (default: tutte)
+
+    Returns:
+        Versioni applicate in questa chiamata
+    """
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            _lock(conn)
+            schema_migrations.create(bind=conn, checkfirst=True)
+            done = conn.execute(
+                select(schema_migrations.c.version).where(schema_migrations.c.version == version)
+            ).first()
+            if done:
+                continue
+
+            print(f"⚙️  Migrazione {version:04d}: {description}")
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+def database_url() -> str:
+    """URL del database: DATABASE_URL (PostgreSQL) oppure data/locali.db (SQLite)"""
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        db_path = Path(__file__).resolve().parent.parent / 'data' / 'locali.db'
+        db_path.parent.mkdir(exist_ok=True)
+        return f'sqlite:///{db_path}'
+    # Render usa postgres:// ma SQLAlchemy richiede postgresql://
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def main():
+    """Entry point da riga di comando"""
+    parser = argparse.ArgumentParser(description='Migrazioni del database dei locali')
+    parser.add_argument('--status', action='store_true', help='Mostra le migrazioni senza applicarle')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    engine = create_engine(database_url())
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+
+    if args.status:
+        done = applied_versions(engine)
+        for version, description, _ in MIGRATIONS:
+            print(f"  {'✓' if version in done else '·'} {version:04d} {description}")
+        return 0
+
+    try:
+        applied = upgrade(engine)
+    except Exception as e:
+        print(f"❌ Migrazione fallita: {e}")
+        return 1
+
+    if applied:
+        print(f"✅ Applicate {len(applied)} migrazioni (versione {applied[-1]:04d})")
+    else:
+        print("✓ Database già aggiornato")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -33,9 +33,22 @@ class Locale(db.Model):
 
     # Relazione con i log
     logs = db.relationship('LocaleLog', backref='locale', lazy=True, cascade='all, delete-orphan')
+    checkpoints = db.relationship('LocaleCheckpoint', backref='locale', lazy=True, cascade='all, delete-orphan')
+    sheet_contents = db.relationship('SheetContent', backref='locale', lazy=True, cascade='all, delete-orphan')
+    history_partitions = db.relationship('HistoryPartition', backref='locale', lazy=True,
+                                         cascade='all, delete-orphan')
 
-    def to_dict(self):
-        """Converte il locale in dizionario (senza password)"""
+    def to_dict(self, ultimi_logs=None):
+        """
+        Converte il locale in dizionario (senza password)
+
+        Args:
+            ultimi_logs: Ultimo log per locale (vedi LocaleLog.latest_by_locale); se None viene
+                letto solo quello di questo locale, senza caricare tutti i log
+        """
+        if ultimi_logs is None:
+            ultimi_logs = LocaleLog.latest_by_locale([self.id])
+        ultimo_log = ultimi_logs.get(self.id)
         return {
             'id': self.id,
             'nome': self.nome,
@@ -47,7 +60,7 @@ class Locale(db.Model):
             'esegui_ora': self.esegui_ora,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'ultimo_log': self.logs[0].to_dict() if self.logs else None
+            'ultimo_log': ultimo_log.to_dict() if ultimo_log else None
         }
 
 
@@ -55,6 +68,8 @@ class LocaleLog(db.Model):
     """Log delle esecuzioni per ogni locale"""
 
     __tablename__ = 'locale_logs'
+    # Indici su (locale_id, eseguito_at), (locale_id, successo, eseguito_at) e (eseguito_at):
+    # creati dalla migrazione 4 di migrations.py
 
     id = db.Column(db.Integer, primary_key=True)
     locale_id = db.Column(db.Integer, db.ForeignKey('locali.id'), nullable=False)
@@ -63,6 +78,39 @@ class LocaleLog(db.Model):
     messaggio = db.Column(db.Text, nullable=True)
     file_scaricato = db.Column(db.String(500), nullable=True)
     sheet_aggiornato = db.Column(db.Boolean, default=False)
+    upload_saltato = db.Column(db.Boolean, default=False, nullable=False)  # Dati invariati: solo timestamp aggiornato
+
+    # Tempi delle fasi dell'esecuzione (scraper e Google Sheets)
+    steps = db.relationship('LocaleLogStep', backref='log', lazy=True, cascade='all, delete-orphan',
+                            order_by='LocaleLogStep.start_s')
+
+    @classmethod
+    def latest_by_locale(cls, locale_ids=None):
+        """
+        Ultimo log (per data di esecuzione) di ogni locale, con una sola query
+
+        Usa ROW_NUMBER() OVER (PARTITION BY locale_id ...), disponibile sia su
+        PostgreSQL sia su SQLite (dalla 3.25).
+
+        Args:
+            locale_ids: Locali da considerare (default: tutti)
+
+        Returns:
+            Dizionario id locale -> LocaleLog
+        """
+        ranked = db.session.query(
+            cls.id.label('id'),
+            db.func.row_number().over(
+                partition_by=cls.locale_id,
+                order_by=(cls.eseguito_at.desc(), cls.id.desc())
+            ).label('posizione')
+        )
+        if locale_ids is not None:
+            ranked = ranked.filter(cls.locale_id.in_(locale_ids))
+        ranked = ranked.subquery()
+
+        logs = cls.query.join(ranked, cls.id == ranked.c.id).filter(ranked.c.posizione == 1).all()
+        return {log.locale_id: log for log in logs}
 
     def to_dict(self):
         """Converte il log in dizionario"""
@@ -73,5 +121,129 @@ class LocaleLog(db.Model):
             'successo': self.successo,
             'messaggio': self.messaggio,
             'file_scaricato': self.file_scaricato,
-            'sheet_aggiornato': self.sheet_aggiornato
+            'sheet_aggiornato': self.sheet_aggiornato,
+            'upload_saltato': self.upload_saltato
+        }
+
+
+class LocaleCheckpoint(db.Model):
+    """Ultima fase completata dell'esecuzione di un locale per un giorno (per riprendere dopo un errore)"""
+
+    __tablename__ = 'locale_checkpoints'
+    __table_args__ = (
+        db.UniqueConstraint('locale_id', 'report_start', 'report_end', name='uq_checkpoint_locale_report'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    locale_id = db.Column(db.Integer, db.ForeignKey('locali.id'), nullable=False)
+    report_start = db.Column(db.Date, nullable=False)
+    report_end = db.Column(db.Date, nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # downloaded, parsed, uploaded
+    file_name = db.Column(db.String(255), nullable=True)  # Relativo alla directory dei checkpoint
+    file_hash = db.Column(db.String(64), nullable=True)  # SHA-256 del file scaricato
+    file_size = db.Column(db.Integer, nullable=True)
+    rows = db.Column(db.Integer, nullable=True)
+    cols = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SheetFingerprint(db.Model):
+    """Hash per riga dell'ultima griglia scritta su un foglio (aggiornamenti incrementali di Google Sheets)"""
+
+    __tablename__ = 'sheet_fingerprints'
+    __table_args__ = (
+        db.UniqueConstraint('sheet_id', 'worksheet_name', name='uq_fingerprint_sheet_worksheet'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sheet_id = db.Column(db.String(200), nullable=False)
+    worksheet_name = db.Column(db.String(200), nullable=False)
+    worksheet_id = db.Column(db.Integer, nullable=True)  # gid del foglio: se cambia si riscrive tutto
+    rows = db.Column(db.Integer, default=0, nullable=False)
+    cols = db.Column(db.Integer, default=0, nullable=False)
+    row_hashes = db.Column(db.LargeBinary, nullable=True)  # 8 byte per riga, None = contenuto non noto
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SheetContent(db.Model):
+    """Hash dei dati dell'ultimo upload di un locale su un foglio (upload saltato se invariati)"""
+
+    __tablename__ = 'sheet_contents'
+    __table_args__ = (
+        db.UniqueConstraint('locale_id', 'sheet_id', 'worksheet_name', name='uq_content_locale_sheet_worksheet'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    locale_id = db.Column(db.Integer, db.ForeignKey('locali.id'), nullable=False)
+    sheet_id = db.Column(db.String(200), nullable=False)
+    worksheet_name = db.Column(db.String(200), nullable=False)
+    worksheet_id = db.Column(db.Integer, nullable=True)  # gid del foglio scritto
+    rows = db.Column(db.Integer, default=0, nullable=False)
+    cols = db.Column(db.Integer, default=0, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 dei valori normalizzati, None = non noto
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class HistoryPartition(db.Model):
+    """Posizione di un giorno (o intervallo) di un locale nei fogli storici di Google Sheets"""
+
+    __tablename__ = 'history_partitions'
+    __table_args__ = (
+        db.UniqueConstraint('locale_id', 'report_start', 'report_end', name='uq_history_locale_report'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    locale_id = db.Column(db.Integer, db.ForeignKey('locali.id'), nullable=False)
+    report_start = db.Column(db.Date, nullable=False)
+    report_end = db.Column(db.Date, nullable=False)
+    sheet_id = db.Column(db.String(200), nullable=False, index=True)
+    worksheet_name = db.Column(db.String(200), nullable=False)
+    start_row = db.Column(db.Integer, nullable=False)  # Prima riga del blocco (da 0)
+    rows = db.Column(db.Integer, nullable=False)
+    cols = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LocaleLogStep(db.Model):
+    """Tempo di una fase di un'esecuzione (login, PIN, download, scrittura Sheets, ...)"""
+
+    __tablename__ = 'locale_log_steps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, db.ForeignKey('locale_logs.id'), nullable=False, index=True)
+    step = db.Column(db.String(50), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # scraper, sheets
+    start_s = db.Column(db.Float, nullable=False)  # Secondi (monotonic) dall'avvio della sessione
+    end_s = db.Column(db.Float, nullable=False)
+    retries = db.Column(db.Integer, default=0, nullable=False)
+    bytes = db.Column(db.Integer, nullable=True)
+    rows = db.Column(db.Integer, nullable=True)
+    successo = db.Column(db.Boolean, nullable=False)
+
+    @classmethod
+    def from_record(cls, record):
+        """Crea la riga da una fase registrata da StepTimer"""
+        return cls(
+            step=record['step'],
+            stage=record['stage'],
+            start_s=record['start_s'],
+            end_s=record['end_s'],
+            retries=record['retries'],
+            bytes=record['bytes'],
+            rows=record['rows'],
+            successo=record['success']
+        )
+
+    def to_dict(self):
+        """Converte la fase in dizionario"""
+        return {
+            'step': self.step,
+            'stage': self.stage,
+            'start_s': self.start_s,
+            'end_s': self.end_s,
+            'durata_s': round(self.end_s - self.start_s, 3),
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'rows': self.rows,
+            'successo': self.successo
         }
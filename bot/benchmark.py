@@ -0,0 +1,176 @@
+"""
+Benchmark end-to-end dello scraper contro la finta dashboard locale
+
+Avvia bot.mock_dashboard, esegue DashboardScraper (login, PIN, menu e download
+di più locali in una sessione) e la lettura del file scaricato come nel
+caricamento su Google Sheets (la scrittura su Sheets non viene eseguita),
+poi stampa tempi per fase e tempo totale.
+
+    python -m bot.benchmark [--locali 3] [--runs 1] [--latency 0.5] [--failure-rate 0.1]
+    python -m bot.benchmark --fast-export --format xlsx
+    python -m bot.benchmark --mock-config mock.json
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from .config_manager import ConfigManager
+from .mock_dashboard import DEFAULT_MOCK_CONFIG, MockDashboardServer
+from .report_artifact import ReportArtifact
+from .scraper import DashboardScraper
+from .timings import StepTimer, print_steps_summary
+
+
+class StaticAuth:
+    """Credenziali fisse per la finta dashboard"""
+
+    def get_credentials(self):
+        return 'benchmark', 'benchmark'
+
+
+def build_config(server: MockDashboardServer, base_config: str, fast_export: bool) -> ConfigManager:
+    """
+    Crea una configurazione del bot che punta alla finta dashboard
+
+    Args:
+        server: Finta dashboard avviata
+        base_config: config.json da cui copiare selettori, attese e rete
+        fast_export: Se abilitare il fast export verso l'endpoint /export del mock
+
+    Returns:
+        ConfigManager con la configurazione temporanea
+    """
+    with open(base_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    config['dashboard'] = server.dashboard_config()
+    config['session_cache'] = dict(config.get('session_cache', {}), enabled=False)
+    config['fast_export'] = dict(
+        config.get('fast_export', {}),
+        enabled=fast_export,
+        url=server.export_url(),
+        method='GET',
+        params={'data_inizio': '{date_start}', 'data_fine': '{date_end}', 'locale': '{locale_id}'},
+        date_format='%d/%m/%Y',
+    )
+
+    fd, path = tempfile.mkstemp(prefix='benchmark_', suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    try:
+        return ConfigManager(path)
+    finally:
+        os.remove(path)
+
+
+def read_report(artifact: ReportArtifact, timer: StepTimer):
+    """Legge il report come farebbe l'upload su Google Sheets (senza scrivere su Sheets)"""
+    with timer.step('sheets_read', 'sheets') as step:
+        df = artifact.parse()
+        step.update(bytes=artifact.size, rows=len(df))
+
+
+def run_once(config: ConfigManager, selectors: List[str], date_ranges) -> Dict[str, Any]:
+    """
+    Esegue una sessione completa dello scraper e misura le fasi
+
+    Returns:
+        Dizionario con wall_s, downloads riusciti e fasi registrate
+    """
+    timer = StepTimer()
+    scraper = DashboardScraper(config, StaticAuth(), timer=timer)
+
+    def on_result(idx, artifact):
+        if artifact:
+            try:
+                read_report(artifact, timer)
+            except Exception as e:
+                print(f"⚠ Lettura report fallita: {e}")
+
+    start = time.monotonic()
+    results = scraper.run_many(selectors, pin='123456', on_result=on_result, date_ranges=date_ranges)
+    wall = time.monotonic() - start
+
+    return {'wall_s': wall, 'ok': sum(1 for r in results if r), 'total': len(results), 'steps': timer.drain()}
+
+
+def main():
+    """Esegue il benchmark e stampa i tempi per fase e totali"""
+    parser = argparse.ArgumentParser(description='Benchmark dello scraper contro la finta dashboard iPratico')
+    parser.add_argument('--config', default='config.json', help='Configurazione del bot da cui partire')
+    parser.add_argument('--mock-config', help='File JSON con latenze, fallimenti e dati della finta dashboard')
+    parser.add_argument('--locali', type=int, default=3, help='Locali da scaricare nella sessione')
+    parser.add_argument('--days', type=int, default=1, help='Giorni per locale (backfill)')
+    parser.add_argument('--runs', type=int, default=1, help='Ripetizioni')
+    parser.add_argument('--latency', type=float, help='Latenza (s) uguale per tutti gli endpoint')
+    parser.add_argument('--failure-rate', type=float, help='Probabilità di errore di refresh ed export')
+    parser.add_argument('--format', choices=['html', 'xlsx'], help='Formato dell\'export')
+    parser.add_argument('--rows', type=int, help='Righe del report')
+    parser.add_argument('--fast-export', action='store_true', help='Usa il fast export via HTTP')
+    parser.add_argument('--show', action='store_true', help='Mostra il browser (default: headless)')
+    args = parser.parse_args()
+
+    mock_config: Dict[str, Any] = {}
+    if args.mock_config:
+        with open(args.mock_config, 'r', encoding='utf-8') as f:
+            mock_config = json.load(f)
+    if args.latency is not None:
+        mock_config['latency'] = {key: args.latency for key in DEFAULT_MOCK_CONFIG['latency']}
+    if args.failure_rate is not None:
+        mock_config['failure_rate'] = {'refresh': args.failure_rate, 'export': args.failure_rate}
+    if args.format:
+        mock_config['export_format'] = args.format
+    if args.rows:
+        mock_config['rows'] = args.rows
+    mock_config.setdefault('locali', {str(100 + n): f"Locale {n}" for n in range(1, max(args.locali, 1) + 1)})
+
+    if not args.show:
+        os.environ['HEADLESS_MODE'] = 'true'
+
+    server = MockDashboardServer(mock_config)
+    server.start()
+    print(f"Finta dashboard su {server.base_url}")
+
+    try:
+        config = build_config(server, args.config, args.fast_export)
+        selectors = [f"#locale-{locale_id}" for locale_id in list(server.config['locali'])[:args.locali]]
+        date_ranges = None
+        if args.days > 1:
+            days = [date.today() - timedelta(days=n) for n in range(args.days, 0, -1)]
+            date_ranges = [(day, day) for day in days]
+
+        runs = [run_once(config, selectors, date_ranges) for _ in range(args.runs)]
+    finally:
+        server.stop()
+
+    print("\n" + "=" * 60)
+    print("BENCHMARK SCRAPER (finta dashboard)")
+    print("=" * 60)
+    for n, run in enumerate(runs, 1):
+        print(f"Run {n}: {run['wall_s']:.1f}s, {run['ok']}/{run['total']} download riusciti")
+
+    steps = [
+        {
+            'step': step['step'],
+            'durata_s': step['end_s'] - step['start_s'],
+            'retries': step['retries'],
+            'bytes': step['bytes'],
+            'successo': step['success'],
+        }
+        for run in runs for step in run['steps']
+    ]
+    print_steps_summary(steps)
+
+    walls = [run['wall_s'] for run in runs]
+    downloads = sum(run['total'] for run in runs)
+    print(f"\nTotale: {sum(walls):.1f}s su {args.runs} run "
+          f"(media {sum(walls) / len(walls):.1f}s, {sum(walls) / max(downloads, 1):.1f}s per download)")
+    print("Richieste alla finta dashboard: " + ', '.join(f"{k}={v}" for k, v in sorted(server.stats.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Micro-benchmark della conversione DataFrame → valori di Google Sheets
+
+Su un report sintetico con le colonne tipiche degli export iPratico confronta:
+
+- la conversione precedente (df.values.tolist() e pd.isna su ogni cella),
+  che non converte numeri all'italiana e date;
+- la stessa normalizzazione di sheet_values fatta cella per cella in Python;
+- la conversione vettoriale di sheet_values (il cui risultato deve coincidere
+  con quello cella per cella).
+
+Il report "excel" ha colonne tipizzate (testo, decimali con celle vuote, date),
+quello "html" solo testo (descrizioni e numeri all'italiana).
+
+    python -m bot.benchmark_values [--rows 20000] [--cols 12] [--repeat 5]
+"""
+import gc
+import re
+import time
+import argparse
+from typing import Any, Callable, List
+
+import numpy as np
+import pandas as pd
+
+from .sheet_values import ITALIAN_NUMBER, DATE_FORMAT, DATETIME_FORMAT, dataframe_to_values
+
+
+def legacy_values(df: pd.DataFrame) -> List[list]:
+    """Conversione precedente: copia object di tutto il DataFrame e una chiamata pd.isna per cella"""
+    data = df.values.tolist()
+    return [['' if pd.isna(cell) else cell for cell in row] for row in data]
+
+
+_ITALIAN_NUMBER = re.compile(ITALIAN_NUMBER)
+
+
+def _percell_value(cell: Any) -> Any:
+    if isinstance(cell, pd.Timestamp):
+        return cell.strftime(DATE_FORMAT if cell == cell.normalize() else DATETIME_FORMAT)
+    if pd.isna(cell):
+        return ''
+    if isinstance(cell, str) and _ITALIAN_NUMBER.fullmatch(cell):
+        number = float(cell.replace('.', '').replace(',', '.'))
+        return int(number) if number.is_integer() else number
+    if isinstance(cell, float) and cell.is_integer():
+        return int(cell)
+    return cell
+
+
+def percell_values(df: pd.DataFrame) -> List[list]:
+    """Normalizzazione di sheet_values con una chiamata Python per cella"""
+    return [[_percell_value(cell) for cell in row] for row in df.astype(object).values.tolist()]
+
+
+def build_report(rows: int, cols: int, source: str, seed: int = 0) -> pd.DataFrame:
+    """
+    Report sintetico
+
+    Args:
+        rows: Righe del report
+        cols: Colonne del report
+        source: 'excel' (testo, decimali con celle vuote, date) o 'html' (testo e numeri all'italiana)
+        seed: Seme del generatore casuale
+
+    Returns:
+        DataFrame senza header
+    """
+    rng = np.random.default_rng(seed)
+    kinds = (0, 2, 3) if source == 'excel' else (0, 1)
+    columns = {}
+    for idx in range(cols):
+        kind = kinds[idx % len(kinds)]
+        if kind == 0:
+            columns[idx] = pd.Series(rng.choice(['Caffè', 'Cornetto', 'Acqua 0,5L', 'Coperto'], rows), dtype=object)
+        elif kind == 1:
+            amounts = rng.uniform(0, 5000, rows)
+            columns[idx] = pd.Series(
+                [f"{value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.') for value in amounts],
+                dtype=object
+            )
+        elif kind == 2:
+            values = rng.uniform(0, 100, rows).round(2)
+            values[rng.random(rows) < 0.1] = np.nan
+            columns[idx] = pd.Series(values)
+        else:
+            columns[idx] = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'))
+    return pd.DataFrame(columns)
+
+
+def best_time(func: Callable, df: pd.DataFrame, repeat: int) -> float:
+    """Tempo migliore (s) su repeat esecuzioni, con il garbage collector fermo (come timeit)"""
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(df)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    """Entry point del benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark della conversione DataFrame → valori di Google Sheets')
+    parser.add_argument('--rows', type=int, default=20000, help='Righe del report sintetico')
+    parser.add_argument('--cols', type=int, default=12, help='Colonne del report sintetico')
+    parser.add_argument('--repeat', type=int, default=5, help='Ripetizioni (si considera la migliore)')
+    args = parser.parse_args()
+
+    cells = args.rows * args.cols
+    for source in ('excel', 'html'):
+        df = build_report(args.rows, args.cols, source)
+        print(f"\nReport {source}: {args.rows} righe x {args.cols} colonne ({cells} celle)")
+
+        if dataframe_to_values(df) != percell_values(df):
+            raise SystemExit("❌ La conversione vettoriale non coincide con quella cella per cella")
+
+        timings = [
+            ('precedente (solo pd.isna)', best_time(legacy_values, df, args.repeat)),
+            ('cella per cella', best_time(percell_values, df, args.repeat)),
+            ('vettoriale (sheet_values)', best_time(dataframe_to_values, df, args.repeat)),
+        ]
+        print(f"{'Conversione':<28}{'Tempo':>10}{'Celle/s':>14}")
+        for name, elapsed in timings:
+            print(f"{name:<28}{elapsed * 1000:>8.1f}ms{cells / elapsed:>14,.0f}")
+        vectorized = timings[-1][1]
+        print(f"Speedup: {timings[0][1] / vectorized:.1f}x sulla precedente, "
+              f"{timings[1][1] / vectorized:.1f}x sulla stessa normalizzazione cella per cella")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""
+Avvio di Chrome, cache del ChromeDriver e pool di browser pre-avviati
+
+- create_chrome_driver: costruisce le opzioni di Chrome e avvia il driver
+- resolve_chromedriver_path: risolve il ChromeDriver una volta e salva il path
+  su disco, così le run successive (anche offline) non rifanno il lookup
+- BrowserPool: avvia i browser in background (uno alla volta, se c'è memoria
+  libera) mentre run_bot prepara le sessioni, consegna a ogni sessione un
+  browser pulito e lo ricicla dopo l'uso
+"""
+import os
+import json
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from .config_manager import ConfigManager
+from .devtools import enable_performance_log
+from .network import apply_lean_options
+
+
+# Path del ChromeDriver risolto in questo processo (evita lookup ripetuti tra i thread)
+_driver_path_lock = threading.Lock()
+_driver_path: Optional[str] = None
+_driver_path_resolved = False
+
+# Dopo quanto tempo il path in cache viene riverificato con webdriver-manager
+DRIVER_CACHE_MAX_AGE = 24 * 3600
+
+
+def _driver_cache_file() -> str:
+    """File JSON con il path del ChromeDriver risolto"""
+    cache_dir = os.getenv('CHROMEDRIVER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'ipratico-bot'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, 'chromedriver.json')
+
+
+def resolve_chromedriver_path() -> Optional[str]:
+    """
+    Restituisce il path del ChromeDriver da usare
+
+    Ordine: variabile CHROME_DRIVER_PATH, path in cache su disco (se recente),
+    webdriver-manager (il risultato viene salvato in cache), path in cache anche
+    se vecchio (uso offline). Su GitHub Actions restituisce None: Chrome e
+    ChromeDriver sono nel PATH (setup-chrome action).
+
+    Returns:
+        Path del ChromeDriver, oppure None per lasciare la scelta a Selenium
+    """
+    global _driver_path, _driver_path_resolved
+
+    with _driver_path_lock:
+        if _driver_path_resolved:
+            return _driver_path
+
+        _driver_path = _resolve_chromedriver_path()
+        _driver_path_resolved = True
+        return _driver_path
+
+
+def _resolve_chromedriver_path() -> Optional[str]:
+    if os.getenv('GITHUB_ACTIONS'):
+        return None
+
+    env_path = os.getenv('CHROME_DRIVER_PATH')
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    cache_file = _driver_cache_file()
+    cached = None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    cached_path = cached.get('path') if cached else None
+    if cached_path and os.path.exists(cached_path):
+        if time.time() - cached.get('resolved_at', 0) < DRIVER_CACHE_MAX_AGE:
+            print(f"ChromeDriver dalla cache: {cached_path}")
+            return cached_path
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+        return path
+    except Exception as e:
+        if cached_path and os.path.exists(cached_path):
+            print(f"⚠ webdriver-manager non disponibile ({e}), uso il ChromeDriver in cache")
+            return cached_path
+        print(f"⚠ webdriver-manager non disponibile ({e}), uso il ChromeDriver di sistema")
+        return None
+
+
+def build_chrome_options(
+    config: ConfigManager,
+    download_path: str,
+    network_config: Optional[Dict[str, Any]] = None
+) -> Options:
+    """
+    Costruisce le opzioni di Chrome del bot
+
+    Args:
+        config: Gestore della configurazione
+        download_path: Directory di download di default
+        network_config: Sezione "network" (default: quella della configurazione)
+
+    Returns:
+        Options pronte per webdriver.Chrome
+    """
+    if network_config is None:
+        network_config = config.get_network_config()
+
+    chrome_options = Options()
+
+    # Configura il path per i download
+    prefs = {
+        "download.default_directory": download_path,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    }
+
+    # Caricamento leggero: immagini disattivate e page load strategy configurabile
+    apply_lean_options(chrome_options, prefs, network_config)
+    chrome_options.add_experimental_option("prefs", prefs)
+
+    # Performance log: eventi DevTools per seguire i download
+    enable_performance_log(chrome_options)
+
+    # Modalità headless - usa la nuova modalità su GitHub Actions
+    if os.getenv('GITHUB_ACTIONS'):
+        chrome_options.add_argument("--headless=new")
+        print("Modalità headless (new) attivata per GitHub Actions")
+    elif config.is_headless_mode():
+        chrome_options.add_argument("--headless")
+        print("Modalità headless attivata")
+
+    # Opzioni aggiuntive per stabilità
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    # Opzioni aggiuntive per GitHub Actions
+    if os.getenv('GITHUB_ACTIONS'):
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_argument("--no-default-browser-check")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-background-timer-throttling")
+        chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+        chrome_options.add_argument("--disable-breakpad")
+        chrome_options.add_argument("--disable-component-extensions-with-background-pages")
+        chrome_options.add_argument("--disable-features=TranslateUI,BlinkGenPropertyTrees")
+
+    return chrome_options
+
+
+def create_chrome_driver(
+    config: ConfigManager,
+    download_path: str,
+    network_config: Optional[Dict[str, Any]] = None
+) -> webdriver.Chrome:
+    """
+    Avvia un nuovo Chrome con le opzioni del bot
+
+    Args:
+        config: Gestore della configurazione
+        download_path: Directory di download di default
+        network_config: Sezione "network" (default: quella della configurazione)
+
+    Returns:
+        WebDriver Chrome avviato
+    """
+    chrome_options = build_chrome_options(config, download_path, network_config)
+    driver_path = resolve_chromedriver_path()
+
+    if driver_path:
+        return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    # ChromeDriver dal PATH (GitHub Actions) o risolto da Selenium Manager
+    return webdriver.Chrome(options=chrome_options)
+
+
+class BrowserPool:
+    """Pool di browser Chrome pre-avviati e riutilizzati tra le sessioni"""
+
+    def __init__(
+        self,
+        config: ConfigManager,
+        size: int = 1,
+        max_uses: int = 20,
+        can_admit: Optional[Callable[[int], bool]] = None
+    ):
+        """
+        Inizializza il pool
+
+        Args:
+            config: Gestore della configurazione
+            size: Numero di browser da tenere pronti
+            max_uses: Sessioni servite da un browser prima di sostituirlo
+            can_admit: Controllo della memoria prima di avviare un browser in background,
+                chiamato con il numero di browser già aperti (es. BrowserWorkerPool.can_admit)
+        """
+        self.config = config
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.can_admit = can_admit
+        self.download_path = config.get_download_path()
+        # Browser pronti; None segnala un avvio in background non riuscito
+        self._idle: "queue.Queue" = queue.Queue()
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._spawners = []
+        # Avvii in background non ancora terminati: acquire attende solo se ce ne sono
+        self._pending = 0
+        self._closed = False
+
+    def _new_driver(self) -> webdriver.Chrome:
+        """Avvia subito un browser per chi lo ha richiesto (resta nel pool dopo release)"""
+        driver = create_chrome_driver(self.config, self.download_path)
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def _spawn(self):
+        """Avvia un browser e lo mette tra quelli disponibili (se il pool è aperto e c'è memoria)"""
+        with self._lock:
+            opened = len(self._uses)
+            closed = self._closed
+
+        driver = None
+        if closed:
+            pass
+        elif self.can_admit is not None and not self.can_admit(opened):
+            print("ℹ Browser in background non avviato: verrà aperto quando serve")
+        else:
+            try:
+                driver = create_chrome_driver(self.config, self.download_path)
+            except Exception as e:
+                print(f"⚠ Avvio browser del pool fallito: {e}")
+
+        with self._lock:
+            self._pending -= 1
+            if driver is not None and self._closed:
+                driver.quit()
+                driver = None
+            if driver is not None:
+                self._uses[id(driver)] = 0
+            # Anche un avvio non riuscito sveglia chi sta aspettando in acquire
+            self._idle.put(driver)
+
+    def _run_spawner(self, count: int):
+        """Avvia count browser uno dopo l'altro (la memoria libera riflette quelli già aperti)"""
+        thread = threading.Thread(target=lambda: [self._spawn() for _ in range(count)],
+                                  name='browser-pool-spawn', daemon=True)
+        with self._lock:
+            self._pending += count
+        thread.start()
+        self._spawners.append(thread)
+
+    def _spawn_async(self):
+        self._run_spawner(1)
+
+    def start(self):
+        """Avvia in background i browser del pool"""
+        print(f"Avvio di {self.size} browser in background...")
+        self._run_spawner(self.size)
+
+    def acquire(self, timeout: float = 120) -> webdriver.Chrome:
+        """
+        Restituisce un browser pulito e funzionante
+
+        Attende un browser libero solo se ce ne sono in avvio; altrimenti (avvii
+        falliti o non ammessi per memoria, browser morti) ne avvia subito uno.
+
+        Args:
+            timeout: Secondi massimi di attesa di un browser in avvio
+
+        Returns:
+            WebDriver Chrome
+        """
+        while True:
+            with self._lock:
+                waiting = self._pending > 0
+            try:
+                driver = self._idle.get(timeout=timeout) if waiting else self._idle.get_nowait()
+            except queue.Empty:
+                if waiting:
+                    print("⚠ Nessun browser libero nel pool, ne avvio uno nuovo")
+                return self._new_driver()
+
+            if driver is None:
+                # Avvio in background non riuscito: si ricontrolla senza aspettare lo slot
+                continue
+
+            # Un browser morto durante l'attesa viene chiuso e sostituito
+            try:
+                driver.current_url
+            except Exception:
+                print("⚠ Browser del pool non più raggiungibile, lo sostituisco")
+                self._discard(driver)
+                continue
+
+            return driver
+
+    def release(self, driver: webdriver.Chrome):
+        """
+        Restituisce un browser al pool dopo averlo ripulito (cookie e storage)
+
+        Se il browser non risponde o ha raggiunto max_uses viene chiuso e sostituito.
+
+        Args:
+            driver: WebDriver ottenuto con acquire
+        """
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            closed = self._closed
+
+        if closed or uses >= self.max_uses or not self._clean(driver):
+            self._discard(driver)
+            if not closed:
+                self._spawn_async()
+            return
+
+        self._idle.put(driver)
+
+    def _clean(self, driver: webdriver.Chrome) -> bool:
+        """Cancella cookie e storage della dashboard lasciando la cache HTTP (risorse statiche)"""
+        origin = self.config.get_dashboard_config().get('base_url', '').rstrip('/')
+        try:
+            driver.get('about:blank')
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            if origin:
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                    'origin': origin,
+                    'storageTypes': 'local_storage,session_storage,indexeddb,websql,service_workers,cache_storage',
+                })
+            # Scarta gli eventi DevTools della sessione precedente
+            driver.get_log('performance')
+            return True
+        except Exception as e:
+            print(f"⚠ Pulizia browser fallita, lo sostituisco: {e}")
+            return False
+
+    def _discard(self, driver: webdriver.Chrome):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        """Chiude tutti i browser del pool"""
+        with self._lock:
+            self._closed = True
+        for thread in self._spawners:
+            thread.join(timeout=60)
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if driver is not None:
+                self._discard(driver)
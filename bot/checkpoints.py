@@ -0,0 +1,161 @@
+"""
+Checkpoint delle fasi di ogni locale (download, lettura, upload)
+
+Dopo il download il file resta in una directory di checkpoint (CHECKPOINT_DIR,
+default ./.checkpoints): viene collegato con un hard link, senza rileggerlo né
+copiarlo nel database. Il checkpoint del locale e del giorno registra il nome
+del file, la dimensione e l'hash SHA-256 calcolato da ReportArtifact durante
+la lettura; se l'upload su Google Sheets fallisce, il tentativo successivo
+riparte dal file senza aprire il browser. A upload completato il file viene
+eliminato. Il salvataggio su database è fatto da run_bot: qui ci sono solo le
+operazioni sul file.
+"""
+import os
+import time
+import shutil
+import hashlib
+from types import SimpleNamespace
+from typing import Optional
+
+
+# Fasi in ordine: il checkpoint indica l'ultima fase completata
+STAGE_DOWNLOADED = 'downloaded'
+STAGE_PARSED = 'parsed'
+STAGE_UPLOADED = 'uploaded'
+STAGES = (STAGE_DOWNLOADED, STAGE_PARSED, STAGE_UPLOADED)
+
+# Byte letti per volta nella verifica dell'hash
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def checkpoint_dir() -> str:
+    """Directory dei file dei checkpoint (CHECKPOINT_DIR o ./.checkpoints)"""
+    return os.getenv('CHECKPOINT_DIR', './.checkpoints')
+
+
+def checkpoint_path(file_name: str) -> str:
+    """Path del file di un checkpoint (file_name è relativo alla directory dei checkpoint)"""
+    return os.path.join(checkpoint_dir(), file_name)
+
+
+def new_checkpoint() -> SimpleNamespace:
+    """Checkpoint vuoto (nessuna fase completata)"""
+    return SimpleNamespace(
+        stage=None, file_name=None, file_hash=None, file_size=None,
+        rows=None, cols=None, dirty=False
+    )
+
+
+def is_resumable(checkpoint: Optional[SimpleNamespace]) -> bool:
+    """True se il file è stato scaricato, è ancora su disco e l'upload non è stato completato"""
+    return bool(
+        checkpoint
+        and checkpoint.stage in (STAGE_DOWNLOADED, STAGE_PARSED)
+        and checkpoint.file_name
+        and os.path.exists(checkpoint_path(checkpoint.file_name))
+    )
+
+
+def mark_downloaded(checkpoint: SimpleNamespace, path: str, file_name: str):
+    """
+    Conserva il file scaricato nella directory dei checkpoint e lo registra
+
+    Il file viene collegato con un hard link (copiato solo se la directory è su
+    un altro filesystem); l'hash viene registrato da mark_parsed/mark_uploaded,
+    quando ReportArtifact lo ha calcolato leggendo il file.
+
+    Args:
+        checkpoint: Checkpoint del locale e del giorno
+        path: File scaricato
+        file_name: Nome del file nella directory dei checkpoint (univoco per locale e giorno)
+    """
+    target = checkpoint_path(file_name)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(path, target)
+    except OSError:
+        shutil.copyfile(path, target)
+
+    checkpoint.stage = STAGE_DOWNLOADED
+    checkpoint.file_name = file_name
+    checkpoint.file_hash = None
+    checkpoint.file_size = os.path.getsize(target)
+    checkpoint.rows = None
+    checkpoint.cols = None
+    checkpoint.dirty = True
+
+
+def mark_parsed(checkpoint: SimpleNamespace, rows: int, cols: int, file_hash: Optional[str] = None):
+    """Registra che il file è stato letto correttamente (upload non riuscito) e il suo hash"""
+    checkpoint.stage = STAGE_PARSED
+    checkpoint.rows = rows
+    checkpoint.cols = cols
+    if file_hash:
+        checkpoint.file_hash = file_hash
+    checkpoint.dirty = True
+
+
+def mark_uploaded(checkpoint: SimpleNamespace, file_hash: Optional[str] = None):
+    """Registra l'upload completato ed elimina il file, che non serve più"""
+    checkpoint.stage = STAGE_UPLOADED
+    if file_hash:
+        checkpoint.file_hash = file_hash
+    if checkpoint.file_name:
+        remove_file(checkpoint.file_name)
+    checkpoint.dirty = True
+
+
+def remove_file(file_name: str):
+    """Elimina il file di un checkpoint (se esiste)"""
+    try:
+        os.remove(checkpoint_path(file_name))
+    except FileNotFoundError:
+        pass
+
+
+def prune_files(max_age_days: float) -> int:
+    """
+    Elimina i file dei checkpoint più vecchi di max_age_days (anche quelli senza riga nel database)
+
+    Returns:
+        Numero di file eliminati
+    """
+    directory = checkpoint_dir()
+    if not os.path.isdir(directory):
+        return 0
+    limit = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < limit:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def restore_artifact(checkpoint: SimpleNamespace) -> Optional[str]:
+    """
+    Path del file di un checkpoint, verificandone dimensione e hash (se noto)
+
+    Args:
+        checkpoint: Checkpoint ripristinabile (vedi is_resumable)
+
+    Returns:
+        Path del file, oppure None se il file non corrisponde al checkpoint
+    """
+    path = checkpoint_path(checkpoint.file_name)
+    if checkpoint.file_size is not None and os.path.getsize(path) != checkpoint.file_size:
+        print("⚠ Checkpoint con dimensione non corrispondente, lo ignoro")
+        return None
+
+    if checkpoint.file_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != checkpoint.file_hash:
+            print("⚠ Checkpoint con hash non corrispondente, lo ignoro")
+            return None
+
+    return path
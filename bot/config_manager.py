@@ -44,6 +44,34 @@ class ConfigManager:
         """Restituisce la configurazione di navigazione"""
         return self.config.get('navigation', {})
 
+    def get_wait_conditions(self) -> Dict[str, Any]:
+        """Restituisce le condizioni di attesa per ogni step dello scraper"""
+        return self.config.get('wait_conditions', {})
+
+    def get_fast_export_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione dell'export diretto via HTTP"""
+        return self.config.get('fast_export', {})
+
+    def get_session_cache_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione della cache delle sessioni"""
+        return self.config.get('session_cache', {})
+
+    def get_network_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione del blocco richieste e del caricamento pagine"""
+        return self.config.get('network', {})
+
+    def get_browser_pool_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione del pool di browser pre-avviati"""
+        return self.config.get('browser_pool', {})
+
+    def get_pipeline_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione della pipeline download → upload"""
+        return self.config.get('pipeline', {})
+
+    def get_google_sheets_config(self) -> Dict[str, Any]:
+        """Restituisce la configurazione di Google Sheets (fogli di destinazione)"""
+        return self.config.get('google_sheets', {})
+
     def get_google_drive_config(self) -> Dict[str, Any]:
         """Restituisce la configurazione di Google Drive"""
         return self.config.get('google_drive', {})
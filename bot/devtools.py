@@ -0,0 +1,233 @@
+"""
+Eventi Chrome DevTools (CDP) letti dal performance log di ChromeDriver
+
+Selenium non riceve eventi CDP in push, ma ChromeDriver li registra nel log
+"performance" quando è abilitato con la capability goog:loggingPrefs. Questo
+modulo legge quel log e lo usa per seguire i download in modo esatto.
+"""
+import os
+import json
+import time
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def enable_performance_log(chrome_options):
+    """Abilita il performance log di ChromeDriver (necessario per leggere gli eventi CDP)"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+class DevToolsEventLog:
+    """Legge gli eventi CDP dal performance log e li distribuisce ai sottoscrittori"""
+
+    def __init__(self, driver):
+        """
+        Args:
+            driver: WebDriver Chrome con performance log abilitato
+        """
+        self.driver = driver
+        self.available = True
+        self._subscribers: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """Registra una funzione chiamata con (metodo, parametri) per ogni evento"""
+        self._subscribers.append(callback)
+
+    def poll(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Legge i nuovi eventi dal log e li inoltra ai sottoscrittori
+
+        Returns:
+            Lista di tuple (metodo, parametri) lette
+        """
+        if not self.available:
+            return []
+
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            # Performance log non abilitato o non supportato da questo driver
+            self.available = False
+            return []
+
+        events = []
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+            event = (message.get('method', ''), message.get('params', {}))
+            events.append(event)
+            for callback in self._subscribers:
+                callback(*event)
+
+        return events
+
+
+class DownloadTracker:
+    """
+    Segue i download tramite gli eventi CDP downloadWillBegin/downloadProgress
+
+    Ogni download usa una directory nuova e vuota, così il path del file è noto
+    esattamente e l'eventuale polling di fallback non vede file di altri download.
+    """
+
+    def __init__(self, driver, events: DevToolsEventLog, base_path: str):
+        """
+        Args:
+            driver: WebDriver Chrome
+            events: Lettore degli eventi CDP
+            base_path: Directory della run in cui creare le directory dei singoli download
+        """
+        self.driver = driver
+        self.events = events
+        self.base_path = base_path
+        self.download_dir = base_path
+        self._downloads: Dict[str, Dict[str, Any]] = {}
+        events.subscribe(self._on_event)
+
+    def _on_event(self, method: str, params: Dict[str, Any]):
+        """Aggiorna lo stato dei download dagli eventi Page.* / Browser.*"""
+        if method.endswith('.downloadWillBegin'):
+            self._downloads[params['guid']] = {
+                'filename': params.get('suggestedFilename'),
+                'state': 'inProgress',
+                'received': 0,
+            }
+        elif method.endswith('.downloadProgress'):
+            download = self._downloads.setdefault(params['guid'], {'filename': None})
+            download['state'] = params.get('state')
+            download['received'] = params.get('receivedBytes', 0)
+
+    def prepare(self) -> str:
+        """
+        Crea la directory del prossimo download e la imposta su Chrome
+
+        Returns:
+            La directory in cui finirà il file
+        """
+        # Scarta gli eventi dei download precedenti
+        self.events.poll()
+        self._downloads.clear()
+
+        self.download_dir = tempfile.mkdtemp(prefix='download_', dir=self.base_path)
+        try:
+            self.driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+                'behavior': 'allow',
+                'downloadPath': self.download_dir,
+                'eventsEnabled': True,
+            })
+        except Exception as e:
+            # Chrome continuerà a scaricare nella directory della run
+            print(f"⚠ Impossibile impostare la directory di download via CDP: {e}")
+            self.download_dir = self.base_path
+
+        return self.download_dir
+
+    def wait_for_download(self, start_timeout: float, complete_timeout: float) -> Optional[str]:
+        """
+        Attende il completamento del download seguendo gli eventi CDP
+
+        Args:
+            start_timeout: Secondi massimi per l'inizio del download
+            complete_timeout: Secondi massimi per il completamento
+
+        Returns:
+            Path del file scaricato, oppure None se gli eventi non sono disponibili
+            o il download non è stato segnalato (in tal caso usare il polling)
+        """
+        start = time.monotonic()
+
+        while self.events.available:
+            self.events.poll()
+            elapsed = time.monotonic() - start
+
+            for download in self._downloads.values():
+                if download['state'] == 'completed' and download.get('filename'):
+                    path = os.path.join(self.download_dir, download['filename'])
+                    # Il rename da .crdownload può arrivare subito dopo l'evento
+                    for _ in range(20):
+                        if os.path.exists(path):
+                            print(f"✓ Download completato in {elapsed:.1f}s ({download['received']} bytes, evento CDP)")
+                            return path
+                        time.sleep(0.1)
+                    return None
+                if download['state'] == 'canceled':
+                    print("Errore: download annullato dal browser")
+                    return None
+
+            # Eventi download assenti (versioni di Chrome che non li inoltrano alla pagina):
+            # in una directory dedicata un file senza .crdownload è già completo
+            if not self._downloads:
+                finished = self._finished_files()
+                if finished:
+                    print(f"✓ Download completato in {elapsed:.1f}s (file rilevato nella directory)")
+                    return finished[0]
+
+            if not self._downloads and elapsed > start_timeout:
+                print("⚠ Nessun evento di download ricevuto, passo al controllo della directory")
+                return None
+            if elapsed > start_timeout + complete_timeout:
+                print("⚠ Timeout: download non completato")
+                return None
+
+            time.sleep(0.1)
+
+        return None
+
+    def _finished_files(self) -> List[str]:
+        """File completati nella directory del download corrente (solo se non ci sono .crdownload)"""
+        if self.download_dir == self.base_path:
+            return []
+        names = os.listdir(self.download_dir)
+        if not names or any(name.endswith('.crdownload') for name in names):
+            return []
+        return [os.path.join(self.download_dir, name) for name in names]
+
+    def poll_directory(self, before_files: set, start_timeout: float, complete_timeout: float) -> Optional[str]:
+        """
+        Fallback: cerca il nuovo file nella directory del download e attende che sia completo
+
+        Args:
+            before_files: File presenti prima del click
+            start_timeout: Secondi massimi per la comparsa del file
+            complete_timeout: Secondi massimi per il completamento
+
+        Returns:
+            Path del file scaricato, oppure None
+        """
+        start = time.monotonic()
+        last_size = -1
+
+        while time.monotonic() - start < start_timeout + complete_timeout:
+            time.sleep(0.25)
+            new_files = [
+                os.path.join(self.download_dir, name)
+                for name in os.listdir(self.download_dir)
+                if os.path.join(self.download_dir, name) not in before_files
+            ]
+
+            if not new_files:
+                if time.monotonic() - start > start_timeout:
+                    print("Errore: Nessun nuovo file trovato nella directory di download")
+                    return None
+                continue
+
+            # Finché esiste un .crdownload Chrome sta ancora scrivendo
+            if any(f.endswith('.crdownload') for f in new_files):
+                continue
+
+            downloaded_file = new_files[0]
+            try:
+                current_size = os.path.getsize(downloaded_file)
+            except OSError:
+                continue
+
+            # Dimensione stabile tra due controlli consecutivi: download completo
+            if current_size == last_size:
+                print(f"✓ Download completato ({current_size} bytes)")
+                return downloaded_file
+            last_size = current_size
+
+        print("⚠ Timeout: il download non è stato completato")
+        return None
@@ -0,0 +1,118 @@
+"""
+Lettura in streaming dei report Excel (xlsx e xls), a batch di righe
+
+Il parser dipende dal formato riconosciuto dai primi byte (vedi
+report_artifact.sniff_format), non dall'estensione: un xlsx salvato come .xls
+viene letto direttamente con openpyxl, senza tentare prima xlrd. Le righe
+vengono restituite man mano, senza costruire un DataFrame dell'intero foglio:
+
+- xlsx: openpyxl in modalità read_only sul file su disco (né il file né il foglio
+  vengono caricati in memoria)
+- xls: xlrd sul file su disco (mappato in memoria) con caricamento dei fogli su richiesta
+
+Come pd.read_excel(header=0) la prima riga del foglio è l'intestazione e non
+viene restituita, e le righe vuote in fondo al foglio vengono scartate.
+"""
+from typing import Any, Iterable, Iterator, List
+
+
+# Righe per batch
+BATCH_SIZE = 5000
+# Righe iniziali usate come intestazione (come pd.read_excel)
+EXCEL_HEADER_ROWS = 1
+
+
+def xlsx_rows(path: str) -> Iterator[List[Any]]:
+    """
+    Righe del primo foglio di un file xlsx (openpyxl read_only)
+
+    Args:
+        path: File xlsx
+
+    Yields:
+        Valori delle celle di una riga (None per le celle vuote)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        # Le dimensioni dichiarate dagli export sono spesso sbagliate: si leggono le celle presenti
+        worksheet.reset_dimensions()
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def xls_rows(path: str) -> Iterator[List[Any]]:
+    """
+    Righe del primo foglio di un file xls (xlrd)
+
+    Le date vengono convertite in datetime e le celle di errore diventano vuote.
+
+    Args:
+        path: File xls
+
+    Yields:
+        Valori delle celle di una riga (None per le celle vuote)
+    """
+    import xlrd
+
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for idx in range(sheet.nrows):
+            values = sheet.row_values(idx)
+            types = sheet.row_types(idx)
+            row = []
+            for value, cell_type in zip(values, types):
+                if cell_type == xlrd.XL_CELL_DATE:
+                    value = xlrd.xldate_as_datetime(value, book.datemode)
+                elif cell_type == xlrd.XL_CELL_BOOLEAN:
+                    value = bool(value)
+                elif cell_type in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                    value = None
+                row.append(value)
+            yield row
+    finally:
+        book.release_resources()
+
+
+def _is_empty(row: List[Any]) -> bool:
+    return all(value is None or value == '' for value in row)
+
+
+def batched(
+    rows: Iterable[List[Any]],
+    batch_size: int = BATCH_SIZE,
+    header_rows: int = EXCEL_HEADER_ROWS
+) -> Iterator[List[List[Any]]]:
+    """
+    Raggruppa le righe in batch, saltando l'intestazione e le righe vuote finali
+
+    Args:
+        rows: Righe lette dal foglio
+        batch_size: Righe per batch
+        header_rows: Righe iniziali da saltare
+
+    Yields:
+        Liste di al massimo batch_size righe
+    """
+    batch: List[List[Any]] = []
+    # Righe vuote in attesa: vengono restituite solo se dopo c'è una riga con dati
+    pending_empty: List[List[Any]] = []
+    for idx, row in enumerate(rows):
+        if idx < header_rows:
+            continue
+        if _is_empty(row):
+            pending_empty.append(row)
+            continue
+        for pending in pending_empty + [row]:
+            batch.append(pending)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        pending_empty = []
+    if batch:
+        yield batch
@@ -0,0 +1,167 @@
+"""
+Export diretto via HTTP dopo il login nel browser ("fast export")
+
+Dopo login e sblocco PIN i cookie della sessione Selenium vengono copiati in
+una requests.Session che chiama direttamente l'endpoint di export del report,
+saltando menu, selezione locale, date picker e "Aggiornamento dati".
+Se la risposta non è un export valido, il chiamante torna al percorso UI.
+"""
+import os
+import re
+import tempfile
+from datetime import date
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config_manager import ConfigManager
+from .report_artifact import FORMAT_HTML, FORMAT_XLS, FORMAT_XLSX, HEAD_BYTES, sniff_format
+
+
+# Adapter condiviso da tutte le sessioni del processo: le connessioni HTTP(S) verso
+# iPratico vengono riutilizzate tra locali, mentre ogni account mantiene i propri cookie
+_SHARED_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+
+
+def new_http_session() -> requests.Session:
+    """Crea una requests.Session con cookie propri che usa il pool di connessioni condiviso"""
+    session = requests.Session()
+    session.mount('https://', _SHARED_ADAPTER)
+    session.mount('http://', _SHARED_ADAPTER)
+    return session
+
+
+def looks_like_export(content: bytes) -> bool:
+    """Verifica che il contenuto sia un file Excel o una tabella HTML esportata"""
+    format = sniff_format(content[:HEAD_BYTES])
+    if format in (FORMAT_XLS, FORMAT_XLSX):
+        return True
+    return format == FORMAT_HTML and b'<table' in content.lower()
+
+
+class FastExporter:
+    """Scarica il report chiamando direttamente l'endpoint di export con i cookie del browser"""
+
+    def __init__(self, config_manager: ConfigManager, download_path: str):
+        """
+        Inizializza l'exporter
+
+        Args:
+            config_manager: Gestore della configurazione (sezione "fast_export")
+            download_path: Directory in cui salvare i file scaricati
+        """
+        self.config = config_manager.get_fast_export_config()
+        self.download_path = download_path
+        self.session = new_http_session()
+
+    @property
+    def enabled(self) -> bool:
+        """True se il fast export è abilitato e configurato"""
+        return bool(self.config.get('enabled') and self.config.get('url'))
+
+    def load_cookies(self, driver):
+        """
+        Copia i cookie della sessione Selenium nella sessione HTTP
+
+        Args:
+            driver: WebDriver autenticato
+        """
+        self.session.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+        self.session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent")
+
+    def _locale_id(self, locale_selector: Optional[str]) -> Optional[str]:
+        """Estrae l'ID del locale dal selettore CSS (regex locale_id_regex)"""
+        if not locale_selector:
+            return ''
+        match = re.search(self.config.get('locale_id_regex', r'(\d+)'), locale_selector)
+        return match.group(1) if match else None
+
+    def _build_params(self, locale_id: str, date_start: date, date_end: date) -> Dict[str, Any]:
+        """Compila i parametri della richiesta dal template in configurazione"""
+        date_format = self.config.get('date_format', '%d/%m/%Y')
+        values = {
+            'date_start': date_start.strftime(date_format),
+            'date_end': date_end.strftime(date_format),
+            'date_start_iso': date_start.isoformat(),
+            'date_end_iso': date_end.isoformat(),
+            'locale_id': locale_id,
+        }
+        params = {}
+        for key, template in self.config.get('params', {}).items():
+            value = str(template).format(**values)
+            # Parametri vuoti (es. locale di default) non vengono inviati
+            if value:
+                params[key] = value
+        return params
+
+    def export(self, locale_selector: Optional[str], date_start: date, date_end: date) -> Optional[str]:
+        """
+        Scarica il report direttamente dall'endpoint di export
+
+        Args:
+            locale_selector: Selettore CSS del locale (l'ID viene estratto con locale_id_regex)
+            date_start: Data di inizio del report
+            date_end: Data di fine del report
+
+        Returns:
+            Path del file scaricato, oppure None se l'endpoint non ha restituito un export valido
+        """
+        locale_id = self._locale_id(locale_selector)
+        if locale_id is None:
+            print(f"⚠ Fast export: impossibile ricavare l'ID del locale da '{locale_selector}'")
+            return None
+
+        url = self.config['url']
+        method = self.config.get('method', 'GET').upper()
+        params = self._build_params(locale_id, date_start, date_end)
+
+        try:
+            print(f"⚡ Fast export: {method} {url} {params}")
+            response = self.session.request(
+                method,
+                url,
+                params=params if method == 'GET' else None,
+                data=params if method != 'GET' else None,
+                timeout=self.config.get('timeout', 60),
+                allow_redirects=False
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"⚠ Fast export fallito: {e}")
+            return None
+
+        # Redirect (tipicamente al login) o errore: l'endpoint non è più quello atteso
+        if response.status_code != 200:
+            print(f"⚠ Fast export: risposta inattesa (status {response.status_code})")
+            return None
+
+        if not looks_like_export(response.content):
+            content_type = response.headers.get('Content-Type', '?')
+            print(f"⚠ Fast export: la risposta non è un export valido (Content-Type: {content_type})")
+            return None
+
+        filename = self._filename(response, locale_id, date_start)
+        target_dir = tempfile.mkdtemp(prefix='export_', dir=self.download_path)
+        path = os.path.join(target_dir, filename)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+
+        print(f"✓ Fast export completato: {filename} ({len(response.content)} bytes)")
+        return path
+
+    def _filename(self, response, locale_id: str, date_start: date) -> str:
+        """Nome del file dall'header Content-Disposition, altrimenti dal template in configurazione"""
+        disposition = response.headers.get('Content-Disposition', '')
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition)
+        if match:
+            return os.path.basename(match.group(1))
+
+        template = self.config.get('filename', 'export_{locale_id}_{date}.xls')
+        return template.format(locale_id=locale_id or 'default', date=date_start.isoformat())
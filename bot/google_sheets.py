@@ -2,37 +2,64 @@
 Modulo per scrivere dati su Google Sheets
 """
 import os
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Callable, Optional, List, Tuple, Union
 import pytz
 import gspread
-from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
 from google.oauth2.credentials import Credentials as UserCredentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import pandas as pd
-from bs4 import BeautifulSoup
 
-
-# Scopes necessari per l'accesso a Google Sheets
-SCOPES = [
-    'https://www.googleapis.com/auth/spreadsheets',
-    'https://www.googleapis.com/auth/drive.file'
-]
+from .report_artifact import FORMAT_HTML, ReportArtifact
+from .sheet_fingerprint import hash_rows, can_diff, changed_row_ranges, invalidate, record
+from .sheet_values import dataframe_to_values
+from .sheet_content import content_hash, is_unchanged, forget, remember
+from .sheets_batch import (
+    resize_request, clear_values_request, update_cells_requests, text_cell_request, split_batches
+)
+from .sheets_history import (
+    SPREADSHEET_CELL_LIMIT, DEFAULT_MAX_CELLS_PER_TAB, new_partition, period_label, tag_rows, tab_name,
+    current_tab, needs_rollover, next_start_row, resize_rows_requests, clear_rows_request, shift_partitions
+)
+from .rate_limit import READ, WRITE
+from .sheets_client import SCOPES, SharedSheetsClient, get_shared_client
+from .timings import StepTimer, timed_step
 
 
 class GoogleSheetsUploader:
     """Gestisce la scrittura di dati su Google Sheets"""
 
-    def __init__(self):
-        """Inizializza l'uploader di Google Sheets"""
+    def __init__(self, timer: Optional[StepTimer] = None):
+        """
+        Inizializza l'uploader di Google Sheets
+
+        Args:
+            timer: Registro dei tempi delle fasi (opzionale, condivisibile con lo scraper)
+        """
         self.client = None
         self.credentials = None
-
+        # Client condiviso del processo (solo con il service account)
+        self.shared: Optional[SharedSheetsClient] = None
+        self.timer = timer or StepTimer()
+        # Righe e colonne dell'ultimo file letto da write_excel_to_sheet (None se la lettura è fallita)
+        self.last_read: Optional[dict] = None
+        # True se l'ultimo write_excel_to_sheet ha trovato i dati già presenti (solo timestamp aggiornato)
+        self.skipped_unchanged = False
+        # Ultimo file letto e valori pronti per Google Sheets (riusati dallo storico)
+        self._values: Optional[tuple] = None
+
+    @timed_step('sheets_auth', stage='sheets')
     def authenticate_service_account(self, credentials_file: str = 'credentials.json') -> bool:
         """
         Autentica usando un Service Account (consigliato per automazione)
 
+        Il client autorizzato è condiviso da tutti gli uploader del processo: le
+        credenziali vengono lette e il token richiesto una sola volta, poi
+        rinnovato solo prima della scadenza.
+
         Args:
             credentials_file: Path al file JSON del service account
 
@@ -40,17 +67,18 @@ class GoogleSheetsUploader:
             True se l'autenticazione ha successo, False altrimenti
         """
         try:
-            if not os.path.exists(credentials_file):
-                print(f"File {credentials_file} non trovato")
+            shared = get_shared_client(credentials_file)
+            if shared is None:
                 return False
 
-            credentials = Credentials.from_service_account_file(
-                credentials_file,
-                scopes=SCOPES
-            )
-
-            self.client = gspread.authorize(credentials)
-            print("Autenticazione Service Account completata")
+            refreshed = shared.ensure_token()
+            self.shared = shared
+            self.client = shared.client
+            self.credentials = shared.credentials
+            if refreshed:
+                print("Autenticazione Service Account completata")
+            else:
+                print("✓ Client Google condiviso riutilizzato (token ancora valido)")
             return True
 
         except Exception as e:
@@ -119,165 +147,139 @@ class GoogleSheetsUploader:
 
     def write_excel_to_sheet(
         self,
-        excel_file: str,
+        excel_file: Union[str, ReportArtifact],
         sheet_id: str,
         worksheet_name: str = None,
-        clear_existing: bool = True
+        clear_existing: bool = True,
+        fingerprint: Optional[SimpleNamespace] = None,
+        content: Optional[SimpleNamespace] = None,
+        before_write: Optional[Callable[[], None]] = None
     ) -> bool:
         """
         Scrive i dati di un file Excel su Google Sheets
 
         Args:
-            excel_file: Path al file Excel
+            excel_file: Path al file Excel, oppure ReportArtifact dello scraper (già verificato, letto una volta sola)
             sheet_id: ID del Google Sheet
             worksheet_name: Nome del foglio (se None, usa il primo)
             clear_existing: Se True, cancella i dati esistenti prima di scrivere
+            fingerprint: Impronta dell'ultima griglia scritta (vedi sheet_fingerprint); se presente e
+                valida vengono riscritte solo le righe cambiate, e l'impronta viene aggiornata
+            content: Hash dell'ultimo contenuto scritto (vedi sheet_content); se i dati sono
+                identici viene aggiornato solo il timestamp e skipped_unchanged diventa True
+            before_write: Chiamata prima di modificare i dati del foglio, per rendere persistente
+                l'invalidazione di impronta e hash (se fallisce il foglio non viene scritto)
 
         Returns:
             True se la scrittura ha successo, False altrimenti
         """
+        self.last_read = None
+        self.skipped_unchanged = False
         try:
             if not self.client:
                 print("Client non autenticato")
                 return False
 
-            if not os.path.exists(excel_file):
-                print(f"File Excel {excel_file} non trovato")
+            data = self._read_values(excel_file)
+            if data is None:
                 return False
+            cols = len(data[0]) if data else 0
+            # Il timestamp va nella colonna dopo i dati
+            grid_rows, grid_cols = max(len(data), 1), cols + 1
 
-            # Leggi il file Excel
-            print(f"Lettura file Excel: {excel_file}")
-
-            # Verifica prima se è un file HTML mascherato da Excel
-            is_html = False
-            try:
-                with open(excel_file, 'r', encoding='utf-8') as f:
-                    first_line = f.readline().strip()
-                    if first_line.startswith('<html') or first_line.startswith('<!DOCTYPE'):
-                        is_html = True
-                        print("  ℹ File rilevato come HTML (tabella HTML esportata)")
-            except:
-                pass
-
-            df = None
-
-            if is_html:
-                # Il file è HTML con una tabella - leggi direttamente con BeautifulSoup
-                try:
-                    print("  Tentativo lettura come tabella HTML...")
-
-                    # Leggi il file HTML
-                    with open(excel_file, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-
-                    # Parsing HTML con BeautifulSoup
-                    soup = BeautifulSoup(html_content, 'lxml')
-
-                    # Trova tutte le tabelle
-                    tables = soup.find_all('table')
-                    if not tables:
-                        raise Exception("Nessuna tabella trovata nel file HTML")
-
-                    print(f"  ℹ Trovate {len(tables)} tabelle nel file HTML")
-
-                    # Estrai TUTTE le righe da TUTTE le tabelle
-                    data_rows = []
-                    total_rows_per_table = []
-
-                    for idx, table in enumerate(tables):
-                        table_rows = []
-                        for row in table.find_all('tr'):
-                            cells = row.find_all(['td', 'th'])  # Include sia <td> che <th>
-                            row_data = [cell.get_text(strip=True) for cell in cells]
-                            if row_data:  # Solo se la riga ha dati
-                                table_rows.append(row_data)
-
-                        if table_rows:
-                            data_rows.extend(table_rows)
-                            total_rows_per_table.append(len(table_rows))
-                            print(f"    • Tabella #{idx}: {len(table_rows)} righe")
-
-                    if not data_rows:
-                        raise Exception("Nessuna riga trovata nelle tabelle HTML")
-
-                    print(f"  ✓ Estratte {len(data_rows)} righe totali da {len(tables)} tabelle")
-                    print(f"  ℹ Dati copiati esattamente come nell'HTML originale (TUTTE le tabelle, TUTTE le righe)")
-
-                    # Converti in DataFrame senza header
-                    df = pd.DataFrame(data_rows)
-
-                except Exception as e:
-                    print(f"  ✗ Lettura HTML fallita: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    raise Exception(f"Impossibile leggere la tabella HTML: {e}")
-            else:
-                # Determina l'engine corretto in base all'estensione
-                # A volte i file hanno estensione sbagliata, quindi prova multipli engine
-                file_ext = os.path.splitext(excel_file)[1].lower()
-
-                if file_ext == '.xls':
-                    # Prova prima xlrd per vecchio formato Excel (97-2003)
+            # Apri il Google Sheet
+            with self.timer.step('sheets_open', 'sheets'):
+                print(f"Apertura Google Sheet: {sheet_id}")
+                if self.shared:
+                    self.shared.ensure_token()
+                    spreadsheet = self.shared.open_spreadsheet(sheet_id, on_retry=self.timer.count_retry)
+                else:
+                    spreadsheet = self.client.open_by_key(sheet_id)
+
+            # Seleziona o crea il worksheet (già della dimensione dei dati)
+            with self.timer.step('sheets_worksheet', 'sheets'):
+                if worksheet_name and self.shared:
+                    worksheet = self.shared.worksheet(spreadsheet, worksheet_name, grid_rows, grid_cols,
+                                                      on_retry=self.timer.count_retry)
+                elif worksheet_name:
                     try:
-                        print("  Tentativo lettura con engine xlrd...")
-                        df = pd.read_excel(excel_file, sheet_name=0, engine='xlrd')
-                        print("  ✓ Lettura con xlrd riuscita")
-                    except Exception as e:
-                        print(f"  ✗ xlrd fallito ({str(e)[:50]}), provo openpyxl...")
-                        try:
-                            # Potrebbe essere un .xlsx mascherato da .xls
-                            df = pd.read_excel(excel_file, sheet_name=0, engine='openpyxl')
-                            print("  ✓ Lettura con openpyxl riuscita (file .xlsx mascherato da .xls)")
-                        except Exception as e2:
-                            print(f"  ✗ openpyxl fallito ({str(e2)[:50]})")
-                            raise Exception(f"Impossibile leggere il file Excel: {e}")
-                elif file_ext == '.xlsx':
-                    # Nuovo formato Excel richiede openpyxl
-                    df = pd.read_excel(excel_file, sheet_name=0, engine='openpyxl')
+                        worksheet = spreadsheet.worksheet(worksheet_name)
+                    except gspread.exceptions.WorksheetNotFound:
+                        print(f"Foglio '{worksheet_name}' non trovato, lo creo ({grid_rows}x{grid_cols})...")
+                        worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=grid_rows, cols=grid_cols)
                 else:
-                    # Prova senza specificare l'engine
-                    df = pd.read_excel(excel_file, sheet_name=0)
-
-            if df is None:
-                raise Exception("Impossibile leggere il file")
+                    worksheet = spreadsheet.sheet1
 
-            # Apri il Google Sheet
-            print(f"Apertura Google Sheet: {sheet_id}")
-            spreadsheet = self.client.open_by_key(sheet_id)
-
-            # Seleziona o crea il worksheet
-            if worksheet_name:
-                try:
-                    worksheet = spreadsheet.worksheet(worksheet_name)
-                except gspread.exceptions.WorksheetNotFound:
-                    print(f"Foglio '{worksheet_name}' non trovato, lo creo...")
-                    worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=26)
-            else:
-                worksheet = spreadsheet.sheet1
-
-            # Cancella dati esistenti se richiesto
+            # Aggiungi un timestamp nella prima riga (fuso orario italiano)
+            italy_tz = pytz.timezone('Europe/Rome')
+            timestamp = datetime.now(italy_tz).strftime("%Y-%m-%d %H:%M:%S")
+            note = f'Aggiornato: {timestamp}'
+            timestamp_request = text_cell_request(worksheet.id, 0, grid_cols - 1, note)
+
+            # Dati identici all'ultima scrittura: si aggiorna solo il timestamp
+            digest = content_hash(data) if content is not None else None
+            if clear_existing and is_unchanged(content, digest, worksheet.id, len(data), cols,
+                                               worksheet.row_count, worksheet.col_count):
+                print(f"ℹ Dati invariati dall'ultimo upload ({len(data)} righe): aggiorno solo il timestamp")
+                self._batch_update(spreadsheet, [timestamp_request])
+                self.skipped_unchanged = True
+                return True
+            forget(content)
+
+            # Modalità incrementale: righe cambiate rispetto all'ultima scrittura
+            hashes = hash_rows(data) if fingerprint is not None else None
+            ranges = None
+            if clear_existing and data and can_diff(fingerprint, worksheet.id, cols):
+                ranges = changed_row_ranges(fingerprint, hashes)
+            # Finché la scrittura non è completa il contenuto del foglio non è noto
+            invalidate(fingerprint)
+
+            # Un'unica batchUpdate: griglia, valori e timestamp
+            requests = []
+            new_grid = None
             if clear_existing:
-                print("Cancellazione dati esistenti...")
-                worksheet.clear()
+                # Griglia della forma esatta dei dati: le righe sparite vengono eliminate
+                new_grid = (grid_rows, grid_cols)
+            elif len(data) > worksheet.row_count or grid_cols > worksheet.col_count:
+                new_grid = (max(grid_rows, worksheet.row_count), max(grid_cols, worksheet.col_count))
+            if new_grid:
+                requests.append(resize_request(worksheet.id, *new_grid))
+
+            if ranges is None:
+                if clear_existing:
+                    print("Cancellazione dati esistenti...")
+                    requests.append(clear_values_request(worksheet.id))
+                print(f"Scrittura di {len(data)} righe su Google Sheets...")
+                ranges = [(0, len(data))] if data else []
+            else:
+                changed = sum(end - start for start, end in ranges)
+                print(f"Aggiornamento incrementale: {changed}/{len(data)} righe cambiate in {len(ranges)} blocchi")
 
-            # Prepara i dati per Google Sheets
-            # Copia esattamente i dati così come sono (senza aggiungere header extra)
-            data = df.values.tolist()
+            for start, end in ranges:
+                requests.extend(update_cells_requests(worksheet.id, data, start, end))
 
-            # Converti eventuali NaN in stringhe vuote
-            data = [['' if pd.isna(cell) else cell for cell in row] for row in data]
+            # Scrivi il timestamp in una cella separata (colonna dopo i dati)
+            print(f"Timestamp in {rowcol_to_a1(1, grid_cols)}")
+            requests.append(timestamp_request)
 
-            # Scrivi i dati
-            print(f"Scrittura di {len(data)} righe su Google Sheets...")
-            worksheet.update('A1', data)
+            # Le richieste possono essere divise in più batchUpdate: se la scrittura si interrompe
+            # a metà, impronta e hash salvati non devono più sembrare validi
+            if before_write is not None:
+                before_write()
 
-            # Aggiungi un timestamp nella prima riga (fuso orario italiano)
-            italy_tz = pytz.timezone('Europe/Rome')
-            timestamp = datetime.now(italy_tz).strftime("%Y-%m-%d %H:%M:%S")
-            note = f'Aggiornato: {timestamp}'
-            # Scrivi il timestamp in una cella separata (ad esempio ultima colonna)
-            last_col = len(data[0]) + 1 if data else 1
-            worksheet.update_acell(f'{chr(64 + last_col)}1', note)
+            try:
+                self._batch_update(spreadsheet, requests, rows=sum(end - start for start, end in ranges))
+            except Exception:
+                # Foglio eliminato o rinominato durante l'esecuzione: il prossimo upload lo riapre
+                if self.shared:
+                    self.shared.forget(sheet_id)
+                raise
+            if self.shared and new_grid:
+                self.shared.set_grid_size(worksheet, *new_grid)
+
+            record(fingerprint, worksheet.id, cols, hashes)
+            if clear_existing:
+                remember(content, worksheet.id, len(data), cols, digest)
 
             print(f"✓ Dati scritti con successo su Google Sheets!")
             print(f"  Righe: {len(data)}")
@@ -290,3 +292,206 @@ class GoogleSheetsUploader:
             import traceback
             traceback.print_exc()
             return False
+
+    def append_history(
+        self,
+        excel_file: Union[str, ReportArtifact],
+        sheet_id: str,
+        key: Tuple[int, date, date],
+        index: SimpleNamespace,
+        worksheet_name: str = 'Storico iPratico',
+        max_cells: int = DEFAULT_MAX_CELLS_PER_TAB
+    ) -> bool:
+        """
+        Aggiunge il report al foglio storico, con la data del report nella prima colonna
+
+        Un periodo nuovo viene scritto con batchUpdate dopo l'ultimo periodo del
+        foglio storico (o nel successivo se quello attuale supererebbe max_cells):
+        la griglia viene portata a una dimensione assoluta e le righe hanno una
+        posizione nota, quindi un retry non duplica il periodo. Un periodo già
+        presente nell'indice viene sostituito sul posto, modificando solo le sue righe.
+
+        Args:
+            excel_file: Path al file Excel, oppure ReportArtifact dello scraper
+            sheet_id: ID del Google Sheet
+            key: Periodo del report (id locale, data inizio, data fine)
+            index: Indice dello storico del Google Sheet (vedi sheets_history), aggiornato in memoria
+            worksheet_name: Nome del primo foglio storico
+            max_cells: Celle di un foglio storico oltre le quali si passa al successivo
+
+        Returns:
+            True se la scrittura ha successo, False altrimenti
+        """
+        try:
+            if not self.shared:
+                print("Lo storico richiede l'autenticazione con service account")
+                return False
+
+            data = self._read_values(excel_file)
+            if data is None:
+                return False
+            if not data:
+                print("ℹ Report vuoto: niente da aggiungere allo storico")
+                return True
+            rows = tag_rows(data, period_label(key[1], key[2]))
+            width = max(len(row) for row in rows)
+
+            self.shared.ensure_token()
+            spreadsheet = self.shared.open_spreadsheet(sheet_id, on_retry=self.timer.count_retry)
+
+            # Un solo upload alla volta per Google Sheet: le posizioni dei giorni dipendono l'una dall'altra
+            with index.lock:
+                partition = index.partitions.get(key)
+                if partition is not None:
+                    self._replace_history(spreadsheet, partition, rows, width, index)
+                else:
+                    index.partitions[key] = self._append_history(
+                        spreadsheet, rows, width, index, worksheet_name, max_cells
+                    )
+            return True
+
+        except Exception as e:
+            print(f"Errore durante la scrittura dello storico: {e}")
+            import traceback
+            traceback.print_exc()
+            if self.shared:
+                self.shared.forget(sheet_id)
+            return False
+
+    def _replace_history(self, spreadsheet, partition: SimpleNamespace, rows: List[list], width: int,
+                         index: SimpleNamespace):
+        """Sostituisce sul posto le righe di un periodo già presente nello storico"""
+        worksheet = self.shared.worksheet(spreadsheet, partition.worksheet_name, len(rows), width,
+                                          on_retry=self.timer.count_retry)
+        delta = len(rows) - partition.rows
+        print(f"Storico '{partition.worksheet_name}': sostituzione di {partition.rows} righe "
+              f"da riga {partition.start_row + 1} con {len(rows)} righe")
+
+        requests = resize_rows_requests(worksheet.id, partition, len(rows))
+        new_cols = max(worksheet.col_count, width)
+        if width > worksheet.col_count:
+            requests.insert(0, resize_request(worksheet.id, worksheet.row_count, width))
+        requests.append(clear_rows_request(worksheet.id, partition.start_row, partition.start_row + len(rows)))
+        requests.extend(update_cells_requests(worksheet.id, rows, 0, len(rows), row_offset=partition.start_row))
+
+        self._batch_update(spreadsheet, requests, rows=len(rows))
+        self.shared.set_grid_size(worksheet, worksheet.row_count + delta, new_cols)
+
+        shift_partitions(index, partition.worksheet_name, partition.start_row, delta)
+        partition.rows = len(rows)
+        partition.cols = width
+        partition.dirty = True
+
+    def _append_history(self, spreadsheet, rows: List[list], width: int, index: SimpleNamespace,
+                        base_name: str, max_cells: int) -> SimpleNamespace:
+        """Accoda un periodo nuovo all'ultimo foglio storico (o al successivo se pieno)"""
+        number = current_tab(index, base_name)
+        worksheet = self.shared.worksheet(spreadsheet, tab_name(base_name, number), 1, width,
+                                          on_retry=self.timer.count_retry)
+        if needs_rollover(worksheet.row_count, worksheet.col_count, len(rows), width, max_cells):
+            # Il Google Sheet intero ha un limite di celle: il nuovo foglio deve starci
+            worksheets = self.shared.limiter.call(READ, spreadsheet.worksheets, on_retry=self.timer.count_retry)
+            used = sum(ws.row_count * ws.col_count for ws in worksheets)
+            if used + (len(rows) + 1) * width > SPREADSHEET_CELL_LIMIT:
+                raise Exception(f"Google Sheet pieno ({used} celle): serve un nuovo file per lo storico")
+            number += 1
+            print(f"Storico: '{worksheet.title}' ha {worksheet.row_count * worksheet.col_count} celle, "
+                  f"passo a '{tab_name(base_name, number)}'")
+            worksheet = self.shared.worksheet(spreadsheet, tab_name(base_name, number), 1, width,
+                                              on_retry=self.timer.count_retry)
+
+        # Dimensione assoluta e righe a partire da start_row: a differenza di
+        # values.append, ripetere la chiamata dopo un 5xx o un timeout non accoda
+        # il periodo una seconda volta
+        start_row = next_start_row(index, worksheet.title)
+        new_rows = max(worksheet.row_count, start_row + len(rows))
+        new_cols = max(worksheet.col_count, width)
+        print(f"Storico '{worksheet.title}': aggiunta di {len(rows)} righe da riga {start_row + 1}")
+        requests = []
+        if (new_rows, new_cols) != (worksheet.row_count, worksheet.col_count):
+            requests.append(resize_request(worksheet.id, new_rows, new_cols))
+        requests.extend(update_cells_requests(worksheet.id, rows, 0, len(rows), row_offset=start_row))
+
+        self._batch_update(spreadsheet, requests, rows=len(rows))
+        self.shared.set_grid_size(worksheet, new_rows, new_cols)
+
+        return new_partition(worksheet.title, start_row, len(rows), width)
+
+    def _read_values(self, excel_file: Union[str, ReportArtifact]) -> Optional[List[list]]:
+        """
+        Legge il report e prepara i valori per Google Sheets (una sola volta per file)
+
+        Args:
+            excel_file: Path al file Excel o ReportArtifact
+
+        Returns:
+            Righe da scrivere, None se il file non esiste
+        """
+        if self._values is not None and self._values[0] is excel_file:
+            return self._values[1]
+
+        if isinstance(excel_file, ReportArtifact):
+            artifact = excel_file
+        elif os.path.exists(excel_file):
+            artifact = ReportArtifact.open(excel_file)
+        else:
+            print(f"File Excel {excel_file} non trovato")
+            return None
+
+        self.last_read = None
+        print(f"Lettura file Excel: {artifact.path}")
+        if artifact.format == FORMAT_HTML:
+            print("  ℹ File rilevato come HTML (tabella HTML esportata)")
+        if not artifact.complete:
+            print(f"  ⚠ Il file sembra incompleto ({artifact.format}), provo comunque a leggerlo")
+
+        # Lettura a batch: ogni batch viene convertito (celle vuote, numeri all'italiana,
+        # date) colonna per colonna senza costruire il DataFrame dell'intero report
+        with self.timer.step('sheets_read', 'sheets') as step:
+            try:
+                if artifact.dataframe is not None:
+                    data = dataframe_to_values(artifact.dataframe)
+                else:
+                    data = []
+                    for batch in artifact.batches():
+                        data.extend(dataframe_to_values(pd.DataFrame(batch)))
+            except Exception as e:
+                print(f"  ✗ Lettura {artifact.format} fallita: {e}")
+                import traceback
+                traceback.print_exc()
+                raise Exception(f"Impossibile leggere il file ({artifact.format}): {e}")
+
+            # Righe di lunghezze diverse (es. tabelle HTML diverse): stessa larghezza per tutte
+            width = max((len(row) for row in data), default=0)
+            for row in data:
+                if len(row) < width:
+                    row.extend([''] * (width - len(row)))
+            step.update(bytes=artifact.size, rows=len(data))
+
+        self.last_read = {
+            'rows': artifact.rows, 'cols': artifact.cols,
+            'format': artifact.format, 'sha256': artifact.sha256,
+        }
+        self._values = (excel_file, data)
+        return data
+
+    def _batch_update(self, spreadsheet, requests: List[dict], rows: int = 0):
+        """
+        Invia le richieste con spreadsheets.batchUpdate (più chiamate solo se superano MAX_BATCH_BYTES)
+
+        Args:
+            spreadsheet: Spreadsheet gspread
+            requests: Richieste in ordine di esecuzione
+            rows: Righe scritte (per i tempi delle fasi)
+        """
+        batches = split_batches(requests)
+        for idx, (batch, size) in enumerate(batches, 1):
+            with self.timer.step('sheets_batch_update', 'sheets') as step:
+                print(f"batchUpdate {idx}/{len(batches)}: {len(batch)} richieste, {size} bytes")
+                if self.shared:
+                    # Quota di scrittura condivisa, con retry su 429/5xx
+                    self.shared.limiter.call(WRITE, spreadsheet.batch_update, {'requests': batch},
+                                             on_retry=self.timer.count_retry)
+                else:
+                    spreadsheet.batch_update({'requests': batch})
+                step.update(bytes=size, rows=rows if idx == 1 else None)
@@ -0,0 +1,198 @@
+"""
+Lettura in streaming degli export iPratico in formato tabella HTML
+
+Gli export "Excel" di iPratico sono spesso pagine HTML con una o più tabelle.
+Invece di caricare tutto il file in una stringa e costruire l'albero completo
+con BeautifulSoup, il file viene letto con lxml.iterparse: ogni <tr> viene
+convertito in una riga appena chiuso e poi rimosso dall'albero, così la memoria
+usata dal parsing resta costante qualunque sia la dimensione dell'export.
+
+Il risultato è identico alla lettura precedente con BeautifulSoup:
+- tutte le tabelle in ordine di apertura, con tutte le righe (anche annidate)
+- celle <td> e <th> della riga, comprese quelle di eventuali tabelle annidate
+- testo della cella come get_text(strip=True): ogni frammento di testo viene
+  ripulito dagli spazi e i frammenti non vuoti vengono concatenati; commenti e
+  contenuto di script, style, template, rt e rp vengono ignorati
+- righe senza celle scartate
+"""
+from contextlib import nullcontext
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+from lxml import etree
+
+
+# Tag il cui testo non fa parte di get_text() in BeautifulSoup
+SKIPPED_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+# Righe per batch restituito da HtmlTableStream.batches
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _collect_text(element, parts: List[str], skip: bool):
+    """Aggiunge a parts i frammenti di testo di element (senza la sua coda)"""
+    if not isinstance(element.tag, str):
+        # Commenti e processing instruction: solo la coda è testo
+        return
+
+    skip = skip or element.tag in SKIPPED_TEXT_TAGS
+    if not skip and element.text:
+        parts.append(element.text)
+    for child in element:
+        _collect_text(child, parts, skip)
+        if not skip and child.tail:
+            parts.append(child.tail)
+
+
+def cell_text(cell) -> str:
+    """
+    Testo di una cella, come BeautifulSoup get_text(strip=True)
+
+    Args:
+        cell: Elemento <td> o <th>
+
+    Returns:
+        Frammenti di testo ripuliti dagli spazi e concatenati
+    """
+    parts: List[str] = []
+    _collect_text(cell, parts, False)
+    return ''.join(part.strip() for part in parts if part.strip())
+
+
+class _RowFrame:
+    """<tr> aperto: tabelle che lo contengono, cella e righe annidate in ordine di apertura"""
+
+    __slots__ = ('tables', 'row', 'children')
+
+    def __init__(self, tables: Tuple[int, ...]):
+        self.tables = tables
+        self.row: Optional[List[str]] = None
+        self.children: List['_RowFrame'] = []
+
+    def walk(self) -> Iterator['_RowFrame']:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class HtmlTableStream:
+    """Legge le righe di tutte le tabelle di un file HTML a batch, con memoria limitata"""
+
+    def __init__(self, source: Union[str, BinaryIO], batch_size: int = DEFAULT_BATCH_SIZE, encoding: str = 'utf-8'):
+        """
+        Inizializza il lettore
+
+        Args:
+            source: Path del file HTML o file già aperto in lettura binaria
+            batch_size: Righe per batch
+            encoding: Codifica del file
+        """
+        self.source = source
+        self.batch_size = max(1, batch_size)
+        self.encoding = encoding
+        # Righe trovate per ogni tabella, in ordine di apertura (aggiornato durante la lettura)
+        self.table_rows: List[int] = []
+        self.total_rows = 0
+
+    def batches(self) -> Iterator[List[List[str]]]:
+        """
+        Restituisce le righe delle tabelle a batch
+
+        Le righe di una tabella annidata vengono restituite sia dentro la tabella
+        esterna sia, alla chiusura di quest'ultima, come tabella a sé: come
+        soup.find_all('table') seguito da table.find_all('tr').
+
+        Yields:
+            Liste di al massimo batch_size righe (ogni riga è una lista di stringhe)
+        """
+        self.table_rows = []
+        self.total_rows = 0
+
+        batch: List[List[str]] = []
+        # Tabelle aperte (indici in ordine di apertura) e righe delle tabelle annidate
+        open_tables: List[int] = []
+        nested_rows = {}
+        # <tr> aperti (None fuori dalle tabelle): le righe annidate escono in ordine di apertura come in find_all
+        open_rows: List[Optional[_RowFrame]] = []
+
+        source = open(self.source, 'rb') if isinstance(self.source, str) else nullcontext(self.source)
+        with source as f:
+            for event, element in etree.iterparse(
+                f, events=('start', 'end'), html=True, encoding=self.encoding, huge_tree=True
+            ):
+                tag = element.tag
+                if event == 'start':
+                    if tag == 'table':
+                        open_tables.append(len(self.table_rows))
+                        if len(open_tables) > 1:
+                            nested_rows[open_tables[-1]] = []
+                        self.table_rows.append(0)
+                    elif tag == 'tr':
+                        frame = None
+                        if open_tables:
+                            frame = _RowFrame(tuple(open_tables))
+                            outer = self._outer_frame(open_rows)
+                            if outer is not None:
+                                outer.children.append(frame)
+                        open_rows.append(frame)
+                    continue
+
+                if tag == 'tr':
+                    frame = open_rows.pop()
+                    if self._outer_frame(open_rows) is not None:
+                        # Il contenuto serve ancora alla riga esterna
+                        if frame is not None:
+                            frame.row = [cell_text(cell) for cell in element.iter('td', 'th')]
+                        continue
+                    if frame is None:
+                        self._release(element)
+                        continue
+
+                    frame.row = [cell_text(cell) for cell in element.iter('td', 'th')]
+
+                    for row_frame in frame.walk():
+                        if not row_frame.row:
+                            continue
+                        for table in row_frame.tables:
+                            self.table_rows[table] += 1
+                        batch.append(row_frame.row)
+                        for table in row_frame.tables[1:]:
+                            nested_rows[table].append(row_frame.row)
+                    self._release(element)
+
+                elif tag == 'table':
+                    open_tables.pop()
+                    if open_tables:
+                        continue
+                    # Tabella esterna chiusa: seguono le tabelle annidate, in ordine di apertura
+                    for table in sorted(nested_rows):
+                        batch.extend(nested_rows[table])
+                    nested_rows.clear()
+                    self._release(element)
+
+                else:
+                    continue
+
+                while len(batch) >= self.batch_size:
+                    self.total_rows += self.batch_size
+                    yield batch[:self.batch_size]
+                    batch = batch[self.batch_size:]
+
+        if batch:
+            self.total_rows += len(batch)
+            yield batch
+
+    @staticmethod
+    def _outer_frame(open_rows: List[Optional[_RowFrame]]) -> Optional[_RowFrame]:
+        """<tr> aperto più interno dentro una tabella (None se non ce ne sono)"""
+        for frame in reversed(open_rows):
+            if frame is not None:
+                return frame
+        return None
+
+    @staticmethod
+    def _release(element):
+        """Libera un elemento già letto e i fratelli che lo precedono"""
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
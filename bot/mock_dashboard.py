@@ -0,0 +1,532 @@
+"""
+Finta dashboard iPratico servita in locale, per benchmark e test dello scraper
+
+Riproduce le parti della dashboard usate dal bot, con la stessa struttura DOM
+dei selettori di config.json: form di login, popup segreto con PIN aperto dal
+footer, menu laterale, dropdown dei locali, date picker, pulsante
+"Aggiornamento dati" ed export (tabella HTML come iPratico, oppure XLSX).
+
+Latenze e fallimenti sono configurabili per endpoint:
+
+    {
+        "latency": {"login": 0.5, "page": 0.2, "pin": 0.3, "refresh": 1.5, "export": 0.8},
+        "failure_rate": {"refresh": 0.1, "export": 0.05},
+        "truncate_rate": 0.0,      # export HTML troncati (file incompleti)
+        "session_ttl": 0,          # secondi di validità della sessione (0 = illimitata)
+        "export_format": "html",   # html oppure xlsx
+        "rows": 200,               # righe del report
+        "pin": null,               # PIN accettato (null = qualsiasi)
+        "seed": 42
+    }
+
+Uso da riga di comando:
+
+    python -m bot.mock_dashboard [--port 8765] [--config mock.json]
+"""
+import io
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+DEFAULT_MOCK_CONFIG: Dict[str, Any] = {
+    'latency': {'login': 0.3, 'page': 0.1, 'pin': 0.2, 'refresh': 1.0, 'export': 0.5},
+    'failure_rate': {},
+    'truncate_rate': 0.0,
+    'session_ttl': 0,
+    'export_format': 'html',
+    'rows': 200,
+    'pin': None,
+    'seed': 42,
+    'locali': {'101': 'Centro', '102': 'Stazione', '103': 'Mare'},
+}
+
+PRODOTTI = ['Caffè', 'Cappuccino', 'Cornetto', 'Spremuta', 'Tramezzino', 'Acqua 0,5L',
+            'Birra media', 'Spritz', 'Panino', 'Insalata', 'Pizza margherita', 'Tiramisù']
+OPERATORI = ['Mario', 'Giulia', 'Luca', 'Sara', 'Paolo']
+
+
+def report_rows(locale_id: str, date_start: str, date_end: str, rows: int):
+    """Righe del report "prodotti per operatore", deterministiche per locale e date"""
+    rng = random.Random(f"{locale_id}|{date_start}|{date_end}")
+    result = []
+    for _ in range(rows):
+        quantita = rng.randint(1, 60)
+        prezzo = rng.choice([1.2, 1.5, 2.5, 3.0, 4.5, 6.0, 8.5])
+        result.append([
+            rng.choice(OPERATORI),
+            rng.choice(PRODOTTI),
+            quantita,
+            f"{quantita * prezzo:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
+        ])
+    return result
+
+
+def build_html_export(locale_name: str, date_start: str, date_end: str, rows) -> bytes:
+    """Export come lo restituisce iPratico: HTML con intestazione e tabella dati"""
+    body = [
+        '<html><head><meta charset="utf-8"></head><body>',
+        '<table><tr><th>Locale</th><th>Dal</th><th>Al</th></tr>',
+        f'<tr><td>{locale_name}</td><td>{date_start}</td><td>{date_end}</td></tr></table>',
+        '<table><tr><th>Operatore</th><th>Prodotto</th><th>Quantità</th><th>Totale €</th></tr>',
+    ]
+    for row in rows:
+        body.append('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>')
+    body.append('</table></body></html>')
+    return '\n'.join(body).encode('utf-8')
+
+
+def build_xlsx_export(rows) -> bytes:
+    """Export in formato XLSX"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Operatore', 'Prodotto', 'Quantità', 'Totale €'])
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>iPratico (mock)</title>
+<style>
+  body {{ font-family: sans-serif; margin: 0; }}
+  #sidebar-menu {{ float: left; width: 200px; background: #eee; min-height: 100vh; }}
+  .content-page {{ margin-left: 210px; padding: 10px; }}
+  footer div {{ padding: 10px; color: #888; cursor: default; }}
+  .modal {{ position: fixed; top: 20%; left: 30%; background: #fff; border: 1px solid #999; padding: 20px; }}
+  .daterangepicker {{ position: absolute; top: 80px; left: 260px; background: #fff; border: 1px solid #999; padding: 10px; }}
+</style></head>
+<body>
+<div id="wrapper">
+  <div id="sidebar-menu"><ul>
+    <li><a href="#" id="menu-report">Report</a>
+      <ul style="display:none" id="submenu-report">
+        {submenu}
+      </ul>
+    </li>
+  </ul></div>
+  <div class="content-page">
+    <div class="container">{content}</div>
+    <footer><div>© iPratico mock</div></footer>
+  </div>
+</div>
+<div id="modal-training" class="modal" style="display:none">
+  <div class="modal-dialog"><div>
+    <div class="modal-body"><div><input type="password" id="pin-input"></div><p id="pin-error"></p></div>
+    <div class="modal-footer">
+      <button class="btn btn-default" onclick="hideModal()">Annulla</button>
+      <button class="btn btn-success btn-attiva-pin" id="pin-confirm">Attiva</button>
+    </div>
+  </div></div>
+</div>
+{body_end}
+<script>
+  var footerClicks = 0, footerTimer = null;
+  document.querySelector('footer div').addEventListener('click', function() {{
+    footerClicks++;
+    clearTimeout(footerTimer);
+    footerTimer = setTimeout(function() {{ footerClicks = 0; }}, 2000);
+    if (footerClicks >= 3) {{ footerClicks = 0; document.getElementById('modal-training').style.display = 'block'; }}
+  }});
+  function hideModal() {{ document.getElementById('modal-training').style.display = 'none'; }}
+  document.getElementById('pin-confirm').addEventListener('click', function() {{
+    fetch('/api/pin', {{method: 'POST', body: JSON.stringify({{pin: document.getElementById('pin-input').value}})}})
+      .then(function(r) {{
+        if (r.ok) {{ hideModal(); }} else {{ document.getElementById('pin-error').textContent = 'PIN errato'; }}
+      }});
+  }});
+  document.getElementById('menu-report').addEventListener('click', function(e) {{
+    e.preventDefault();
+    var submenu = document.getElementById('submenu-report');
+    setTimeout(function() {{ submenu.style.display = 'block'; }}, 100);
+  }});
+</script>
+{script}
+</body></html>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Login iPratico (mock)</title></head>
+<body>
+<form id="loginForm" method="post" action="/it/auth/login">
+  <div class="row"><h3>iPratico</h3></div>
+  <div class="row"><p>{message}</p></div>
+  <div class="form-group"><div><input type="text" name="username" placeholder="Username"></div></div>
+  <div class="form-group"><div><input type="password" name="password" placeholder="Password"></div></div>
+  <div class="row submit-row"><div><button type="submit">Accedi</button></div></div>
+</form>
+</body></html>
+"""
+
+REPORT_CONTENT = """
+<div class="row"><h2>Prodotti per operatore</h2></div>
+<div class="row"><p>Report / Vendite</p></div>
+<div class="row"><div class="col"><div class="card"><div class="toolbar">
+  <div class="tool"><div class="dropdown">
+    <button id="locale-button">Locale: {default_name}</button>
+    <div id="locale-menu" style="display:none">{options}</div>
+  </div></div>
+  <div class="tool"><input id="filtro-data" readonly value=""></div>
+  <div class="tool"></div>
+  <div class="tool"><button id="btn-aggiorna">Aggiornamento dati</button></div>
+</div></div></div></div>
+<div class="row" id="report-area"></div>
+"""
+
+DATEPICKER = """
+<div class="daterangepicker dropdown-menu ltr show-calendar opensright" style="display:none">
+  <div class="calendar left"><div class="daterangepicker_input"><input type="text" name="daterangepicker_start"></div></div>
+  <div class="calendar right"><div class="daterangepicker_input"><input type="text" name="daterangepicker_end"></div></div>
+  <div class="ranges"><div>
+    <button class="applyBtn btn btn-sm btn-success">Applica</button>
+    <button class="cancelBtn btn btn-sm btn-default">Annulla</button>
+  </div></div>
+</div>
+"""
+
+REPORT_SCRIPT = """
+<script>
+  var selectedLocale = '{default_id}';
+  var picker = document.querySelector('body > div.daterangepicker');
+  var filtro = document.getElementById('filtro-data');
+  var localeMenu = document.getElementById('locale-menu');
+  document.getElementById('locale-button').addEventListener('click', function() {{
+    localeMenu.style.display = localeMenu.style.display === 'none' ? 'block' : 'none';
+  }});
+  Array.prototype.forEach.call(localeMenu.querySelectorAll('a'), function(a) {{
+    a.addEventListener('click', function(e) {{
+      e.preventDefault();
+      selectedLocale = a.getAttribute('data-id');
+      document.getElementById('locale-button').textContent = 'Locale: ' + a.textContent;
+    }});
+  }});
+  filtro.addEventListener('click', function() {{ picker.style.display = 'block'; }});
+  picker.querySelector('.applyBtn').addEventListener('click', function() {{
+    var start = picker.querySelector('.calendar.left input').value;
+    var end = picker.querySelector('.calendar.right input').value || start;
+    filtro.value = start + ' - ' + end;
+    picker.style.display = 'none';
+  }});
+  document.getElementById('btn-aggiorna').addEventListener('click', function() {{
+    var area = document.getElementById('report-area');
+    area.innerHTML = '<p>Caricamento...</p>';
+    var dates = filtro.value.split(' - ');
+    var params = {{locale: selectedLocale, data_inizio: dates[0] || '', data_fine: dates[1] || dates[0] || ''}};
+    fetch('/api/refresh', {{method: 'POST', body: JSON.stringify(params)}})
+      .then(function(r) {{ if (!r.ok) {{ throw new Error('HTTP ' + r.status); }} return r.json(); }})
+      .then(function(data) {{
+        area.innerHTML = '<p>' + data.rows + ' righe</p>' +
+          '<a id="ToolTables_employeeProductOrdered_0" class="DTTT_button" href="#">Excel</a>';
+        document.getElementById('ToolTables_employeeProductOrdered_0').addEventListener('click', function(e) {{
+          e.preventDefault();
+          window.location.href = '/export?' + new URLSearchParams(params).toString();
+        }});
+      }})
+      .catch(function(err) {{ area.innerHTML = '<p class="error">Errore: ' + err.message + '</p>'; }});
+  }});
+</script>
+"""
+
+
+class MockDashboardServer:
+    """Server HTTP locale che simula la dashboard iPratico"""
+
+    def __init__(self, mock_config: Optional[Dict[str, Any]] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Inizializza il server (non ancora avviato)
+
+        Args:
+            mock_config: Latenze, fallimenti e dati (vedi DEFAULT_MOCK_CONFIG)
+            host: Indirizzo di ascolto
+            port: Porta (0 = porta libera scelta dal sistema)
+        """
+        self.config = dict(DEFAULT_MOCK_CONFIG, **(mock_config or {}))
+        self.rng = random.Random(self.config.get('seed'))
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def dashboard_config(self) -> Dict[str, str]:
+        """Sezione "dashboard" di config.json che punta a questo server"""
+        return {
+            'base_url': self.base_url,
+            'login_url': f"{self.base_url}/it/auth/login",
+            'after_login_url': f"{self.base_url}/it/locale",
+        }
+
+    def start(self):
+        """Avvia il server in un thread in background"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-dashboard', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ferma il server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def should_fail(self, endpoint: str) -> bool:
+        """Estrae se l'endpoint deve fallire (failure_rate)"""
+        rate = self.config.get('failure_rate', {}).get(endpoint, 0)
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def should_truncate(self) -> bool:
+        rate = self.config.get('truncate_rate', 0)
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def delay(self, endpoint: str):
+        """Simula la latenza dell'endpoint"""
+        latency = self.config.get('latency', {}).get(endpoint, 0)
+        if latency:
+            time.sleep(latency)
+
+    def new_session(self, username: str) -> str:
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = {'username': username, 'pin': False, 'created': time.monotonic()}
+        return token
+
+    def get_session(self, token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Sessione valida associata al cookie, oppure None (scaduta o inesistente)"""
+        with self.lock:
+            session = self.sessions.get(token or '')
+            ttl = self.config.get('session_ttl', 0)
+            if session and ttl and time.monotonic() - session['created'] > ttl:
+                del self.sessions[token]
+                return None
+            return session
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _token(self) -> Optional[str]:
+                for part in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = part.strip().partition('=')
+                    if name == 'mock_session':
+                        return value
+                return None
+
+            def _send(self, status: int, body: bytes, content_type: str = 'text/html; charset=utf-8',
+                      headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+                self._send(302, b'', headers=dict(headers or {}, Location=location))
+
+            def _fail(self, endpoint: str) -> bool:
+                if server.should_fail(endpoint):
+                    server.count(f"{endpoint}_failed")
+                    self._send(500, b'<html><body>Errore interno (simulato)</body></html>')
+                    return True
+                return False
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+
+            def _page(self, content: str, body_end: str = '', script: str = '') -> bytes:
+                submenu = ''.join(f'<li><a href="#">Voce {n}</a></li>' for n in range(1, 9))
+                submenu += '<li><a href="/it/report">Prodotti per operatore</a></li>'
+                return PAGE_TEMPLATE.format(
+                    submenu=submenu, content=content, body_end=body_end, script=script
+                ).encode('utf-8')
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                session = server.get_session(self._token())
+
+                if url.path in ('/', '/it/auth/login'):
+                    server.count('login_page')
+                    server.delay('page')
+                    self._send(200, LOGIN_PAGE.format(message='Accedi').encode('utf-8'))
+                    return
+
+                if url.path == '/it/locale':
+                    server.count('page')
+                    if not session:
+                        self._redirect('/it/auth/login')
+                        return
+                    server.delay('page')
+                    if self._fail('page'):
+                        return
+                    content = '<div class="row"><h2>Dashboard</h2></div>'
+                    self._send(200, self._page(content))
+                    return
+
+                if url.path == '/it/report':
+                    server.count('report_page')
+                    if not session:
+                        self._redirect('/it/auth/login')
+                        return
+                    server.delay('page')
+                    if self._fail('page'):
+                        return
+                    locali = server.config['locali']
+                    default_id = next(iter(locali))
+                    options = ''.join(
+                        f'<a href="#" id="locale-{locale_id}" data-id="{locale_id}">{name}</a><br>'
+                        for locale_id, name in locali.items()
+                    )
+                    content = REPORT_CONTENT.format(default_name=locali[default_id], options=options)
+                    script = REPORT_SCRIPT.format(default_id=default_id)
+                    self._send(200, self._page(content, body_end=DATEPICKER, script=script))
+                    return
+
+                if url.path == '/export':
+                    server.count('export')
+                    if not session:
+                        self._redirect('/it/auth/login')
+                        return
+                    server.delay('export')
+                    if self._fail('export'):
+                        return
+                    self._export(parse_qs(url.query))
+                    return
+
+                self._send(404, b'<html><body>Not found</body></html>')
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                session = server.get_session(self._token())
+
+                if url.path == '/it/auth/login':
+                    server.count('login')
+                    form = parse_qs(self._body().decode('utf-8'))
+                    server.delay('login')
+                    if self._fail('login'):
+                        return
+                    username = form.get('username', [''])[0]
+                    if not username or not form.get('password', [''])[0]:
+                        self._send(200, LOGIN_PAGE.format(message='Credenziali errate').encode('utf-8'))
+                        return
+                    token = server.new_session(username)
+                    self._redirect('/it/locale', {'Set-Cookie': f'mock_session={token}; Path=/; HttpOnly'})
+                    return
+
+                if url.path == '/api/pin':
+                    server.count('pin')
+                    payload = json.loads(self._body() or b'{}')
+                    server.delay('pin')
+                    if not session:
+                        self._send(401, b'{}', 'application/json')
+                        return
+                    if self._fail('pin'):
+                        return
+                    expected = server.config.get('pin')
+                    if expected and payload.get('pin') != expected:
+                        self._send(403, b'{}', 'application/json')
+                        return
+                    session['pin'] = True
+                    self._send(200, b'{"ok": true}', 'application/json')
+                    return
+
+                if url.path == '/api/refresh':
+                    server.count('refresh')
+                    self._body()
+                    server.delay('refresh')
+                    if not session:
+                        self._send(401, b'{}', 'application/json')
+                        return
+                    if self._fail('refresh'):
+                        return
+                    body = json.dumps({'rows': server.config['rows']}).encode('utf-8')
+                    self._send(200, body, 'application/json')
+                    return
+
+                self._send(404, b'{}', 'application/json')
+
+            def _export(self, query: Dict[str, Any]):
+                locali = server.config['locali']
+                locale_id = query.get('locale', [next(iter(locali))])[0]
+                today = date.today().strftime('%d/%m/%Y')
+                date_start = query.get('data_inizio', [today])[0]
+                date_end = query.get('data_fine', [date_start])[0]
+                export_format = query.get('format', [server.config.get('export_format', 'html')])[0]
+                rows = report_rows(locale_id, date_start, date_end, server.config['rows'])
+
+                try:
+                    stamp = datetime.strptime(date_start, '%d/%m/%Y').date().isoformat()
+                except ValueError:
+                    stamp = 'report'
+                if export_format == 'xlsx':
+                    content = build_xlsx_export(rows)
+                    content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                    filename = f"export_{locale_id}_{stamp}.xlsx"
+                else:
+                    # iPratico esporta una tabella HTML con estensione .xls
+                    content = build_html_export(locali.get(locale_id, locale_id), date_start, date_end, rows)
+                    if server.should_truncate():
+                        server.count('export_truncated')
+                        content = content[:len(content) // 2]
+                    content_type = 'application/vnd.ms-excel'
+                    filename = f"export_{locale_id}_{stamp}.xls"
+
+                self._send(200, content, content_type,
+                           {'Content-Disposition': f'attachment; filename="{filename}"'})
+
+        return Handler
+
+    def export_url(self, **params) -> str:
+        """URL dell'export (per configurare il fast export)"""
+        return f"{self.base_url}/export" + (f"?{urlencode(params)}" if params else '')
+
+
+def main():
+    """Avvia la finta dashboard finché non viene interrotta"""
+    parser = argparse.ArgumentParser(description='Finta dashboard iPratico locale')
+    parser.add_argument('--host', default='127.0.0.1', help='Indirizzo di ascolto')
+    parser.add_argument('--port', type=int, default=8765, help='Porta')
+    parser.add_argument('--config', help='File JSON con latenze, fallimenti e dati')
+    args = parser.parse_args()
+
+    mock_config = None
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            mock_config = json.load(f)
+
+    server = MockDashboardServer(mock_config, host=args.host, port=args.port)
+    print(f"Finta dashboard iPratico su {server.base_url}/it/auth/login (Ctrl+C per fermare)")
+    print("Locali: " + ', '.join(f"#locale-{locale_id}" for locale_id in server.config['locali']))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Blocco delle richieste di rete superflue e misura del traffico della dashboard
+
+Il blocco usa Network.setBlockedURLs di DevTools (pattern URL, più pattern
+derivati dai tipi di risorsa), le preferenze di Chrome per disattivare le
+immagini e la page load strategy "eager". NetworkStats legge gli eventi
+Network.* dal performance log per misurare byte trasferiti e richieste.
+
+Uso da riga di comando per confrontare il caricamento con e senza blocco:
+
+    python -m bot.network [--url URL] [--runs N]
+"""
+import time
+import argparse
+from typing import Any, Dict, List
+
+from .config_manager import ConfigManager
+from .devtools import DevToolsEventLog
+
+
+# Network.setBlockedURLs accetta solo pattern URL: i tipi di risorsa vengono
+# tradotti nelle estensioni corrispondenti
+RESOURCE_TYPE_PATTERNS: Dict[str, List[str]] = {
+    'image': ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*'],
+    'font': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    'media': ['*.mp4*', '*.webm*', '*.mp3*', '*.ogg*', '*.wav*'],
+}
+
+
+def get_blocked_patterns(network_config: Dict[str, Any]) -> List[str]:
+    """Restituisce tutti i pattern URL da bloccare secondo la configurazione"""
+    patterns = list(network_config.get('blocked_url_patterns', []))
+    for resource_type in network_config.get('blocked_resource_types', []):
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+    return patterns
+
+
+def apply_lean_options(chrome_options, prefs: Dict[str, Any], network_config: Dict[str, Any]):
+    """
+    Applica le opzioni di caricamento leggero alle opzioni di Chrome (prima dell'avvio)
+
+    Args:
+        chrome_options: Options di Chrome
+        prefs: Dizionario delle preferenze di Chrome (modificato sul posto)
+        network_config: Sezione "network" della configurazione
+    """
+    if not network_config.get('block_requests', False):
+        return
+
+    if network_config.get('disable_images', True):
+        prefs['profile.managed_default_content_settings.images'] = 2
+
+    strategy = network_config.get('page_load_strategy')
+    if strategy:
+        chrome_options.page_load_strategy = strategy
+
+
+def apply_request_blocking(driver, network_config: Dict[str, Any]) -> int:
+    """
+    Attiva il blocco delle richieste via DevTools sul driver avviato
+
+    Args:
+        driver: WebDriver Chrome
+        network_config: Sezione "network" della configurazione
+
+    Returns:
+        Numero di pattern bloccati (0 se il blocco è disattivato o non supportato)
+    """
+    if not network_config.get('block_requests', False):
+        return 0
+
+    patterns = get_blocked_patterns(network_config)
+    if not patterns:
+        return 0
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        print(f"⚠ Blocco richieste non attivato: {e}")
+        return 0
+
+    print(f"Blocco richieste attivo ({len(patterns)} pattern)")
+    return len(patterns)
+
+
+class NetworkStats:
+    """Conta richieste, byte trasferiti e richieste bloccate dagli eventi Network.*"""
+
+    def __init__(self, events: DevToolsEventLog):
+        """
+        Args:
+            events: Lettore degli eventi CDP a cui sottoscriversi
+        """
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.failed = 0
+        events.subscribe(self._on_event)
+
+    def _on_event(self, method: str, params: Dict[str, Any]):
+        if method == 'Network.requestWillBeSent':
+            self.requests += 1
+        elif method == 'Network.loadingFinished':
+            self.bytes += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed':
+            if params.get('blockedReason'):
+                self.blocked += 1
+            else:
+                self.failed += 1
+
+    def summary(self) -> str:
+        """Riepilogo leggibile del traffico"""
+        return (f"{self.requests} richieste, {self.bytes / 1024:.0f} KB trasferiti, "
+                f"{self.blocked} bloccate, {self.failed} fallite")
+
+
+def page_load_ms(driver) -> float:
+    """Tempo di caricamento della pagina corrente (Navigation Timing), in millisecondi"""
+    return float(driver.execute_script(
+        "var t = performance.getEntriesByType('navigation')[0];"
+        "return t ? (t.loadEventEnd || t.domContentLoadedEventEnd) - t.startTime : 0;"
+    ))
+
+
+def measure_page(config: ConfigManager, url: str, block_requests: bool) -> Dict[str, float]:
+    """
+    Carica una pagina con un browser nuovo e misura tempo, richieste e byte
+
+    Args:
+        config: Gestore della configurazione
+        url: Pagina da caricare
+        block_requests: Se attivare il blocco delle richieste
+
+    Returns:
+        Dizionario con wall_s, load_ms, requests, kb, blocked
+    """
+    # Import locale: scraper importa questo modulo
+    from .scraper import DashboardScraper
+
+    network_config = dict(config.get_network_config(), block_requests=block_requests)
+    scraper = DashboardScraper(config, auth_manager=None)
+    scraper.network_config = network_config
+
+    try:
+        scraper.setup_driver()
+        # Scarta gli eventi generati all'avvio del browser
+        scraper.events.poll()
+        start = time.monotonic()
+        scraper.driver.get(url)
+        scraper.wait.until(lambda d: d.execute_script("return document.readyState") == 'complete')
+        wall = time.monotonic() - start
+        time.sleep(1)  # lascia arrivare gli ultimi eventi Network.loadingFinished
+        scraper.events.poll()
+        return {
+            'wall_s': wall,
+            'load_ms': page_load_ms(scraper.driver),
+            'requests': scraper.network_stats.requests,
+            'kb': scraper.network_stats.bytes / 1024,
+            'blocked': scraper.network_stats.blocked,
+        }
+    finally:
+        scraper.close()
+
+
+def main():
+    """Confronta il caricamento della dashboard con e senza blocco delle richieste"""
+    parser = argparse.ArgumentParser(description='Misura il traffico della dashboard con e senza blocco richieste')
+    parser.add_argument('--config', default='config.json', help='File di configurazione')
+    parser.add_argument('--url', help='Pagina da misurare (default: login_url)')
+    parser.add_argument('--runs', type=int, default=3, help='Ripetizioni per modalità')
+    args = parser.parse_args()
+
+    config = ConfigManager(args.config)
+    url = args.url or config.get_dashboard_config().get('login_url')
+
+    print(f"Misura di {url} ({args.runs} run per modalità)\n")
+    results = {}
+    for block in (False, True):
+        runs = [measure_page(config, url, block) for _ in range(args.runs)]
+        results[block] = {key: sum(r[key] for r in runs) / len(runs) for key in runs[0]}
+
+    print(f"\n{'Modalità':<12}{'Wall (s)':>10}{'Load (ms)':>11}{'Richieste':>11}{'KB':>10}{'Bloccate':>10}")
+    for block, label in ((False, 'completo'), (True, 'con blocco')):
+        r = results[block]
+        print(f"{label:<12}{r['wall_s']:>10.2f}{r['load_ms']:>11.0f}{r['requests']:>11.0f}"
+              f"{r['kb']:>10.0f}{r['blocked']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
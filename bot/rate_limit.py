@@ -0,0 +1,190 @@
+"""
+Limitatore delle chiamate all'API di Google Sheets (quote per service account)
+
+Google applica quote al minuto separate per letture e scritture, per ogni
+service account. Tutti gli uploader del processo passano dallo stesso
+limitatore (uno per service account): un token bucket per tipo di chiamata
+distribuisce le richieste nel minuto e, se l'API risponde comunque 429 o 5xx,
+la chiamata viene ripetuta rispettando Retry-After oppure con un backoff
+esponenziale con jitter. I tempi di attesa sono conteggiati per il riepilogo.
+"""
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from gspread.exceptions import APIError
+
+
+READ = 'read'
+WRITE = 'write'
+
+# Quote predefinite per service account (richieste al minuto) e retry
+DEFAULT_RATE_LIMIT = {
+    'read_per_minute': 60,
+    'write_per_minute': 60,
+    'burst': 10,
+    'max_retries': 5,
+    'initial_backoff_s': 1.0,
+    'max_backoff_s': 64.0,
+}
+
+# Codici HTTP per cui la chiamata viene ripetuta
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_limiters_lock = threading.Lock()
+_limiters: Dict[str, 'SheetsRateLimiter'] = {}
+_settings: Dict[str, Any] = dict(DEFAULT_RATE_LIMIT)
+
+
+class TokenBucket:
+    """Token bucket thread-safe: rate token al secondo, al massimo capacity accumulati"""
+
+    def __init__(self, per_minute: float, capacity: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Prende un token, attendendo se necessario
+
+        Returns:
+            Secondi di attesa
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Svuota il bucket (dopo un 429 la quota del minuto è già esaurita)"""
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Secondi indicati dall'header Retry-After (se presente e numerico)"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class SheetsRateLimiter:
+    """Quote di lettura e scrittura di un service account, con retry su 429/5xx"""
+
+    def __init__(self, account: str, settings: Optional[Dict[str, Any]] = None):
+        """
+        Inizializza il limitatore
+
+        Args:
+            account: Service account a cui si riferiscono le quote
+            settings: Sezione "rate_limit" della configurazione di Google Sheets
+        """
+        settings = dict(DEFAULT_RATE_LIMIT, **(settings or {}))
+        self.account = account
+        self.max_retries = settings['max_retries']
+        self.initial_backoff = settings['initial_backoff_s']
+        self.max_backoff = settings['max_backoff_s']
+        self.buckets = {
+            READ: TokenBucket(settings['read_per_minute'], settings['burst']),
+            WRITE: TokenBucket(settings['write_per_minute'], settings['burst']),
+        }
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'throttled_s': 0.0, 'backoff_s': 0.0, 'retries': 0, 'rate_limited': 0}
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def call(self, kind: str, func: Callable, *args, on_retry: Optional[Callable[[], None]] = None, **kwargs):
+        """
+        Esegue una chiamata all'API rispettando la quota e ripetendola su 429/5xx
+
+        Args:
+            kind: READ o WRITE
+            func: Funzione gspread da chiamare
+            on_retry: Callback a ogni nuovo tentativo (es. StepTimer.count_retry)
+
+        Returns:
+            Il risultato di func
+        """
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            self._count(calls=1, throttled_s=bucket.acquire())
+            try:
+                return func(*args, **kwargs)
+            except (APIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                status = _status_code(e)
+                if isinstance(e, APIError) and status not in RETRY_STATUS:
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = _retry_after(e)
+                if delay is None:
+                    # Backoff esponenziale con jitter completo
+                    delay = random.uniform(0, min(self.max_backoff, self.initial_backoff * (2 ** attempt)))
+                if status == 429:
+                    bucket.drain()
+                    self._count(rate_limited=1)
+
+                attempt += 1
+                print(f"⚠ Google Sheets {status or type(e).__name__}: nuovo tentativo {attempt}/{self.max_retries} "
+                      f"tra {delay:.1f}s")
+                self._count(retries=1, backoff_s=delay)
+                if on_retry:
+                    on_retry()
+                time.sleep(delay)
+
+
+def configure_rate_limits(settings: Optional[Dict[str, Any]]):
+    """Imposta le quote usate dai limitatori creati da qui in poi (sezione google_sheets.rate_limit)"""
+    global _settings
+    with _limiters_lock:
+        _settings = dict(DEFAULT_RATE_LIMIT, **(settings or {}))
+
+
+def get_rate_limiter(account: str) -> SheetsRateLimiter:
+    """Limitatore condiviso del processo per un service account"""
+    with _limiters_lock:
+        limiter = _limiters.get(account)
+        if limiter is None:
+            limiter = SheetsRateLimiter(account, _settings)
+            _limiters[account] = limiter
+        return limiter
+
+
+def print_rate_limit_summary():
+    """Stampa chiamate, attese per quota e retry di ogni service account"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        stats = limiter.stats
+        if not stats['calls']:
+            continue
+        print(f"Google Sheets ({limiter.account}): {stats['calls']} chiamate, "
+              f"{stats['throttled_s']:.1f}s in attesa di quota, {stats['retries']} retry "
+              f"({stats['rate_limited']} per 429, {stats['backoff_s']:.1f}s di backoff)")
@@ -0,0 +1,278 @@
+"""
+Report scaricato da iPratico: formato, completezza e lettura a batch
+
+ReportArtifact viene creato dallo scraper appena il download termina e passato
+così com'è all'upload su Google Sheets:
+- il formato (tabella HTML, Excel 97 OLE2, xlsx ZIP) si riconosce dai primi byte
+- la completezza si verifica leggendo solo la coda del file (HTML, xlsx) o
+  l'intestazione e la FAT (xls); un formato non riconosciuto è incompleto
+- le righe vengono lette a batch direttamente dal file su disco, senza caricarlo
+  in memoria; l'hash è calcolato durante la lettura (HTML) o a blocchi (Excel);
+  righe, colonne e hash restano nell'oggetto
+"""
+import os
+import struct
+import hashlib
+from typing import Any, Iterator, List, Optional
+
+from .excel_stream import BATCH_SIZE, batched, xls_rows, xlsx_rows
+from .html_table import HtmlTableStream
+
+
+FORMAT_HTML = 'html'
+FORMAT_XLS = 'xls'
+FORMAT_XLSX = 'xlsx'
+FORMAT_UNKNOWN = 'unknown'
+
+# Firme dei formati Excel: OLE2 (xls) e ZIP (xlsx)
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+XLSX_MAGIC = b'PK\x03\x04'
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# Byte letti dall'inizio per riconoscere il formato
+HEAD_BYTES = 4096
+# Byte letti dalla fine per verificare che un export HTML sia completo
+HTML_TAIL_BYTES = 1024
+# Record finale di un archivio ZIP: 22 byte più un commento di al massimo 64 KB
+ZIP_EOCD_MAGIC = b'PK\x05\x06'
+ZIP_TAIL_BYTES = 22 + 65535
+# Intestazione OLE2 (xls): 512 byte, con le posizioni dei settori della FAT
+OLE2_HEADER_SIZE = 512
+# Settori della FAT elencati nell'intestazione (gli altri stanno nella DIFAT)
+OLE2_HEADER_FAT_SECTORS = 109
+# Valori speciali della FAT: settore libero e numeri di settore riservati
+OLE2_FREE_SECTOR = 0xFFFFFFFF
+OLE2_MAX_SECTOR = 0xFFFFFFFA
+
+# Blocchi usati per calcolare l'hash durante la lettura
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def sniff_format(head: bytes) -> str:
+    """
+    Riconosce il formato del report dai primi byte
+
+    Args:
+        head: Primi byte del file (almeno qualche centinaio)
+
+    Returns:
+        FORMAT_HTML, FORMAT_XLS, FORMAT_XLSX oppure FORMAT_UNKNOWN
+    """
+    if head.startswith(XLS_MAGIC):
+        return FORMAT_XLS
+    if head.startswith(XLSX_MAGIC):
+        return FORMAT_XLSX
+    text = head[len(UTF8_BOM):] if head.startswith(UTF8_BOM) else head
+    text = text.lstrip().lower()
+    if text.startswith(b'<html') or text.startswith(b'<!doctype'):
+        return FORMAT_HTML
+    return FORMAT_UNKNOWN
+
+
+def ole2_complete(f, size: int) -> bool:
+    """
+    Verifica che un file OLE2 (xls) non sia troncato
+
+    Legge l'intestazione e i settori della FAT elencati nell'intestazione: ogni
+    settore della FAT e ogni settore allocato deve iniziare prima della fine del
+    file. L'ultimo settore può essere più corto (alcuni programmi non scrivono il
+    padding finale).
+
+    Args:
+        f: File aperto in lettura binaria
+        size: Dimensione del file in byte
+
+    Returns:
+        True se tutti i settori usati sono presenti nel file
+    """
+    if size < OLE2_HEADER_SIZE:
+        return False
+    f.seek(0)
+    header = f.read(OLE2_HEADER_SIZE)
+    sector_shift = struct.unpack_from('<H', header, 0x1E)[0]
+    if sector_shift not in (9, 12):
+        return False
+    sector_size = 1 << sector_shift
+    fat_count = struct.unpack_from('<I', header, 0x2C)[0]
+    fat_sectors = struct.unpack_from(f'<{OLE2_HEADER_FAT_SECTORS}I', header, 0x4C)
+
+    def present(sector: int) -> bool:
+        # Il settore n inizia dopo l'intestazione, che occupa un settore
+        return (sector + 1) * sector_size < size
+
+    entries_per_sector = sector_size // 4
+    last_used = -1
+    for position, sector in enumerate(fat_sectors[:min(fat_count, OLE2_HEADER_FAT_SECTORS)]):
+        if sector > OLE2_MAX_SECTOR or not present(sector):
+            return False
+        f.seek((sector + 1) * sector_size)
+        fat = f.read(sector_size)
+        if len(fat) < sector_size:
+            return False
+        for idx, entry in enumerate(struct.unpack(f'<{entries_per_sector}I', fat)):
+            if entry != OLE2_FREE_SECTOR:
+                last_used = position * entries_per_sector + idx
+    return last_used < 0 or present(last_used)
+
+
+def _read_excel_rows(path: str) -> Iterator[List[Any]]:
+    """Righe (intestazione compresa) di un file letto con pd.read_excel e l'engine scelto da pandas"""
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=0, header=None)
+    df = df.astype(object).where(df.notna(), None)
+    for row in df.itertuples(index=False, name=None):
+        yield list(row)
+
+
+class _HashingReader:
+    """File in lettura che aggiorna lo SHA-256 con i byte letti (per lxml.iterparse)"""
+
+    def __init__(self, f, digest):
+        self._f = f
+        self._digest = digest
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self._digest.update(data)
+        return data
+
+
+class ReportArtifact:
+    """Report scaricato, con formato, completezza e risultato della lettura"""
+
+    def __init__(self, path: str, format: str, size: int, complete: bool):
+        """
+        Inizializza il report (usare ReportArtifact.open)
+
+        Args:
+            path: File scaricato
+            format: Formato riconosciuto dai primi byte
+            size: Dimensione in byte
+            complete: False se il file risulta troncato
+        """
+        self.path = path
+        self.format = format
+        self.size = size
+        self.complete = complete
+        # Valorizzati da batches() (il DataFrame solo da parse())
+        self.sha256: Optional[str] = None
+        self.rows: Optional[int] = None
+        self.cols: Optional[int] = None
+        self.dataframe = None
+
+    @classmethod
+    def open(cls, path: str) -> 'ReportArtifact':
+        """
+        Riconosce formato e completezza leggendo solo l'inizio e la fine del file
+
+        Args:
+            path: File scaricato
+
+        Returns:
+            ReportArtifact non ancora letto
+        """
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+            format = sniff_format(head)
+
+            if format == FORMAT_HTML:
+                f.seek(max(0, size - HTML_TAIL_BYTES))
+                complete = f.read().rstrip().lower().endswith(b'</html>')
+            elif format == FORMAT_XLSX:
+                f.seek(max(0, size - ZIP_TAIL_BYTES))
+                complete = ZIP_EOCD_MAGIC in f.read()
+            elif format == FORMAT_XLS:
+                complete = ole2_complete(f, size)
+            else:
+                # Download interrotto o pagina di errore: lo scraper riprova il download
+                complete = False
+
+        return cls(path, format, size, complete)
+
+    def tail(self, size: int = 50) -> str:
+        """Ultimi caratteri del file (per i messaggi sui file troncati)"""
+        with open(self.path, 'rb') as f:
+            f.seek(max(0, self.size - size))
+            return f.read().decode('utf-8', errors='ignore')
+
+    def batches(self, batch_size: int = BATCH_SIZE) -> Iterator[List[list]]:
+        """
+        Legge le righe del report a batch, senza caricare il file in memoria
+
+        Il parser dipende dal formato (HTML in streaming con lxml, xlsx con
+        openpyxl read_only, xls con xlrd on_demand, tutti dal file su disco); al
+        termine sono valorizzati righe, colonne e hash del file.
+
+        Args:
+            batch_size: Righe per batch
+
+        Yields:
+            Liste di righe (le righe possono avere lunghezze diverse)
+        """
+        digest = hashlib.sha256()
+        rows = cols = 0
+
+        if self.format == FORMAT_HTML:
+            # Tabella HTML esportata: righe in streaming (TUTTE le tabelle, TUTTE le righe)
+            with open(self.path, 'rb') as f:
+                stream = HtmlTableStream(_HashingReader(f, digest), batch_size=batch_size)
+                for batch in stream.batches():
+                    rows += len(batch)
+                    cols = max([cols] + [len(row) for row in batch])
+                    yield batch
+                # Il parser può fermarsi prima della fine del file: l'hash copre tutto il contenuto
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+
+            if not stream.table_rows:
+                raise Exception("Nessuna tabella trovata nel file HTML")
+
+            print(f"  ℹ Trovate {len(stream.table_rows)} tabelle nel file HTML")
+            for idx, table_rows in enumerate(stream.table_rows):
+                if table_rows:
+                    print(f"    • Tabella #{idx}: {table_rows} righe")
+
+            if not rows:
+                raise Exception("Nessuna riga trovata nelle tabelle HTML")
+
+            print(f"  ✓ Estratte {rows} righe totali da {len(stream.table_rows)} tabelle")
+        else:
+            # Il parser dipende dal formato reale, non dall'estensione del file, e legge
+            # dal disco (i parser Excel non leggono il file in sequenza: l'hash si calcola a parte)
+            with open(self.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+
+            reader = {FORMAT_XLS: xls_rows, FORMAT_XLSX: xlsx_rows}.get(self.format)
+            if reader is None:
+                # Formato non riconosciuto dai primi byte: come prima, si prova pandas
+                print("  ℹ Formato non riconosciuto, tentativo di lettura con pandas")
+                reader = _read_excel_rows
+
+            for batch in batched(reader(self.path), batch_size):
+                rows += len(batch)
+                cols = max([cols] + [len(row) for row in batch])
+                yield batch
+            print(f"  ✓ Lettura {self.format} riuscita ({rows} righe)")
+
+        self.sha256 = digest.hexdigest()
+        self.rows, self.cols = rows, cols
+
+    def parse(self):
+        """
+        Legge il report in un DataFrame senza header (vedi batches)
+
+        Il risultato viene conservato: chiamate successive non rileggono il file.
+
+        Returns:
+            DataFrame con i dati del report
+        """
+        if self.dataframe is not None:
+            return self.dataframe
+
+        import pandas as pd
+
+        self.dataframe = pd.DataFrame([row for batch in self.batches() for row in batch])
+        return self.dataframe
@@ -20,6 +20,13 @@ from selenium.common.exceptions import (
 )
 
 
+def _count_retry(args: tuple):
+    """Conta il retry nella fase in corso se il metodo appartiene a un oggetto con StepTimer"""
+    timer = getattr(args[0], 'timer', None) if args else None
+    if timer is not None and hasattr(timer, 'count_retry'):
+        timer.count_retry()
+
+
 def retry_selenium(
     max_retries: int = 3,
     initial_delay: float = 2.0,
@@ -72,6 +79,7 @@ def retry_selenium(
                     if attempt < max_retries:
                         delay = initial_delay * (backoff_factor ** (attempt - 1))
                         print(f"🔄 Riprovo tra {delay} secondi...")
+                        _count_retry(args)
                         time.sleep(delay)
                     else:
                         print(f"❌ Operazione '{func.__name__}' fallita dopo {max_retries} tentativi")
@@ -87,6 +95,7 @@ def retry_selenium(
                     if attempt < max_retries:
                         delay = initial_delay * (backoff_factor ** (attempt - 1))
                         print(f"🔄 Riprovo tra {delay} secondi...")
+                        _count_retry(args)
                         time.sleep(delay)
                     else:
                         print(f"❌ Operazione '{func.__name__}' fallita dopo {max_retries} tentativi")
@@ -3,98 +3,104 @@ Modulo per il bot Selenium che naviga nella dashboard e scarica i file Excel
 """
 import os
 import time
-import glob
-from datetime import datetime, timedelta
-from typing import Optional
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Callable, Dict, Tuple
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import pytz
 
 from .config_manager import ConfigManager
 from .auth import AuthManager
 from .retry_selenium import retry_selenium
+from .waits import WaitEngine
+from .devtools import DevToolsEventLog, DownloadTracker
+from .fast_export import FastExporter
+from .network import NetworkStats, apply_request_blocking
+from .browser_pool import BrowserPool, create_chrome_driver
+from .timings import StepTimer, timed_step
+from .report_artifact import ReportArtifact
+from .session_cache import SessionCache, session_account, to_cdp_cookie, local_storage_script
+
+
+def get_report_date() -> date:
+    """Restituisce la data del report di default: ieri nel timezone di Roma"""
+    rome_tz = pytz.timezone('Europe/Rome')
+    return (datetime.now(rome_tz) - timedelta(days=1)).date()
 
 
 class DashboardScraper:
     """Bot Selenium per navigare e scaricare file dalla dashboard"""
 
-    def __init__(self, config_manager: ConfigManager, auth_manager: AuthManager):
+    def __init__(
+        self,
+        config_manager: ConfigManager,
+        auth_manager: AuthManager,
+        download_path: Optional[str] = None,
+        session_cache: Optional[SessionCache] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        timer: Optional[StepTimer] = None
+    ):
         """
         Inizializza il scraper
 
         Args:
             config_manager: Gestore della configurazione
             auth_manager: Gestore dell'autenticazione
+            download_path: Directory base dei download (default: DOWNLOAD_PATH della configurazione)
+            session_cache: Cache cifrata delle sessioni per saltare login e PIN (opzionale)
+            browser_pool: Pool di browser pre-avviati da cui prendere il driver (opzionale)
+            timer: Registro dei tempi delle fasi (opzionale, condivisibile con l'uploader)
         """
         self.config = config_manager
         self.auth = auth_manager
+        self.session_cache = session_cache
+        self.browser_pool = browser_pool
+        self.timer = timer or StepTimer()
+        # File scaricati e già verificati, consegnati a on_result come ReportArtifact
+        self.artifacts: Dict[str, ReportArtifact] = {}
+        # Chiave della sessione in cache (username e PIN, vedi session_account)
+        self.session_account: Optional[str] = None
+        # Directory di download univoca per ogni esecuzione (evita collisioni tra run parallele)
+        base_path = download_path or self.config.get_download_path()
+        os.makedirs(base_path, exist_ok=True)
+        self.download_path = tempfile.mkdtemp(prefix='run_', dir=base_path)
+        self.events: Optional[DevToolsEventLog] = None
+        self.downloads: Optional[DownloadTracker] = None
+        self.network_stats: Optional[NetworkStats] = None
+        self.network_config = self.config.get_network_config()
+        self.fast_export = FastExporter(config_manager, self.download_path)
         self.driver: Optional[webdriver.Chrome] = None
         self.wait: Optional[WebDriverWait] = None
+        self.waits = WaitEngine(config_manager)
 
     def setup_driver(self):
-        """Configura e inizializza il driver Selenium"""
-        print("Inizializzazione del driver Chrome...")
-
-        chrome_options = Options()
-
-        # Configura il path per i download
-        download_path = self.config.get_download_path()
-        prefs = {
-            "download.default_directory": download_path,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-
-        # Modalità headless - usa la nuova modalità su GitHub Actions
-        if os.getenv('GITHUB_ACTIONS'):
-            chrome_options.add_argument("--headless=new")
-            print("Modalità headless (new) attivata per GitHub Actions")
-        elif self.config.is_headless_mode():
-            chrome_options.add_argument("--headless")
-            print("Modalità headless attivata")
-
-        # Opzioni aggiuntive per stabilità
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-
-        # Opzioni aggiuntive per GitHub Actions
-        if os.getenv('GITHUB_ACTIONS'):
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--no-first-run")
-            chrome_options.add_argument("--no-default-browser-check")
-            chrome_options.add_argument("--disable-background-networking")
-            chrome_options.add_argument("--disable-background-timer-throttling")
-            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-            chrome_options.add_argument("--disable-breakpad")
-            chrome_options.add_argument("--disable-component-extensions-with-background-pages")
-            chrome_options.add_argument("--disable-features=TranslateUI,BlinkGenPropertyTrees")
-
-        # Inizializza il driver
-        if os.getenv('GITHUB_ACTIONS'):
-            # Su GitHub Actions, usa Chrome e ChromeDriver dal PATH (installati da setup-chrome action)
-            self.driver = webdriver.Chrome(options=chrome_options)
+        """Configura e inizializza il driver Selenium (dal pool di browser, se disponibile)"""
+        if self.browser_pool:
+            print("Browser dal pool pre-avviato...")
+            self.driver = self.browser_pool.acquire()
         else:
-            # In locale, usa ChromeDriverManager
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            print("Inizializzazione del driver Chrome...")
+            self.driver = create_chrome_driver(self.config, self.download_path, self.network_config)
 
         self.wait = WebDriverWait(self.driver, 10)
+        self.waits.attach(self.driver)
+        self.events = DevToolsEventLog(self.driver)
+        # Scarta gli eventi generati prima che il browser fosse assegnato a questa sessione
+        self.events.poll()
+        self.network_stats = NetworkStats(self.events)
+        self.downloads = DownloadTracker(self.driver, self.events, self.download_path)
+
+        # Blocco di analytics, font, immagini e altre risorse superflue via DevTools
+        apply_request_blocking(self.driver, self.network_config)
 
         print("Driver Chrome inizializzato con successo")
 
+    @timed_step('login')
     @retry_selenium(max_retries=3, initial_delay=2.0)
     def login(self, username: str, password: str) -> bool:
         """
@@ -132,12 +138,11 @@ class DashboardScraper:
             # Click sul pulsante di login
             print("Click sul pulsante di login...")
             login_button = self.driver.find_element(By.CSS_SELECTOR, selectors.get('login_button'))
+            previous_url = self.driver.current_url
             login_button.click()
 
             # Attendi il completamento del login
-            nav_config = self.config.get_navigation_config()
-            wait_time = nav_config.get('wait_after_login', 3)
-            time.sleep(wait_time)
+            self.waits.wait('after_login', previous_url=previous_url)
 
             print("Login completato con successo")
             return True
@@ -152,6 +157,7 @@ class DashboardScraper:
             print(f"Errore durante il login: {e}")
             return False
 
+    @timed_step('pin')
     @retry_selenium(max_retries=3, initial_delay=2.0)
     def unlock_secret_popup(self, pin: str = '123456') -> bool:
         """
@@ -175,23 +181,20 @@ class DashboardScraper:
             )
 
             # Esegui i click usando JavaScript (più affidabile in headless mode)
+            click_interval = nav_config.get('secret_popup_click_interval', 0.3)
             for i in range(clicks):
                 self.driver.execute_script("arguments[0].click();", footer_element)
-                time.sleep(0.3)
+                time.sleep(click_interval)
                 print(f"Click {i+1}/{clicks}")
 
-            # Attendi che il popup appaia
-            time.sleep(1)
-            print("Popup aperto!")
-
-            # Inserisci il PIN
+            # Inserisci il PIN (attende che il campo del popup sia visibile)
             print(f"Inserimento PIN: {pin}...")
             secret_pin_field = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, selectors.get('secret_pin_field')))
+                EC.visibility_of_element_located((By.CSS_SELECTOR, selectors.get('secret_pin_field')))
             )
+            print("Popup aperto!")
             secret_pin_field.clear()
             secret_pin_field.send_keys(pin)
-            time.sleep(0.5)
             print("PIN inserito!")
 
             # Click sul pulsante di conferma
@@ -201,8 +204,7 @@ class DashboardScraper:
             )
             confirm_button.click()
 
-            wait_time = nav_config.get('wait_after_pin', 2)
-            time.sleep(wait_time)
+            self.waits.wait('after_pin')
             print("Popup confermato e sbloccato!")
 
             return True
@@ -214,6 +216,7 @@ class DashboardScraper:
             print(f"Errore durante l'apertura del popup segreto: {e}")
             return False
 
+    @timed_step('menu')
     @retry_selenium(max_retries=3, initial_delay=2.0)
     def navigate_to_reports_page(self) -> bool:
         """
@@ -224,7 +227,6 @@ class DashboardScraper:
         """
         try:
             selectors = self.config.get_selectors()
-            nav_config = self.config.get_navigation_config()
 
             # Click sul menu principale
             print("Click sul menu principale...")
@@ -232,7 +234,7 @@ class DashboardScraper:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, selectors.get('menu_main')))
             )
             menu_main.click()
-            time.sleep(nav_config.get('wait_after_menu_click', 2))
+            self.waits.wait('after_menu_main')
             print("✓ Menu principale aperto")
 
             # Click sul sottomenu
@@ -240,8 +242,9 @@ class DashboardScraper:
             menu_submenu = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, selectors.get('menu_submenu')))
             )
+            previous_url = self.driver.current_url
             menu_submenu.click()
-            time.sleep(nav_config.get('wait_after_menu_click', 2))
+            self.waits.wait('after_menu_submenu', previous_url=previous_url)
             print("✓ Sottomenu aperto - pagina report caricata")
 
             return True
@@ -253,6 +256,7 @@ class DashboardScraper:
             print(f"Errore durante la navigazione: {e}")
             return False
 
+    @timed_step('select_locale')
     def select_locale(self, locale_selector: Optional[str] = None) -> bool:
         """
         Seleziona un locale specifico se presente
@@ -265,7 +269,6 @@ class DashboardScraper:
         """
         try:
             selectors = self.config.get_selectors()
-            nav_config = self.config.get_navigation_config()
 
             if not locale_selector:
                 print("⚠ Nessun selettore locale specificato - uso locale di default")
@@ -277,7 +280,6 @@ class DashboardScraper:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, selectors.get('locale_dropdown_button')))
             )
             locale_dropdown.click()
-            time.sleep(1)
             print("✓ Dropdown locale aperto")
 
             # Click sul locale specifico
@@ -286,13 +288,12 @@ class DashboardScraper:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, locale_selector))
             )
             locale_option.click()
-            time.sleep(1)
             print("✓ Locale selezionato")
 
             # Chiudi il dropdown per evitare che copra altri elementi
             print("Chiusura dropdown...")
             locale_dropdown.click()
-            time.sleep(nav_config.get('wait_after_locale_select', 2))
+            self.waits.wait('after_locale_select')
             print("✓ Dropdown chiuso")
 
             return True
@@ -306,25 +307,29 @@ class DashboardScraper:
             print("Continuo con il locale di default...")
             return True  # Non fallisce, continua con default
 
+    @timed_step('date_filter')
     @retry_selenium(max_retries=3, initial_delay=2.0)
-    def set_date_filter(self) -> bool:
+    def set_date_filter(self, date_start: Optional[date] = None, date_end: Optional[date] = None) -> bool:
         """
-        Imposta il filtro data al giorno precedente (formato DD/MM/YYYY, timezone Roma)
+        Imposta il filtro data (formato DD/MM/YYYY)
+
+        Args:
+            date_start: Data di inizio (default: ieri nel timezone di Roma)
+            date_end: Data di fine (default: uguale a date_start)
 
         Returns:
             True se l'impostazione ha successo, False altrimenti
         """
         try:
             selectors = self.config.get_selectors()
-            nav_config = self.config.get_navigation_config()
 
-            # Calcola la data di ieri nel timezone di Roma
-            rome_tz = pytz.timezone('Europe/Rome')
-            now_rome = datetime.now(rome_tz)
-            yesterday = now_rome - timedelta(days=1)
-            date_str = yesterday.strftime('%d/%m/%Y')
+            # Di default il giorno precedente nel timezone di Roma
+            date_start = date_start or get_report_date()
+            date_end = date_end or date_start
+            date_str = date_start.strftime('%d/%m/%Y')
+            end_date_str = date_end.strftime('%d/%m/%Y')
 
-            print(f"Impostazione filtro data a: {date_str}...")
+            print(f"Impostazione filtro data a: {date_str} - {end_date_str}...")
 
             # Click sul filtro data per aprire il date picker
             print("Apertura date picker...")
@@ -332,7 +337,6 @@ class DashboardScraper:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, selectors.get('date_filter_trigger')))
             )
             date_filter.click()
-            time.sleep(1)
             print("✓ Date picker aperto")
 
             # Imposta la data di inizio
@@ -342,17 +346,15 @@ class DashboardScraper:
             )
             date_start_input.clear()
             date_start_input.send_keys(date_str)
-            time.sleep(0.5)
             print("✓ Data inizio impostata")
 
-            # Imposta la data di fine (stesso giorno)
-            print(f"Impostazione data fine: {date_str}...")
+            # Imposta la data di fine
+            print(f"Impostazione data fine: {end_date_str}...")
             date_end_input = self.wait.until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, selectors.get('date_end_input')))
             )
             date_end_input.clear()
-            date_end_input.send_keys(date_str)
-            time.sleep(0.5)
+            date_end_input.send_keys(end_date_str)
             print("✓ Data fine impostata")
 
             # Click sul pulsante Applica
@@ -362,8 +364,7 @@ class DashboardScraper:
             )
             apply_button.click()
 
-            wait_time = nav_config.get('wait_after_date_select', 2)
-            time.sleep(wait_time)
+            self.waits.wait('after_date_select')
             print("✓ Filtro data applicato")
 
             return True
@@ -375,6 +376,7 @@ class DashboardScraper:
             print(f"Errore durante l'impostazione del filtro data: {e}")
             return False
 
+    @timed_step('data_refresh')
     @retry_selenium(max_retries=3, initial_delay=2.0)
     def trigger_data_update(self) -> bool:
         """
@@ -385,14 +387,13 @@ class DashboardScraper:
         """
         try:
             selectors = self.config.get_selectors()
-            nav_config = self.config.get_navigation_config()
 
             print("Click su 'Aggiornamento dati'...")
             aggiornamento_button = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, selectors.get('aggiornamento_dati_button')))
             )
             aggiornamento_button.click()
-            time.sleep(nav_config.get('wait_after_aggiornamento', 3))
+            self.waits.wait('after_aggiornamento')
             print("✓ Aggiornamento dati completato")
 
             return True
@@ -404,6 +405,7 @@ class DashboardScraper:
             print(f"Errore durante l'aggiornamento dati: {e}")
             return False
 
+    @timed_step('download')
     @retry_selenium(max_retries=3, initial_delay=2.0)
     def download_excel_file(self) -> Optional[str]:
         """
@@ -416,9 +418,9 @@ class DashboardScraper:
             selectors = self.config.get_selectors()
             nav_config = self.config.get_navigation_config()
 
-            # Conta i file esistenti nella directory di download
-            download_path = self.config.get_download_path()
-            before_files = set(glob.glob(os.path.join(download_path, "*")))
+            # Ogni download usa una directory nuova, impostata su Chrome via CDP
+            download_dir = self.downloads.prepare()
+            before_files = {os.path.join(download_dir, name) for name in os.listdir(download_dir)}
 
             # Trova il pulsante di download XLSX
             print("Ricerca pulsante di download XLSX...")
@@ -429,8 +431,7 @@ class DashboardScraper:
 
             # Scrolla fino all'elemento per renderlo visibile
             print("Scroll fino al pulsante...")
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", download_button)
-            time.sleep(1)
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", download_button)
             print("✓ Elemento visibile")
 
             # Attendi che sia cliccabile e clicca
@@ -441,82 +442,24 @@ class DashboardScraper:
             download_button.click()
             print("✓ Click effettuato sul download")
 
-            # Attendi che il file inizi a scaricarsi
-            print("Attesa inizio download...")
-            max_wait_start = 10  # Massimo 10 secondi per iniziare
-            downloaded_file = None
+            # Attendi il completamento seguendo gli eventi DevTools del download
+            print("Attesa download...")
+            max_wait_start = nav_config.get('wait_for_download', 10)
+            max_wait_complete = 60
+            downloaded_file = self.downloads.wait_for_download(max_wait_start, max_wait_complete)
 
-            for i in range(max_wait_start):
-                time.sleep(1)
-                after_files = set(glob.glob(os.path.join(download_path, "*")))
-                new_files = after_files - before_files
-                if new_files:
-                    downloaded_file = list(new_files)[0]
-                    print(f"✓ File trovato: {os.path.basename(downloaded_file)}")
-                    break
+            # Fallback: controllo della directory di download
+            if not downloaded_file:
+                downloaded_file = self.downloads.poll_directory(before_files, max_wait_start, max_wait_complete)
 
             if not downloaded_file:
-                print("Errore: Nessun nuovo file trovato nella directory di download")
                 return None
 
-            # Aspetta che il file sia completamente scaricato
-            print("Attesa completamento download...")
-            max_wait_complete = 60  # Massimo 60 secondi per completare
-
-            # Se il file è .crdownload, aspetta che Chrome lo rinomini
-            if downloaded_file.endswith('.crdownload'):
-                print("  File temporaneo .crdownload rilevato, attesa completamento...")
-                for i in range(max_wait_complete):
-                    time.sleep(1)
-                    # Cerca il file senza .crdownload
-                    possible_file = downloaded_file.replace('.crdownload', '')
-                    if os.path.exists(possible_file):
-                        downloaded_file = possible_file
-                        print(f"✓ Download completato: {os.path.basename(downloaded_file)}")
-                        break
-                    # Controlla anche se ci sono nuovi file .xls o .xlsx
-                    after_files = set(glob.glob(os.path.join(download_path, "*.xls*")))
-                    new_xlsx = after_files - before_files
-                    if new_xlsx:
-                        downloaded_file = list(new_xlsx)[0]
-                        print(f"✓ File Excel trovato: {os.path.basename(downloaded_file)}")
-                        break
-                else:
-                    print("⚠ Timeout: il file .crdownload non è stato completato")
-            else:
-                # File normale, aspetta che la dimensione si stabilizzi
-                last_size = -1
-                stable_count = 0
-                for i in range(max_wait_complete):
-                    time.sleep(1)
-                    try:
-                        current_size = os.path.getsize(downloaded_file)
-                        if current_size == last_size:
-                            stable_count += 1
-                            if stable_count >= 3:  # 3 secondi senza cambiamenti
-                                print(f"✓ Download completato ({current_size} bytes)")
-                                break
-                        else:
-                            stable_count = 0
-                            last_size = current_size
-                            print(f"  Download in corso... ({current_size} bytes)")
-                    except:
-                        pass
+            self.timer.annotate(bytes=os.path.getsize(downloaded_file))
 
-            # Verifica che il file HTML sia completo (se è HTML)
-            try:
-                with open(downloaded_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    if content.startswith('<html') or content.startswith('<!DOCTYPE'):
-                        if not content.rstrip().endswith('</html>'):
-                            print(f"⚠ ATTENZIONE: File HTML incompleto!")
-                            print(f"   Il file termina con: {content[-50:]}")
-                            print(f"   Prova ad aumentare il tempo di attesa.")
-                            return None
-                        else:
-                            print(f"✓ File HTML completo e valido")
-            except Exception as e:
-                print(f"Avviso: impossibile verificare completezza file: {e}")
+            # Verifica che il file sia completo (formato e coda del file)
+            if not self.inspect_download(downloaded_file):
+                return None
 
             print(f"✓ File scaricato con successo: {downloaded_file}")
             return downloaded_file
@@ -528,89 +471,452 @@ class DashboardScraper:
             print(f"Errore durante il download: {e}")
             return None
 
+    def inspect_download(self, downloaded_file: str) -> Optional[ReportArtifact]:
+        """
+        Riconosce il formato del file scaricato e verifica che non sia troncato
+
+        Legge solo l'inizio e la fine del file; il ReportArtifact viene conservato
+        e passato all'upload, che legge il file una sola volta.
+
+        Args:
+            downloaded_file: Path del file scaricato
+
+        Returns:
+            ReportArtifact del file, oppure None se il file è incompleto
+        """
+        try:
+            artifact = ReportArtifact.open(downloaded_file)
+        except OSError as e:
+            print(f"Avviso: impossibile verificare completezza file: {e}")
+            return None
+
+        if not artifact.complete:
+            print(f"⚠ ATTENZIONE: File {artifact.format} incompleto!")
+            print(f"   Il file termina con: {artifact.tail()}")
+            print(f"   Prova ad aumentare il tempo di attesa.")
+            return None
+
+        print(f"✓ File {artifact.format} completo e valido")
+        self.artifacts[downloaded_file] = artifact
+        return artifact
+
+    def print_network_summary(self):
+        """Stampa il traffico di rete della sessione (utile per verificare l'effetto del blocco)"""
+        if not self.events or not self.events.available:
+            return
+        try:
+            self.events.poll()
+        except Exception:
+            return
+        print(f"🌐 Rete: {self.network_stats.summary()}")
+
     def close(self):
-        """Chiude il driver Selenium"""
+        """Chiude il driver Selenium (o lo restituisce ripulito al pool)"""
         if self.driver:
+            if self.browser_pool:
+                self.browser_pool.release(self.driver)
+                self.driver = None
+                print("Browser restituito al pool")
+                return
             print("Chiusura del browser...")
             self.driver.quit()
+            self.driver = None
             print("Browser chiuso")
 
-    def run(self, pin: str = '123456', locale_selector: Optional[str] = None) -> Optional[str]:
+    def is_session_alive(self) -> bool:
         """
-        Esegue l'intero processo: setup, login, navigazione e download
+        Verifica che il browser risponda e che la sessione non sia tornata al login
+
+        Returns:
+            True se la sessione autenticata è ancora utilizzabile
+        """
+        if not self.driver:
+            return False
+
+        try:
+            current_url = self.driver.current_url
+        except WebDriverException:
+            return False
+
+        login_url = self.config.get_dashboard_config().get('login_url')
+        return not (login_url and current_url.startswith(login_url))
+
+    @timed_step('session_restore')
+    def restore_session(self, account: str) -> bool:
+        """
+        Ripristina dalla cache cifrata cookie e localStorage di una sessione autenticata
+
+        La validità viene verificata con una sola richiesta HTTP prima di toccare il browser.
 
         Args:
-            pin: PIN per sbloccare il popup segreto (default: 123456)
-            locale_selector: Selettore CSS per il locale specifico (opzionale)
+            account: Chiave della sessione da ripristinare (vedi session_account)
 
         Returns:
-            Path del file scaricato se il processo ha successo, None altrimenti
+            True se il browser è autenticato senza login, False altrimenti
         """
+        if not self.session_cache:
+            return False
+
+        state = self.session_cache.load(account)
+        if not state:
+            return False
+
+        cache_config = self.config.get_session_cache_config()
+        validate_url = cache_config.get('validate_url') or self.config.get_dashboard_config().get('after_login_url')
+
+        print("Verifica della sessione salvata...")
+        if not SessionCache.validate(state['cookies'], validate_url):
+            print("ℹ Sessione salvata non più valida, eseguo il login completo")
+            self.session_cache.invalidate(account)
+            return False
+
         try:
-            print("\n" + "="*60)
-            print("AVVIO BOT - PROCESSO COMPLETO")
-            print("="*60 + "\n")
+            self.driver.execute_cdp_cmd('Network.setCookies', {
+                'cookies': [to_cdp_cookie(cookie) for cookie in state['cookies']]
+            })
+
+            # Il localStorage viene scritto prima che la dashboard esegua i propri script
+            script_id = None
+            if state.get('local_storage'):
+                script_id = self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                    'source': local_storage_script(state['origin'], state['local_storage'])
+                })['identifier']
+
+            self.driver.get(validate_url)
+
+            if script_id:
+                self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': script_id})
+        except WebDriverException as e:
+            print(f"⚠ Ripristino sessione fallito: {e}")
+            return False
+
+        if not self.is_session_alive():
+            print("ℹ Sessione ripristinata ma reindirizzata al login, eseguo il login completo")
+            self.session_cache.invalidate(account)
+            return False
+
+        print("✓ Sessione ripristinata dalla cache (login saltato)")
+        return True
+
+    def save_session(self):
+        """Salva nella cache cifrata lo stato autenticato corrente del browser"""
+        if not self.session_cache or not self.session_account or not self.is_session_alive():
+            return
+
+        try:
+            cookies = self.driver.get_cookies()
+            local_storage = self.driver.execute_script(
+                "var items = {};"
+                "for (var i = 0; i < window.localStorage.length; i++) {"
+                " var key = window.localStorage.key(i); items[key] = window.localStorage.getItem(key);"
+                "}"
+                "return items;"
+            )
+            origin = self.driver.execute_script("return location.origin")
+            self.session_cache.save(self.session_account, cookies, local_storage, origin)
+            print("✓ Sessione salvata in cache (cifrata)")
+        except Exception as e:
+            print(f"⚠ Impossibile salvare la sessione in cache: {e}")
+
+    def start_session(self, pin: str = '123456', navigate: bool = True, use_cache: bool = True) -> bool:
+        """
+        Apre una sessione autenticata sulla pagina dei report (login, PIN e menu)
+
+        Args:
+            pin: PIN per sbloccare il popup segreto
+            navigate: Se False si ferma dopo lo sblocco PIN (la pagina report non viene aperta)
+            use_cache: Se True prova prima a ripristinare la sessione dalla cache
+
+        Returns:
+            True se la sessione è pronta, False altrimenti
+        """
+        # Se il browser è morto, ne avvia uno nuovo
+        if self.driver:
+            try:
+                self.driver.current_url
+            except WebDriverException:
+                print("⚠ Browser non più raggiungibile, riavvio...")
+                self.close()
 
-            # Setup del driver
-            self.setup_driver()
+        if not self.driver:
+            with self.timer.step('browser'):
+                self.setup_driver()
 
-            # Ottieni le credenziali
-            username, password = self.auth.get_credentials()
+        # Ottieni le credenziali
+        username, password = self.auth.get_credentials()
+        self.session_account = session_account(username, pin)
 
+        restored = use_cache and self.session_cache is not None and self.restore_session(self.session_account)
+        skip_pin = self.config.get_session_cache_config().get('skip_pin', True)
+
+        if not restored:
             # 1. Login
             print("\n[1/8] LOGIN")
             if not self.login(username, password):
                 print("❌ Login fallito")
-                return None
+                return False
 
+        if not restored or not skip_pin:
             # 2. Sblocca il popup segreto con PIN
             print("\n[2/8] SBLOCCO POPUP SEGRETO")
             if not self.unlock_secret_popup(pin):
                 print("❌ Sblocco popup segreto fallito")
-                return None
+                return False
 
-            # 3. Naviga ai menu
-            print("\n[3/8] NAVIGAZIONE MENU")
-            if not self.navigate_to_reports_page():
-                print("❌ Navigazione menu fallita")
-                return None
+            self.save_session()
 
-            # 4. Seleziona locale (opzionale)
-            print("\n[4/8] SELEZIONE LOCALE")
-            if not self.select_locale(locale_selector):
-                print("❌ Selezione locale fallita")
-                return None
+        if not navigate:
+            return True
 
-            # 5. Imposta filtro data
-            print("\n[5/8] IMPOSTAZIONE FILTRO DATA")
-            if not self.set_date_filter():
-                print("❌ Impostazione filtro data fallita")
-                return None
+        # 3. Naviga ai menu
+        print("\n[3/8] NAVIGAZIONE MENU")
+        if not self.navigate_to_reports_page():
+            print("❌ Navigazione menu fallita")
+            return False
 
-            # 6. Click aggiornamento dati
-            print("\n[6/8] AGGIORNAMENTO DATI")
-            if not self.trigger_data_update():
-                print("❌ Aggiornamento dati fallito")
-                return None
+        return True
 
-            # 7. Download file XLSX
-            print("\n[7/8] DOWNLOAD FILE EXCEL")
-            downloaded_file = self.download_excel_file()
-            if not downloaded_file:
-                print("❌ Download fallito")
-                return None
+    @timed_step('fast_export')
+    def try_fast_export(
+        self,
+        locale_selector: Optional[str] = None,
+        date_start: Optional[date] = None,
+        date_end: Optional[date] = None
+    ) -> Optional[str]:
+        """
+        Prova a scaricare il report direttamente dall'endpoint di export (salta gli step 3-7)
+
+        Args:
+            locale_selector: Selettore CSS per il locale specifico (opzionale)
+            date_start: Data di inizio (default: ieri nel timezone di Roma)
+            date_end: Data di fine (default: uguale a date_start)
+
+        Returns:
+            Path del file scaricato, oppure None se il fast export non è disponibile
+        """
+        if not self.fast_export.enabled:
+            return None
+
+        try:
+            self.fast_export.load_cookies(self.driver)
+            date_start = date_start or get_report_date()
+            downloaded_file = self.fast_export.export(locale_selector, date_start, date_end or date_start)
+        except Exception as e:
+            print(f"⚠ Fast export non riuscito: {e}")
+            return None
+
+        if not downloaded_file:
+            return None
+
+        self.timer.annotate(bytes=os.path.getsize(downloaded_file))
+        if not self.inspect_download(downloaded_file):
+            return None
+        return downloaded_file
+
+    def download_locale_report(
+        self,
+        locale_selector: Optional[str] = None,
+        date_start: Optional[date] = None,
+        date_end: Optional[date] = None,
+        select_locale: bool = True
+    ) -> Optional[str]:
+        """
+        Scarica il report di un locale a partire dalla pagina dei report già aperta
+
+        Args:
+            locale_selector: Selettore CSS per il locale specifico (opzionale)
+            date_start: Data di inizio (default: ieri nel timezone di Roma)
+            date_end: Data di fine (default: uguale a date_start)
+            select_locale: Se False il locale è già selezionato (giorni successivi dello stesso locale)
+
+        Returns:
+            Path del file scaricato se il download ha successo, None altrimenti
+        """
+        # 4. Seleziona locale (opzionale)
+        print("\n[4/8] SELEZIONE LOCALE")
+        if not select_locale:
+            print("✓ Locale già selezionato")
+        elif not self.select_locale(locale_selector):
+            print("❌ Selezione locale fallita")
+            return None
+
+        # 5. Imposta filtro data
+        print("\n[5/8] IMPOSTAZIONE FILTRO DATA")
+        if not self.set_date_filter(date_start, date_end):
+            print("❌ Impostazione filtro data fallita")
+            return None
 
-            print("\n[8/8] COMPLETATO!")
+        # 6. Click aggiornamento dati
+        print("\n[6/8] AGGIORNAMENTO DATI")
+        if not self.trigger_data_update():
+            print("❌ Aggiornamento dati fallito")
+            return None
+
+        # 7. Download file XLSX
+        print("\n[7/8] DOWNLOAD FILE EXCEL")
+        downloaded_file = self.download_excel_file()
+        if not downloaded_file:
+            print("❌ Download fallito")
+            return None
+
+        print("\n[8/8] COMPLETATO!")
+        return downloaded_file
+
+    def run_many(
+        self,
+        locale_selectors: List[Optional[str]],
+        pin: str = '123456',
+        on_result: Optional[Callable[[int, Optional[ReportArtifact]], None]] = None,
+        date_ranges: Optional[List[Tuple[date, date]]] = None
+    ) -> List[Optional[str]]:
+        """
+        Scarica i report di più locali dello stesso account con un'unica sessione autenticata
+
+        Il login viene eseguito una sola volta; se la sessione scade o il browser
+        muore durante un download, il bot rifà il login e riprova quel download una volta.
+        Con date_ranges (backfill) ogni locale viene scaricato per ciascun intervallo di date.
+
+        Args:
+            locale_selectors: Selettori CSS dei locali da scaricare (None = locale di default)
+            pin: PIN per sbloccare il popup segreto (default: 123456)
+            on_result: Callback chiamata con (indice, ReportArtifact del file scaricato o None) al termine di ogni download
+            date_ranges: Intervalli (data inizio, data fine) da scaricare (default: solo ieri)
+
+        Returns:
+            Lista dei file scaricati (None per i download falliti), ordinata per locale e
+            poi per intervallo: l'indice è idx_locale * len(date_ranges) + idx_intervallo
+        """
+        ranges = date_ranges or [(None, None)]
+        downloads = [(selector, start, end) for selector in locale_selectors for start, end in ranges]
+        return self.run_downloads(downloads, pin=pin, on_result=on_result)
+
+    def run_downloads(
+        self,
+        downloads: List[Tuple[Optional[str], Optional[date], Optional[date]]],
+        pin: str = '123456',
+        on_result: Optional[Callable[[int, Optional[ReportArtifact]], None]] = None
+    ) -> List[Optional[str]]:
+        """
+        Esegue una lista di download (locale, data inizio, data fine) con un'unica sessione autenticata
+
+        I download dello stesso locale dovrebbero essere consecutivi: il locale
+        viene riselezionato solo quando cambia.
+
+        Args:
+            downloads: Tuple (selettore locale, data inizio, data fine); date None = ieri
+            pin: PIN per sbloccare il popup segreto (default: 123456)
+            on_result: Callback chiamata con (indice, ReportArtifact del file scaricato o None) al termine di ogni download
+
+        Returns:
+            Lista dei file scaricati (None per i download falliti), nello stesso ordine di downloads
+        """
+        results: List[Optional[str]] = []
+
+        try:
             print("\n" + "="*60)
-            print("✓✓✓ PROCESSO COMPLETATO CON SUCCESSO ✓✓✓")
+            print(f"AVVIO BOT - SESSIONE CONDIVISA ({len(downloads)} download)")
             print("="*60 + "\n")
 
-            return downloaded_file
+            # Con il fast export la pagina report viene aperta solo se serve il percorso UI
+            use_fast_export = self.fast_export.enabled
+            session_ready = self.start_session(pin, navigate=not use_fast_export)
+            reports_page_open = not use_fast_export
+            # Locale già selezionato nella pagina report: i giorni successivi non lo riselezionano
+            locale_selected = False
+            selected_locale = None
+
+            for idx, (locale_selector, date_start, date_end) in enumerate(downloads):
+                label = locale_selector or 'Default'
+                if date_start:
+                    label += f" ({date_start.isoformat()}" + (f" - {date_end.isoformat()})" if date_end != date_start else ")")
+                print(f"\n--- Download {idx + 1}/{len(downloads)}: {label} ---")
+
+                downloaded_file = None
+                try:
+                    for attempt in range(2):
+                        if session_ready and use_fast_export:
+                            downloaded_file = self.try_fast_export(locale_selector, date_start, date_end)
+                            if not downloaded_file:
+                                print("↩ Fast export non disponibile, uso il percorso UI")
+
+                        if session_ready and not downloaded_file:
+                            if not reports_page_open:
+                                print("\n[3/8] NAVIGAZIONE MENU")
+                                reports_page_open = self.navigate_to_reports_page()
+                                locale_selected = False
+                            if reports_page_open:
+                                downloaded_file = self.download_locale_report(
+                                    locale_selector, date_start, date_end,
+                                    select_locale=not (locale_selected and selected_locale == locale_selector)
+                                )
+                                locale_selected = downloaded_file is not None
+                                selected_locale = locale_selector
+
+                        if downloaded_file or attempt == 1:
+                            break
+
+                        if not self.is_session_alive():
+                            # Sessione scaduta o browser morto: nuovo login e secondo tentativo
+                            print("⚠ Sessione non più valida, nuovo login...")
+                            if self.session_cache and self.session_account:
+                                self.session_cache.invalidate(self.session_account)
+                            session_ready = self.start_session(pin, navigate=not use_fast_export, use_cache=False)
+                            reports_page_open = not use_fast_export
+                            locale_selected = False
+                        else:
+                            # Sessione valida ma pagina in stato incerto: il prossimo download riapre la pagina report
+                            reports_page_open = False
+                            break
+
+                except Exception as e:
+                    print(f"\n❌ ERRORE durante il download del locale: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    session_ready = self.is_session_alive()
+                    reports_page_open = False
+                    locale_selected = False
+
+                results.append(downloaded_file)
+                artifact = None
+                if downloaded_file:
+                    artifact = self.artifacts.pop(downloaded_file, None) or ReportArtifact.open(downloaded_file)
+                if on_result:
+                    on_result(idx, artifact)
+
+            # Aggiorna la cache con i cookie rinnovati durante la sessione
+            self.save_session()
+            self.waits.print_summary()
+            self.print_network_summary()
+
+            if results and all(results):
+                print("\n" + "="*60)
+                print("✓✓✓ PROCESSO COMPLETATO CON SUCCESSO ✓✓✓")
+                print("="*60 + "\n")
+
+            return results
 
         except Exception as e:
             print(f"\n❌ ERRORE durante l'esecuzione del bot: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            # I download non ancora eseguiti risultano falliti
+            for idx in range(len(results), len(downloads)):
+                results.append(None)
+                if on_result:
+                    on_result(idx, None)
+            return results
         finally:
             self.close()
+
+    def run(self, pin: str = '123456', locale_selector: Optional[str] = None) -> Optional[str]:
+        """
+        Esegue l'intero processo: setup, login, navigazione e download
+
+        Args:
+            pin: PIN per sbloccare il popup segreto (default: 123456)
+            locale_selector: Selettore CSS per il locale specifico (opzionale)
+
+        Returns:
+            Path del file scaricato se il processo ha successo, None altrimenti
+        """
+        return self.run_many([locale_selector], pin=pin)[0]
@@ -0,0 +1,180 @@
+"""
+Cache cifrata delle sessioni iPratico (cookie e localStorage) per saltare login e PIN
+
+Le sessioni iPratico restano valide per ore: dopo un login riuscito lo stato
+autenticato viene salvato su disco, cifrato con la stessa chiave Fernet usata
+per le credenziali (CryptoManager), e ripristinato alla run successiva.
+
+Una sessione è sbloccata con il PIN del gruppo di locali che l'ha creata: la
+chiave della cache (session_account) comprende username e PIN, così un gruppo
+con un PIN diverso non riusa la sessione di un altro. Il nome del file è un
+HMAC della chiave con ENCRYPTION_KEY: senza la chiave non si può risalire al
+PIN (6 cifre) provando tutte le combinazioni a partire dallo username.
+"""
+import os
+import json
+import time
+import hmac
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .fast_export import new_http_session
+
+
+def session_account(username: str, pin: Optional[str]) -> str:
+    """
+    Chiave della cache per un account e il PIN con cui la sessione è stata sbloccata
+
+    Args:
+        username: Username iPratico
+        pin: PIN del popup segreto (None o '' se assente)
+
+    Returns:
+        Identificativo da passare a load/save/invalidate
+    """
+    return f"{username}\n{pin or ''}"
+
+
+class SessionCache:
+    """Salva e ripristina lo stato autenticato del browser per ogni account"""
+
+    def __init__(self, crypto, name_key: str, cache_dir: Optional[str] = None, max_age_hours: float = 8):
+        """
+        Inizializza la cache
+
+        Args:
+            crypto: Oggetto con metodi encrypt/decrypt (es. CryptoManager del backend)
+            name_key: Chiave dell'HMAC dei nomi dei file (ENCRYPTION_KEY)
+            cache_dir: Directory della cache (default: SESSION_CACHE_DIR o ./.session_cache)
+            max_age_hours: Età massima di una sessione salvata
+        """
+        self.crypto = crypto
+        self.name_key = name_key.encode('utf-8')
+        self.cache_dir = cache_dir or os.getenv('SESSION_CACHE_DIR', './.session_cache')
+        self.max_age = max_age_hours * 3600
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._prune()
+
+    def _path(self, account: str) -> str:
+        """File della cache per un account (il nome non contiene username e PIN, nemmeno come hash semplice)"""
+        digest = hmac.new(self.name_key, account.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.session")
+
+    def _prune(self):
+        """Elimina le sessioni scadute (anche quelle con nomi non più usati, mai rilette da load)"""
+        limit = time.time() - self.max_age
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.session') and entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+
+    def load(self, account: str) -> Optional[Dict[str, Any]]:
+        """
+        Legge la sessione salvata di un account
+
+        Args:
+            account: Identificativo dell'account (vedi session_account)
+
+        Returns:
+            Stato salvato (cookies, local_storage, origin, saved_at) oppure None
+        """
+        path = self._path(account)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.loads(self.crypto.decrypt(f.read()))
+        except Exception as e:
+            # File corrotto o cifrato con un'altra chiave
+            print(f"⚠ Sessione in cache non leggibile, la ignoro: {e}")
+            self.invalidate(account)
+            return None
+
+        if time.time() - state.get('saved_at', 0) > self.max_age:
+            print("ℹ Sessione in cache scaduta")
+            self.invalidate(account)
+            return None
+
+        return state
+
+    def save(self, account: str, cookies: List[Dict[str, Any]], local_storage: Dict[str, str], origin: str):
+        """
+        Salva (cifrato) lo stato autenticato di un account
+
+        Args:
+            account: Identificativo dell'account (vedi session_account)
+            cookies: Cookie restituiti da driver.get_cookies()
+            local_storage: Contenuto del localStorage della dashboard
+            origin: Origin della dashboard a cui appartiene il localStorage
+        """
+        state = {
+            'cookies': cookies,
+            'local_storage': local_storage,
+            'origin': origin,
+            'saved_at': time.time(),
+        }
+        path = self._path(account)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.crypto.encrypt(json.dumps(state)))
+        os.replace(tmp_path, path)
+
+    def invalidate(self, account: str):
+        """Elimina la sessione salvata di un account"""
+        try:
+            os.remove(self._path(account))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def validate(cookies: List[Dict[str, Any]], url: str, timeout: float = 15) -> bool:
+        """
+        Verifica con una sola richiesta HTTP che i cookie siano ancora autenticati
+
+        Args:
+            cookies: Cookie salvati
+            url: Pagina protetta della dashboard (senza sessione risponde con redirect al login)
+            timeout: Timeout della richiesta in secondi
+
+        Returns:
+            True se la pagina risponde 200 senza redirect
+        """
+        session = new_http_session()
+        for cookie in cookies:
+            session.cookies.set(cookie['name'], cookie['value'],
+                                domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        try:
+            response = session.get(url, allow_redirects=False, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠ Validazione sessione fallita: {e}")
+            return False
+        return response.status_code == 200
+
+
+def to_cdp_cookie(cookie: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte un cookie Selenium nel formato di Network.setCookies"""
+    cdp_cookie = {
+        'name': cookie['name'],
+        'value': cookie['value'],
+        'domain': cookie.get('domain'),
+        'path': cookie.get('path', '/'),
+        'secure': cookie.get('secure', False),
+        'httpOnly': cookie.get('httpOnly', False),
+    }
+    if cookie.get('expiry'):
+        cdp_cookie['expires'] = cookie['expiry']
+    if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+        cdp_cookie['sameSite'] = cookie['sameSite']
+    return cdp_cookie
+
+
+def local_storage_script(origin: str, items: Dict[str, str]) -> str:
+    """Script che ripristina il localStorage prima che la dashboard esegua il proprio codice"""
+    return (
+        "if (location.origin === %s) {"
+        " var items = %s;"
+        " Object.keys(items).forEach(function(k) { window.localStorage.setItem(k, items[k]); });"
+        "}" % (json.dumps(origin), json.dumps(items))
+    )
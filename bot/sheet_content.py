@@ -0,0 +1,119 @@
+"""
+Hash del contenuto dell'ultimo report scritto su un foglio (upload invariati)
+
+Nelle riesecuzioni ("Esegui ora") e per i locali chiusi il report scaricato è
+spesso identico a quello già presente nel foglio. L'hash è calcolato sui valori
+da scrivere, normalizzati come li salva Google Sheets (5 e 5.0 sono lo stesso
+numero, NaN è una cella vuota), quindi non dipende dal formato del file né da
+date di generazione contenute nell'export. Se l'hash coincide con quello
+dell'ultima scrittura e il foglio non è cambiato, si aggiorna solo il timestamp.
+Il salvataggio su database è fatto da run_bot.
+"""
+import json
+import math
+import hashlib
+from types import SimpleNamespace
+from typing import Any, Optional, Sequence
+
+
+def new_content_state() -> SimpleNamespace:
+    """Stato vuoto (il prossimo upload scrive sempre)"""
+    return SimpleNamespace(worksheet_id=None, rows=0, cols=0, content_hash=None, dirty=False)
+
+
+def _normalize_cell(value: Any) -> Any:
+    """Valore della cella come viene salvato da Google Sheets (valueInputOption RAW)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return '' if math.isnan(value) else str(value)
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def content_hash(data: Sequence[Sequence[Any]]) -> str:
+    """
+    Hash normalizzato dei valori da scrivere
+
+    Args:
+        data: Righe (liste di celle) come inviate a Google Sheets
+
+    Returns:
+        Digest SHA-256 esadecimale
+    """
+    digest = hashlib.sha256()
+    for row in data:
+        cells = [_normalize_cell(cell) for cell in row]
+        # Le celle vuote in coda non cambiano il foglio
+        while cells and cells[-1] == '':
+            cells.pop()
+        digest.update(json.dumps(cells, default=str, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def is_unchanged(
+    state: Optional[SimpleNamespace],
+    digest: str,
+    worksheet_id: int,
+    rows: int,
+    cols: int,
+    grid_rows: int,
+    grid_cols: int
+) -> bool:
+    """
+    True se il foglio contiene già esattamente questi dati
+
+    Serve lo stesso hash dell'ultima scrittura riuscita, sullo stesso foglio
+    (non ricreato) e con la griglia ancora della forma scritta allora.
+
+    Args:
+        state: Stato del foglio (None = deduplica disattivata)
+        digest: Hash dei nuovi dati (content_hash)
+        worksheet_id: ID del foglio (gid)
+        rows: Righe dei nuovi dati
+        cols: Colonne dei nuovi dati
+        grid_rows: Righe attuali della griglia del foglio
+        grid_cols: Colonne attuali della griglia del foglio
+    """
+    return bool(
+        state
+        and state.content_hash == digest
+        and state.worksheet_id == worksheet_id
+        and state.rows == rows
+        and state.cols == cols
+        and grid_rows == max(rows, 1)
+        and grid_cols == cols + 1
+    )
+
+
+def forget(state: Optional[SimpleNamespace]):
+    """Dimentica il contenuto (scrittura in corso o fallita)"""
+    if state is None or state.content_hash is None:
+        return
+    state.content_hash = None
+    state.dirty = True
+
+
+def remember(state: Optional[SimpleNamespace], worksheet_id: int, rows: int, cols: int, digest: str):
+    """
+    Registra i dati appena scritti
+
+    Args:
+        state: Stato da aggiornare (None = deduplica disattivata)
+        worksheet_id: ID del foglio (gid)
+        rows: Righe scritte
+        cols: Colonne scritte
+        digest: Hash dei dati (content_hash)
+    """
+    if state is None:
+        return
+    state.worksheet_id = worksheet_id
+    state.rows = rows
+    state.cols = cols
+    state.content_hash = digest
+    state.dirty = True
@@ -0,0 +1,115 @@
+"""
+Impronta dell'ultima griglia scritta su un foglio Google Sheets (aggiornamenti incrementali)
+
+Per ogni foglio si conserva un hash corto per riga dei dati scritti l'ultima
+volta. Alla run successiva si confrontano gli hash delle nuove righe con quelli
+salvati e si riscrivono solo i blocchi di righe cambiati; se le righe sono
+diminuite il foglio viene ridotto. Il salvataggio su database è fatto da
+run_bot: qui ci sono solo il calcolo delle differenze e l'aggiornamento
+dell'impronta in memoria.
+"""
+import json
+import hashlib
+from types import SimpleNamespace
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+# Byte per hash di riga (blake2b): 10.000 righe occupano 80 KB
+ROW_HASH_SIZE = 8
+
+# Righe invariate tra due blocchi modificati oltre le quali i blocchi restano separati
+MERGE_GAP_ROWS = 3
+
+
+def new_fingerprint() -> SimpleNamespace:
+    """Impronta vuota (il prossimo upload riscrive tutto il foglio)"""
+    return SimpleNamespace(worksheet_id=None, rows=0, cols=0, row_hashes=None, dirty=False)
+
+
+def hash_rows(data: Sequence[Sequence[Any]]) -> List[bytes]:
+    """
+    Calcola l'hash di ogni riga dei valori da scrivere
+
+    Args:
+        data: Righe (liste di celle) come inviate a Google Sheets
+
+    Returns:
+        Lista di hash di ROW_HASH_SIZE byte, uno per riga
+    """
+    return [
+        hashlib.blake2b(
+            json.dumps(list(row), default=str, ensure_ascii=False).encode('utf-8'),
+            digest_size=ROW_HASH_SIZE
+        ).digest()
+        for row in data
+    ]
+
+
+def can_diff(fingerprint: Optional[SimpleNamespace], worksheet_id: int, cols: int) -> bool:
+    """
+    True se l'impronta descrive il contenuto attuale del foglio
+
+    Un foglio ricreato (id diverso) o con un numero di colonne diverso viene
+    riscritto per intero: cambierebbe anche la posizione del timestamp.
+    """
+    return bool(
+        fingerprint
+        and fingerprint.row_hashes is not None
+        and fingerprint.worksheet_id == worksheet_id
+        and fingerprint.cols == cols
+    )
+
+
+def changed_row_ranges(fingerprint: SimpleNamespace, hashes: List[bytes]) -> List[Tuple[int, int]]:
+    """
+    Blocchi di righe da riscrivere rispetto all'impronta salvata
+
+    Le righe nuove (oltre la fine della griglia precedente) sono sempre incluse;
+    blocchi separati da poche righe invariate vengono uniti in un solo range.
+
+    Args:
+        fingerprint: Impronta del foglio (vedi can_diff)
+        hashes: Hash delle nuove righe (hash_rows)
+
+    Returns:
+        Intervalli [inizio, fine) di indici di riga (da 0)
+    """
+    old = fingerprint.row_hashes
+    old_count = len(old) // ROW_HASH_SIZE
+
+    ranges: List[Tuple[int, int]] = []
+    for idx, row_hash in enumerate(hashes):
+        if idx < old_count and old[idx * ROW_HASH_SIZE:(idx + 1) * ROW_HASH_SIZE] == row_hash:
+            continue
+        if ranges and idx - ranges[-1][1] <= MERGE_GAP_ROWS:
+            ranges[-1] = (ranges[-1][0], idx + 1)
+        else:
+            ranges.append((idx, idx + 1))
+    return ranges
+
+
+def invalidate(fingerprint: Optional[SimpleNamespace]):
+    """Dimentica il contenuto del foglio (scrittura in corso o fallita: la prossima sarà completa)"""
+    if fingerprint is None:
+        return
+    fingerprint.row_hashes = None
+    fingerprint.dirty = True
+
+
+def record(fingerprint: Optional[SimpleNamespace], worksheet_id: int, cols: int, hashes: List[bytes]):
+    """
+    Registra la griglia appena scritta
+
+    Args:
+        fingerprint: Impronta da aggiornare (None = modalità incrementale disattivata)
+        worksheet_id: ID del foglio (gid)
+        cols: Colonne dei dati
+        hashes: Hash delle righe scritte
+    """
+    if fingerprint is None:
+        return
+    fingerprint.worksheet_id = worksheet_id
+    fingerprint.rows = len(hashes)
+    fingerprint.cols = cols
+    fingerprint.row_hashes = b''.join(hashes)
+    fingerprint.dirty = True
@@ -0,0 +1,234 @@
+"""
+Conversione del DataFrame del report nei valori da inviare a Google Sheets
+
+La conversione è fatta colonna per colonna con operazioni vettoriali di
+pandas/NumPy, senza chiamate Python per cella:
+
+- celle mancanti (NaN, None, NaT) → cella vuota;
+- numeri scritti all'italiana nelle colonne di testo (es. "1.234,56", "-12,5")
+  → numeri, così su Google Sheets si possono sommare;
+- date → testo ISO ("2024-03-01", con l'ora solo se presente);
+- interi e decimali → tipi Python (int/float), come richiesto da batchUpdate;
+  i decimali con valore intero diventano int.
+
+Il risultato di ogni cella dipende solo dal suo valore, non dal tipo che pandas
+deduce per la colonna: un report letto a batch (dove una colonna può essere
+numerica in un batch e mista in quello dopo) produce gli stessi valori del
+DataFrame intero.
+
+Le colonne convertite vengono raccolte in un'unica matrice object e trasformate
+in liste con una sola tolist().
+"""
+import re
+from datetime import date, datetime, time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Numero all'italiana: migliaia con il punto (opzionali), decimali con la virgola.
+# Gli zeri iniziali ("007") restano testo: sono codici, non quantità; oltre 15 cifre
+# (es. codici a barre) un float perderebbe precisione.
+ITALIAN_NUMBER = r'-?(?:0|[1-9]\d{0,2}(?:\.\d{3}){1,4}|[1-9]\d{0,14})(?:,\d+)?'
+
+# Stessa regola sulla "forma" del valore (cifre da 1 a 9 → 9, lo zero resta 0): la regex
+# viene applicata una volta per forma distinta invece che per cella
+ITALIAN_NUMBER_SHAPE = re.compile(ITALIAN_NUMBER.replace('[1-9]', '9').replace(r'\d', '[09]').encode())
+DIGITS_TO_SHAPE = bytes.maketrans(b'123456789', b'9' * 9)
+
+# Righe campionate per decidere se convertire la colonna valore per valore
+UNIQUE_SAMPLE_ROWS = 1000
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+TIME_FORMAT = '%H:%M:%S'
+
+# Oltre 2^53 un float non rappresenta più tutti gli interi: il valore resta float
+MAX_EXACT_INT = 2 ** 53
+
+
+def _to_float(numbers: bytes) -> np.ndarray:
+    """Numeri all'italiana separati da a capo (b"1.234,56\\n-12", UTF-8) → array float64"""
+    normalized = numbers.replace(b'.', b'').replace(b',', b'.')
+    # Lettura in C senza creare una stringa per valore; i valori sono già stati validati
+    parsed = np.fromstring(normalized, sep='\n')
+    if len(parsed) == normalized.count(b'\n') + 1:
+        return parsed
+    return np.array(normalized.decode().split('\n'), dtype=object).astype('float64')
+
+
+def _italian_numbers(values: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Numeri all'italiana di una colonna di stringhe, senza una regex per cella
+
+    Le celle vengono unite in un unico testo: se non contiene cifre non ci sono
+    candidati e la colonna resta testo; altrimenti la regex viene applicata solo
+    alle forme distinte (es. "9.909,99" per "1.203,45").
+
+    Args:
+        values: Celle della colonna (array object)
+
+    Returns:
+        Tuple (maschera dei numeri, loro valori float64), oppure None se la colonna
+        contiene valori non stringa o con a capo
+    """
+    none = (np.zeros(len(values), dtype=bool), np.empty(0))
+    try:
+        text = '\n'.join(values)
+    except TypeError:
+        return None
+    data = text.encode('utf-8', 'surrogatepass')
+    shapes = data.translate(DIGITS_TO_SHAPE)
+    if b'0' not in shapes and b'9' not in shapes:
+        return none
+
+    lines = shapes.split(b'\n')
+    if len(lines) != len(values):
+        return None
+    distinct = set(lines)
+    valid = {shape for shape in distinct if ITALIAN_NUMBER_SHAPE.fullmatch(shape)}
+    if not valid:
+        return none
+    if len(valid) == len(distinct):
+        return np.ones(len(values), dtype=bool), _to_float(data)
+    is_number = np.fromiter((line in valid for line in lines), dtype=bool, count=len(lines))
+    return is_number, _to_float('\n'.join(values[is_number]).encode())
+
+
+def _python_numbers(numbers: np.ndarray) -> np.ndarray:
+    """float64 → numeri Python: i valori interi diventano int (es. quantità), senza ",0" su Google Sheets"""
+    values = numbers.astype(object)
+    integral = (numbers == np.floor(numbers)) & (np.abs(numbers) < MAX_EXACT_INT)
+    values[integral] = numbers[integral].astype(np.int64).astype(object)
+    return values
+
+
+def _cell_value(value: Any) -> Any:
+    """Cella non di testo di una colonna mista: stesso valore che avrebbe in una colonna del suo tipo"""
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT if value.time() == time() else DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, time):
+        return value.strftime(TIME_FORMAT)
+    if isinstance(value, (float, np.floating)) and float(value).is_integer() and abs(value) < MAX_EXACT_INT:
+        return int(value)
+    return value
+
+
+def _with_numbers(out: np.ndarray, is_number: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+    """Sostituisce in out le celle is_number con i loro valori numerici"""
+    if is_number.any():
+        values = _python_numbers(numbers)
+        if is_number.all():
+            return values
+        out[is_number] = values
+    return out
+
+
+def _parse_text(series: pd.Series) -> np.ndarray:
+    """Celle di testo: numeri all'italiana convertiti, il resto invariato (nessun valore mancante)"""
+    out = series.to_numpy(dtype=object, copy=True)
+    parsed = _italian_numbers(out)
+    if parsed is not None:
+        return _with_numbers(out, *parsed)
+
+    # Colonne miste o con a capo: cella per cella
+    is_text = np.fromiter((isinstance(value, str) for value in out), dtype=bool, count=len(out))
+    for idx in np.flatnonzero(~is_text):
+        out[idx] = _cell_value(out[idx])
+    is_number = np.zeros(len(out), dtype=bool)
+    if is_text.any():
+        is_number[is_text] = series[is_text].str.fullmatch(ITALIAN_NUMBER).to_numpy(dtype=bool)
+    numbers = _to_float('\n'.join(out[is_number]).encode()) if is_number.any() else np.empty(0)
+    return _with_numbers(out, is_number, numbers)
+
+
+def _text_column(series: pd.Series) -> np.ndarray:
+    """Colonna di testo (o mista): vuoti, numeri all'italiana convertiti, il resto invariato"""
+    # Le colonne con pochi valori distinti (prodotti, categorie) si convertono una volta per valore
+    sample = series.iloc[:UNIQUE_SAMPLE_ROWS]
+    if len(series) > UNIQUE_SAMPLE_ROWS and sample.nunique(dropna=False) * 4 < len(sample):
+        codes, uniques = pd.factorize(series)
+        converted = np.append(_parse_text(pd.Series(uniques, dtype=object)), '')
+        return converted[codes]
+
+    # Solo stringhe (caso comune negli export HTML): nessuna cella mancante da cercare
+    out = series.to_numpy(dtype=object, copy=True)
+    parsed = _italian_numbers(out)
+    if parsed is not None:
+        return _with_numbers(out, *parsed)
+
+    missing = series.isna().to_numpy()
+    if not missing.any():
+        return _parse_text(series)
+    out = np.full(len(series), '', dtype=object)
+    out[~missing] = _parse_text(series[~missing])
+    return out
+
+
+def _datetime_column(series: pd.Series) -> np.ndarray:
+    """Colonna di date: testo ISO, con l'ora solo nelle celle che la contengono"""
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    out = series.dt.strftime(DATE_FORMAT).to_numpy(dtype=object, na_value='')
+    has_time = (series.notna() & (series != series.dt.normalize())).to_numpy()
+    if has_time.any():
+        out[has_time] = series[has_time].dt.strftime(DATETIME_FORMAT).to_numpy(dtype=object)
+    return out
+
+
+def _numeric_column(series: pd.Series) -> np.ndarray:
+    """Colonna numerica: tipi Python, NaN → cella vuota"""
+    values = series.to_numpy()
+    if values.dtype.kind == 'f':
+        # Gli interi in una colonna float (es. per una cella vuota nel batch) tornano int
+        missing = np.isnan(values)
+        out = _python_numbers(values)
+        out[missing] = ''
+        return out
+    # Interi e booleani senza valori mancanti: astype(object) produce int/bool Python
+    return values.astype(object)
+
+
+def convert_column(series: pd.Series) -> np.ndarray:
+    """
+    Converte una colonna del report nei valori di Google Sheets
+
+    Args:
+        series: Colonna del DataFrame
+
+    Returns:
+        Array object con un valore per riga (stringa, int, float, bool o '' per le celle vuote)
+    """
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return _datetime_column(series)
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            # Interi/booleani nullable (Int64, boolean): i mancanti diventano celle vuote
+            return series.astype(object).where(series.notna(), '').to_numpy(dtype=object)
+        return _numeric_column(series)
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return _text_column(series)
+    # Altri tipi (categorie, intervalli, ...): come testo
+    return series.astype(str).where(series.notna(), '').to_numpy(dtype=object)
+
+
+def dataframe_to_values(df: pd.DataFrame) -> List[list]:
+    """
+    Valori da scrivere su Google Sheets, una lista per riga
+
+    Args:
+        df: DataFrame del report (senza header)
+
+    Returns:
+        Righe (liste di celle)
+    """
+    rows, cols = df.shape
+    # Ordine per colonne: ogni colonna convertita viene copiata in memoria contigua
+    matrix = np.empty((rows, cols), dtype=object, order='F')
+    for idx in range(cols):
+        matrix[:, idx] = convert_column(df.iloc[:, idx])
+    return matrix.tolist()
@@ -0,0 +1,138 @@
+"""
+Richieste per spreadsheets.batchUpdate di Google Sheets
+
+Un upload diventa una sola chiamata batchUpdate (più chiamate solo per export
+molto grandi): ridimensionamento della griglia alla forma esatta dei dati,
+cancellazione dei valori, scrittura dei valori a blocchi di righe e timestamp.
+Le celle sono indirizzate con GridRange (indici da 0), quindi non ci sono
+limiti di colonna come con le lettere A1.
+"""
+import json
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+# Celle per singola richiesta updateCells
+MAX_CELLS_PER_REQUEST = 20000
+# Dimensione massima consigliata del corpo di una chiamata batchUpdate
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+
+
+def cell_data(value: Any) -> Dict[str, Any]:
+    """
+    Valore di una cella come CellData (equivalente a valueInputOption RAW)
+
+    Args:
+        value: Valore Python (stringa, numero, booleano; '' o None = cella vuota)
+
+    Returns:
+        Dizionario CellData
+    """
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+def resize_request(sheet_id: int, rows: int, cols: int) -> Dict[str, Any]:
+    """Ridimensiona la griglia del foglio (almeno 1x1)"""
+    return {
+        'updateSheetProperties': {
+            'properties': {
+                'sheetId': sheet_id,
+                'gridProperties': {'rowCount': max(rows, 1), 'columnCount': max(cols, 1)},
+            },
+            'fields': 'gridProperties(rowCount,columnCount)',
+        }
+    }
+
+
+def clear_values_request(sheet_id: int) -> Dict[str, Any]:
+    """Cancella i valori di tutto il foglio (la formattazione resta, come worksheet.clear)"""
+    return {
+        'updateCells': {
+            'range': {'sheetId': sheet_id},
+            'fields': 'userEnteredValue',
+        }
+    }
+
+
+def update_cells_requests(
+    sheet_id: int,
+    data: Sequence[Sequence[Any]],
+    start: int,
+    end: int,
+    max_cells: int = MAX_CELLS_PER_REQUEST,
+    row_offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Scrive le righe data[start:end] a partire dalla riga start + row_offset, in blocchi di al massimo max_cells celle
+
+    Args:
+        sheet_id: ID del foglio (gid)
+        data: Tutte le righe
+        start: Prima riga da scrivere (da 0)
+        end: Riga dopo l'ultima da scrivere
+        max_cells: Celle per richiesta
+        row_offset: Riga del foglio corrispondente a data[0] (es. blocco di un giorno nello storico)
+
+    Returns:
+        Richieste updateCells
+    """
+    width = max((len(row) for row in data[start:end]), default=0) or 1
+    step = max(1, max_cells // width)
+
+    requests = []
+    for chunk_start in range(start, end, step):
+        chunk = data[chunk_start:min(chunk_start + step, end)]
+        requests.append({
+            'updateCells': {
+                'start': {'sheetId': sheet_id, 'rowIndex': row_offset + chunk_start, 'columnIndex': 0},
+                'rows': [{'values': [cell_data(value) for value in row]} for row in chunk],
+                'fields': 'userEnteredValue',
+            }
+        })
+    return requests
+
+
+def text_cell_request(sheet_id: int, row: int, col: int, text: str) -> Dict[str, Any]:
+    """Scrive un testo in una cella (indici da 0)"""
+    return {
+        'updateCells': {
+            'start': {'sheetId': sheet_id, 'rowIndex': row, 'columnIndex': col},
+            'rows': [{'values': [cell_data(text)]}],
+            'fields': 'userEnteredValue',
+        }
+    }
+
+
+def split_batches(
+    requests: List[Dict[str, Any]],
+    max_bytes: int = MAX_BATCH_BYTES
+) -> List[Tuple[List[Dict[str, Any]], int]]:
+    """
+    Divide le richieste in chiamate batchUpdate sotto max_bytes (l'ordine resta invariato)
+
+    Args:
+        requests: Richieste nell'ordine di esecuzione
+        max_bytes: Dimensione massima (JSON) di una chiamata
+
+    Returns:
+        Lista di (richieste, byte stimati) per chiamata
+    """
+    batches: List[Tuple[List[Dict[str, Any]], int]] = []
+    current: List[Dict[str, Any]] = []
+    size = 0
+    for request in requests:
+        request_size = len(json.dumps(request, ensure_ascii=False))
+        if current and size + request_size > max_bytes:
+            batches.append((current, size))
+            current, size = [], 0
+        current.append(request)
+        size += request_size
+    if current:
+        batches.append((current, size))
+    return batches
@@ -0,0 +1,167 @@
+"""
+Client Google Sheets condiviso da tutto il processo
+
+Ogni upload creava un nuovo client: rilettura di credentials.json, nuove
+credenziali e un nuovo token OAuth per ogni locale. Qui il client autorizzato
+viene creato una volta per file di credenziali e condiviso tra i thread; il
+token viene rinnovato poco prima della scadenza (sotto lock, una sola volta
+anche con più worker) e gli Spreadsheet/Worksheet già aperti restano in cache
+per tutta l'esecuzione, così un upload costa solo la chiamata di scrittura.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+import gspread
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
+
+from .rate_limit import READ, WRITE, SheetsRateLimiter, get_rate_limiter
+
+
+# Scopes necessari per l'accesso a Google Sheets
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive.file'
+]
+
+# Il token viene rinnovato quando mancano meno di questi secondi alla scadenza
+TOKEN_REFRESH_MARGIN_S = 300
+
+_clients_lock = threading.Lock()
+_clients: Dict[str, 'SharedSheetsClient'] = {}
+
+
+class SharedSheetsClient:
+    """Client gspread autorizzato, con rinnovo del token e cache di fogli e worksheet"""
+
+    def __init__(self, credentials: Credentials):
+        """
+        Inizializza il client condiviso
+
+        Args:
+            credentials: Credenziali del service account
+        """
+        self.credentials = credentials
+        self.client = gspread.authorize(credentials)
+        self._token_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._spreadsheets: Dict[str, gspread.Spreadsheet] = {}
+        self._worksheets: Dict[Tuple[str, str], gspread.Worksheet] = {}
+        # Quote dell'API condivise da tutti gli upload dello stesso service account
+        self.limiter: SheetsRateLimiter = get_rate_limiter(self.service_account)
+
+    @property
+    def service_account(self) -> str:
+        """Email del service account (identifica le quote dell'API)"""
+        return getattr(self.credentials, 'service_account_email', '') or 'default'
+
+    def ensure_token(self) -> bool:
+        """
+        Rinnova il token se manca o sta per scadere
+
+        Returns:
+            True se il token è stato rinnovato in questa chiamata
+        """
+        with self._token_lock:
+            expiry = self.credentials.expiry
+            if self.credentials.token and expiry and expiry - datetime.utcnow() > timedelta(seconds=TOKEN_REFRESH_MARGIN_S):
+                return False
+            self.credentials.refresh(Request())
+            return True
+
+    def open_spreadsheet(self, sheet_id: str, on_retry: Optional[Callable[[], None]] = None) -> gspread.Spreadsheet:
+        """Apre un Google Sheet (una sola volta per esecuzione)"""
+        with self._cache_lock:
+            spreadsheet = self._spreadsheets.get(sheet_id)
+        if spreadsheet is not None:
+            return spreadsheet
+
+        spreadsheet = self.limiter.call(READ, self.client.open_by_key, sheet_id, on_retry=on_retry)
+        with self._cache_lock:
+            return self._spreadsheets.setdefault(sheet_id, spreadsheet)
+
+    def worksheet(
+        self,
+        spreadsheet: gspread.Spreadsheet,
+        title: str,
+        rows: int,
+        cols: int,
+        on_retry: Optional[Callable[[], None]] = None
+    ) -> gspread.Worksheet:
+        """
+        Restituisce il foglio con il titolo indicato, creandolo se non esiste
+
+        Args:
+            spreadsheet: Google Sheet aperto con open_spreadsheet
+            title: Nome del foglio
+            rows: Righe del foglio se va creato
+            cols: Colonne del foglio se va creato
+            on_retry: Callback a ogni nuovo tentativo dopo un 429/5xx
+
+        Returns:
+            Worksheet (dalla cache se già usato in questa esecuzione)
+        """
+        key = (spreadsheet.id, title)
+        with self._cache_lock:
+            worksheet = self._worksheets.get(key)
+        if worksheet is not None:
+            return worksheet
+
+        try:
+            worksheet = self.limiter.call(READ, spreadsheet.worksheet, title, on_retry=on_retry)
+        except gspread.exceptions.WorksheetNotFound:
+            print(f"Foglio '{title}' non trovato, lo creo ({rows}x{cols})...")
+            try:
+                worksheet = self.limiter.call(
+                    WRITE, spreadsheet.add_worksheet, title=title, rows=rows, cols=cols, on_retry=on_retry
+                )
+            except gspread.exceptions.APIError as e:
+                # Retry dopo un 5xx o un timeout di una creazione già applicata da Google
+                if 'already exists' not in str(e):
+                    raise
+                print(f"Foglio '{title}' già creato, lo rileggo")
+                worksheet = self.limiter.call(READ, spreadsheet.worksheet, title, on_retry=on_retry)
+
+        with self._cache_lock:
+            return self._worksheets.setdefault(key, worksheet)
+
+    def set_grid_size(self, worksheet: gspread.Worksheet, rows: int, cols: int):
+        """Aggiorna la dimensione in cache dopo un ridimensionamento fatto con batchUpdate"""
+        grid = worksheet._properties.setdefault('gridProperties', {})
+        grid['rowCount'] = rows
+        grid['columnCount'] = cols
+
+    def forget(self, sheet_id: str):
+        """Scarta dalla cache il Google Sheet e i suoi fogli (es. dopo un errore di scrittura)"""
+        with self._cache_lock:
+            self._spreadsheets.pop(sheet_id, None)
+            for key in [key for key in self._worksheets if key[0] == sheet_id]:
+                del self._worksheets[key]
+
+
+def get_shared_client(credentials_file: str) -> Optional[SharedSheetsClient]:
+    """
+    Client condiviso per un file di credenziali del service account
+
+    Args:
+        credentials_file: Path al file JSON del service account
+
+    Returns:
+        SharedSheetsClient (creato alla prima chiamata), None se il file non esiste
+    """
+    path = os.path.abspath(credentials_file)
+    with _clients_lock:
+        shared = _clients.get(path)
+        if shared is not None:
+            return shared
+
+        if not os.path.exists(path):
+            print(f"File {credentials_file} non trovato")
+            return None
+
+        credentials = Credentials.from_service_account_file(path, scopes=SCOPES)
+        shared = SharedSheetsClient(credentials)
+        _clients[path] = shared
+        return shared
@@ -0,0 +1,128 @@
+"""
+Fogli storici: un foglio in cui ogni giorno aggiunge le proprie righe
+
+Il foglio giornaliero viene riscritto a ogni esecuzione; lo storico invece
+accumula i report, con la data del report nella prima colonna. Un nuovo giorno
+viene scritto dopo l'ultimo giorno del foglio, in righe a posizione nota (una
+chiamata ripetuta riscrive le stesse righe); un giorno già presente viene
+sostituito sul posto (righe inserite o eliminate solo per la differenza), senza
+riscrivere il resto del foglio. Quando un foglio si avvicina al limite di celle si passa al
+foglio successivo ("Storico iPratico 2", ...).
+
+L'indice giorno → foglio e righe è salvato nel database da run_bot: qui ci sono
+solo le operazioni sull'indice in memoria e le richieste per batchUpdate.
+"""
+import threading
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, Dict, List, Sequence
+
+
+# Limite di celle di un Google Sheet (tutti i fogli insieme)
+SPREADSHEET_CELL_LIMIT = 10_000_000
+# Celle di un foglio storico oltre le quali si passa al foglio successivo
+DEFAULT_MAX_CELLS_PER_TAB = 2_000_000
+
+
+def new_history_index() -> SimpleNamespace:
+    """Indice vuoto dei giorni salvati nei fogli storici di un Google Sheet"""
+    return SimpleNamespace(partitions={}, lock=threading.Lock())
+
+
+def new_partition(worksheet_name: str, start_row: int, rows: int, cols: int) -> SimpleNamespace:
+    """Posizione di un giorno nello storico (start_row da 0)"""
+    return SimpleNamespace(worksheet_name=worksheet_name, start_row=start_row, rows=rows, cols=cols, dirty=True)
+
+
+def period_label(report_start: date, report_end: date) -> str:
+    """Etichetta del periodo scritta nella prima colonna (un giorno o un intervallo)"""
+    if report_start == report_end:
+        return report_start.isoformat()
+    return f"{report_start.isoformat()}_{report_end.isoformat()}"
+
+
+def tag_rows(data: Sequence[Sequence[Any]], label: str) -> List[List[Any]]:
+    """Aggiunge l'etichetta del periodo come prima colonna di ogni riga"""
+    return [[label] + list(row) for row in data]
+
+
+def tab_name(base: str, number: int) -> str:
+    """Nome del foglio storico numero number (il primo non ha numero)"""
+    return base if number <= 1 else f"{base} {number}"
+
+
+def current_tab(index: SimpleNamespace, base: str) -> int:
+    """Numero dell'ultimo foglio storico usato (1 se lo storico è vuoto)"""
+    numbers = [1]
+    for partition in index.partitions.values():
+        if partition.worksheet_name == base:
+            continue
+        prefix, _, suffix = partition.worksheet_name.rpartition(' ')
+        if prefix == base and suffix.isdigit():
+            numbers.append(int(suffix))
+    return max(numbers)
+
+
+def needs_rollover(grid_rows: int, grid_cols: int, rows: int, cols: int, max_cells: int) -> bool:
+    """True se accodando rows righe di cols colonne il foglio supererebbe max_cells"""
+    return grid_rows > 1 and (grid_rows + rows) * max(grid_cols, cols) > max_cells
+
+
+def next_start_row(index: SimpleNamespace, worksheet_name: str) -> int:
+    """Prima riga (da 0) dopo l'ultimo giorno salvato nel foglio (0 se il foglio è vuoto)"""
+    return max(
+        (partition.start_row + partition.rows
+         for partition in index.partitions.values() if partition.worksheet_name == worksheet_name),
+        default=0
+    )
+
+
+def resize_rows_requests(worksheet_id: int, partition: SimpleNamespace, rows: int) -> List[Dict[str, Any]]:
+    """
+    Inserisce o elimina righe in fondo al blocco di un giorno per portarlo a rows righe
+
+    Args:
+        worksheet_id: ID del foglio (gid)
+        partition: Posizione attuale del giorno
+        rows: Righe del nuovo report
+
+    Returns:
+        Richieste insertDimension/deleteDimension (lista vuota se il numero di righe non cambia)
+    """
+    delta = rows - partition.rows
+    if delta == 0:
+        return []
+    end = partition.start_row + partition.rows
+    if delta > 0:
+        return [{
+            'insertDimension': {
+                'range': {'sheetId': worksheet_id, 'dimension': 'ROWS', 'startIndex': end, 'endIndex': end + delta},
+                'inheritFromBefore': end > 0,
+            }
+        }]
+    return [{
+        'deleteDimension': {
+            'range': {'sheetId': worksheet_id, 'dimension': 'ROWS', 'startIndex': end + delta, 'endIndex': end},
+        }
+    }]
+
+
+def clear_rows_request(worksheet_id: int, start_row: int, end_row: int) -> Dict[str, Any]:
+    """Cancella i valori delle righe [start_row, end_row) (tutte le colonne)"""
+    return {
+        'updateCells': {
+            'range': {'sheetId': worksheet_id, 'startRowIndex': start_row, 'endRowIndex': end_row},
+            'fields': 'userEnteredValue',
+        }
+    }
+
+
+def shift_partitions(index: SimpleNamespace, worksheet_name: str, after_row: int, delta: int):
+    """Sposta i giorni che seguono after_row nello stesso foglio dopo un inserimento/eliminazione di righe"""
+    if delta == 0:
+        return
+    for partition in index.partitions.values():
+        if partition.worksheet_name == worksheet_name and partition.start_row > after_row:
+            partition.start_row += delta
+            partition.dirty = True
+
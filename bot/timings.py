@@ -0,0 +1,146 @@
+"""
+Misura dei tempi delle fasi del bot (scraper e upload su Google Sheets)
+
+Ogni fase registra inizio e fine (time.monotonic, in secondi dall'avvio del
+timer), numero di retry, dimensione dei dati e righe elaborate. run_bot salva
+le fasi insieme al LocaleLog e stampa una tabella riassuntiva a fine esecuzione.
+"""
+import time
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class StepTimer:
+    """Registra le fasi di un'esecuzione con tempi monotonic, retry e dimensioni"""
+
+    def __init__(self, origin: Optional[float] = None):
+        """
+        Inizializza il timer
+
+        Args:
+            origin: Istante (time.monotonic) da cui misurare le fasi; permette a più
+                timer (es. scraper e thread di upload) di avere tempi confrontabili
+        """
+        self.origin = time.monotonic() if origin is None else origin
+        self._steps: List[Dict[str, Any]] = []
+        self._open: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def step(self, name: str, stage: str = 'scraper'):
+        """
+        Misura un blocco di codice come fase
+
+        Il record restituito può essere aggiornato nel blocco (bytes, rows, success);
+        se il blocco solleva un'eccezione la fase risulta fallita.
+
+        Args:
+            name: Nome della fase (es. login, sheets_write)
+            stage: Componente che esegue la fase (scraper, sheets)
+        """
+        record = {
+            'step': name,
+            'stage': stage,
+            'start_s': time.monotonic() - self.origin,
+            'end_s': None,
+            'retries': 0,
+            'bytes': None,
+            'rows': None,
+            'success': True,
+        }
+        self._open.append(record)
+        try:
+            yield record
+        except BaseException:
+            record['success'] = False
+            raise
+        finally:
+            record['end_s'] = time.monotonic() - self.origin
+            self._open.remove(record)
+            self._steps.append(record)
+
+    def count_retry(self):
+        """Conta un nuovo tentativo nella fase in corso (chiamato da retry_selenium)"""
+        if self._open:
+            self._open[-1]['retries'] += 1
+
+    def annotate(self, **fields):
+        """Aggiunge dati (es. bytes, rows) alla fase in corso"""
+        if self._open:
+            self._open[-1].update(fields)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """
+        Restituisce le fasi concluse dall'ultima chiamata e le rimuove dal timer
+
+        Returns:
+            Lista di fasi in ordine di completamento
+        """
+        steps, self._steps = self._steps, []
+        return steps
+
+
+def timed_step(name: str, stage: str = 'scraper'):
+    """
+    Decorator che misura un metodo come fase usando self.timer (se presente)
+
+    L'esito della fase è il valore di ritorno del metodo (False/None = fallita).
+    Va applicato sopra @retry_selenium, così i tentativi ricadono nella stessa fase.
+
+    Args:
+        name: Nome della fase
+        stage: Componente che esegue la fase
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            timer: Optional[StepTimer] = getattr(self, 'timer', None)
+            if timer is None:
+                return func(self, *args, **kwargs)
+            with timer.step(name, stage) as record:
+                result = func(self, *args, **kwargs)
+                record['success'] = bool(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def format_bytes(size: Optional[int]) -> str:
+    """Dimensione leggibile (B, KB, MB)"""
+    if size is None:
+        return '-'
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def print_steps_summary(steps: Iterable[Dict[str, Any]]):
+    """
+    Stampa una tabella compatta dei tempi aggregati per fase
+
+    Args:
+        steps: Fasi come dizionari di LocaleLogStep.to_dict (step, durata_s, retries, bytes, successo)
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    for step in steps:
+        duration = step['durata_s']
+        entry = totals.setdefault(step['step'], {
+            'count': 0, 'total': 0.0, 'max': 0.0, 'retries': 0, 'failed': 0, 'bytes': None,
+        })
+        entry['count'] += 1
+        entry['total'] += duration
+        entry['max'] = max(entry['max'], duration)
+        entry['retries'] += step['retries'] or 0
+        entry['failed'] += 0 if step['successo'] else 1
+        if step['bytes'] is not None:
+            entry['bytes'] = (entry['bytes'] or 0) + step['bytes']
+
+    if not totals:
+        return
+
+    print(f"\n{'Fase':<22}{'N':>4}{'Totale s':>10}{'Media s':>9}{'Max s':>8}{'Retry':>7}{'Falliti':>9}{'Dati':>10}")
+    for name, entry in totals.items():
+        print(f"{name:<22}{entry['count']:>4}{entry['total']:>10.1f}{entry['total'] / entry['count']:>9.1f}"
+              f"{entry['max']:>8.1f}{entry['retries']:>7}{entry['failed']:>9}{format_bytes(entry['bytes']):>10}")
@@ -0,0 +1,94 @@
+"""
+Pipeline download → upload: gli upload su Google Sheets non bloccano lo scraper
+
+Lo scraper mette ogni report scaricato in una coda limitata e passa subito al
+locale successivo; un pool di thread svuota la coda e carica i report su
+Google Sheets. Chrome e le chiamate HTTPS a Google usano risorse diverse, quindi
+le due fasi procedono in parallelo. Se gli upload restano indietro la coda si
+riempie e lo scraper aspetta (backpressure), così i report in attesa non
+crescono senza limite.
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class UploadPipeline:
+    """Coda limitata di upload svuotata da un pool di thread"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 4):
+        """
+        Inizializza la pipeline
+
+        Args:
+            workers: Upload contemporanei
+            max_pending: Report in coda oltre i quali lo scraper attende
+        """
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Any] = {'jobs': 0, 'backpressure_s': 0.0, 'waits': 0}
+
+    def start(self):
+        """Avvia i thread di upload"""
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'upload-{n + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Mette in coda un upload; se la coda è piena attende che si liberi un posto
+
+        Args:
+            func: Funzione di upload, eseguita da un thread del pool
+
+        Returns:
+            Future con il risultato (o l'eccezione) di func
+        """
+        future: Future = Future()
+        job = (future, func, args, kwargs)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            print(f"  ⏳ Upload in ritardo ({self._queue.qsize()} in coda), lo scraper attende...")
+            start = time.monotonic()
+            self._queue.put(job)
+            with self._stats_lock:
+                self.stats['waits'] += 1
+                self.stats['backpressure_s'] += time.monotonic() - start
+        return future
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            future, func, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._stats_lock:
+                    self.stats['jobs'] += 1
+
+    def shutdown(self):
+        """Attende gli upload in coda e ferma i thread"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def print_summary(self):
+        """Stampa upload eseguiti e tempo di attesa dello scraper per coda piena"""
+        if not self.stats['jobs']:
+            return
+        print(f"Pipeline upload: {self.stats['jobs']} upload su {self.workers} thread, "
+              f"scraper in attesa {self.stats['waits']} volte ({self.stats['backpressure_s']:.1f}s)")
@@ -0,0 +1,189 @@
+"""
+Attese basate su condizioni DOM/rete al posto dei time.sleep fissi
+
+Ogni step dello scraper dichiara in config.json (sezione "wait_conditions") le
+condizioni che indicano che la pagina è pronta. I vecchi tempi di attesa della
+sezione "navigation" restano come limite massimo: lo step prosegue appena le
+condizioni sono soddisfatte, oppure allo scadere del limite.
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .config_manager import ConfigManager
+
+
+# Step -> (chiave "navigation" usata come limite massimo, default in secondi)
+STEP_TIMEOUTS: Dict[str, Tuple[str, float]] = {
+    'after_login': ('wait_after_login', 3),
+    'after_pin': ('wait_after_pin', 2),
+    'after_menu_main': ('wait_after_menu_click', 2),
+    'after_menu_submenu': ('wait_after_menu_click', 2),
+    'after_locale_select': ('wait_after_locale_select', 2),
+    'after_date_select': ('wait_after_date_select', 2),
+    'after_aggiornamento': ('wait_after_aggiornamento', 3),
+}
+
+# Script iniettato in ogni pagina per contare le richieste XHR/fetch in corso
+PENDING_REQUESTS_SCRIPT = """
+(function() {
+    if (window.__botPendingRequests !== undefined) { return; }
+    window.__botPendingRequests = 0;
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__botPendingRequests++;
+        this.addEventListener('loadend', function() { window.__botPendingRequests--; });
+        return origSend.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var origFetch = window.fetch;
+        window.fetch = function() {
+            window.__botPendingRequests++;
+            return origFetch.apply(this, arguments).finally(function() {
+                window.__botPendingRequests--;
+            });
+        };
+    }
+})();
+"""
+
+XHR_IDLE_SCRIPT = """
+var pending = window.__botPendingRequests || 0;
+var jq = (window.jQuery && window.jQuery.active) || 0;
+return document.readyState === 'complete' && pending <= 0 && jq === 0;
+"""
+
+
+class WaitEngine:
+    """Attende le condizioni configurate per ogni step e registra quanto ha atteso"""
+
+    def __init__(self, config_manager: ConfigManager, poll_interval: float = 0.1):
+        """
+        Inizializza il motore di attesa
+
+        Args:
+            config_manager: Gestore della configurazione
+            poll_interval: Intervallo (secondi) tra due verifiche delle condizioni
+        """
+        self.config = config_manager
+        self.poll_interval = poll_interval
+        self.driver = None
+        # Lista di (step, secondi attesi, limite massimo, condizione soddisfatta)
+        self.timings: List[Tuple[str, float, float, bool]] = []
+
+    def attach(self, driver):
+        """
+        Collega il driver e installa il contatore delle richieste XHR/fetch
+
+        Args:
+            driver: WebDriver Chrome appena creato
+        """
+        self.driver = driver
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PENDING_REQUESTS_SCRIPT})
+        except Exception as e:
+            # Senza contatore, xhr_idle usa solo jQuery.active e document.readyState
+            print(f"⚠ Contatore richieste XHR non installato: {e}")
+
+    def get_timeout(self, step: str) -> float:
+        """Restituisce il limite massimo di attesa per uno step (dai valori "navigation")"""
+        nav_config = self.config.get_navigation_config()
+        key, default = STEP_TIMEOUTS.get(step, ('wait_' + step, 2))
+        return float(nav_config.get(key, default))
+
+    def _build_condition(self, spec: Dict[str, Any], previous_url: Optional[str]) -> Callable[[Any], bool]:
+        """Converte una condizione di config.json in una funzione driver -> bool"""
+        kind = spec.get('type')
+        selector = spec.get('selector')
+
+        def displayed(driver) -> bool:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            return any(el.is_displayed() for el in elements)
+
+        if kind == 'url_changed':
+            return lambda driver: previous_url is None or driver.current_url != previous_url
+        if kind == 'url_contains':
+            return lambda driver: spec.get('value', '') in driver.current_url
+        if kind == 'element_present':
+            return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, selector)) > 0
+        if kind == 'element_visible':
+            return displayed
+        if kind == 'element_invisible':
+            # Spinner/modal spariti (o mai comparsi)
+            return lambda driver: not displayed(driver)
+        if kind == 'min_elements':
+            count = int(spec.get('count', 1))
+            return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, selector)) >= count
+        if kind == 'xhr_idle':
+            return lambda driver: bool(driver.execute_script(XHR_IDLE_SCRIPT))
+        if kind == 'document_ready':
+            return lambda driver: driver.execute_script("return document.readyState") == 'complete'
+
+        raise ValueError(f"Tipo di condizione di attesa sconosciuto: {kind}")
+
+    def wait(self, step: str, previous_url: Optional[str] = None) -> float:
+        """
+        Attende che le condizioni dello step siano soddisfatte (entro il limite massimo)
+
+        Senza condizioni configurate lo step attende l'intero limite, come il vecchio time.sleep.
+
+        Args:
+            step: Nome dello step (es. 'after_login')
+            previous_url: URL prima dell'azione, usato dalla condizione 'url_changed'
+
+        Returns:
+            Secondi effettivamente attesi
+        """
+        timeout = self.get_timeout(step)
+        step_config = self.config.get_wait_conditions().get(step)
+        start = time.monotonic()
+
+        if not step_config or not self.driver:
+            time.sleep(timeout)
+            waited = time.monotonic() - start
+            self.timings.append((step, waited, timeout, False))
+            return waited
+
+        conditions = [self._build_condition(spec, previous_url) for spec in step_config.get('conditions', [])]
+        # Le condizioni devono restare vere per stable_for secondi (evita di anticipare una XHR non ancora partita)
+        stable_for = float(step_config.get('stable_for', 0.3))
+        satisfied_since = [None]
+
+        def ready(driver) -> bool:
+            try:
+                ok = all(condition(driver) for condition in conditions)
+            except WebDriverException:
+                ok = False
+            if not ok:
+                satisfied_since[0] = None
+                return False
+            if satisfied_since[0] is None:
+                satisfied_since[0] = time.monotonic()
+            return time.monotonic() - satisfied_since[0] >= stable_for
+
+        satisfied = True
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval).until(ready)
+        except TimeoutException:
+            satisfied = False
+
+        waited = time.monotonic() - start
+        self.timings.append((step, waited, timeout, satisfied))
+
+        if satisfied:
+            print(f"  ⏱ {step}: pronto dopo {waited:.2f}s (max {timeout:.0f}s)")
+        else:
+            print(f"  ⏱ {step}: condizioni non soddisfatte, proseguo dopo {waited:.2f}s (limite raggiunto)")
+
+        return waited
+
+    def print_summary(self):
+        """Stampa il tempo totale atteso rispetto ai vecchi sleep fissi"""
+        if not self.timings:
+            return
+        waited = sum(t[1] for t in self.timings)
+        budget = sum(t[2] for t in self.timings)
+        print(f"⏱ Attese totali: {waited:.1f}s (sleep fissi equivalenti: {budget:.0f}s, "
+              f"risparmiati {budget - waited:.1f}s)")
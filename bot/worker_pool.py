@@ -0,0 +1,113 @@
+"""
+Pool limitato di worker per eseguire più locali in parallelo
+
+Ogni worker pilota un proprio Chrome headless, quindi il numero di job attivi
+è limitato sia dal numero di worker sia dalla memoria libera della macchina
+(admission control), per evitare che i browser mandino in OOM il runner.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Any
+
+
+# Stima prudente della memoria occupata da un Chrome headless sulla dashboard
+DEFAULT_MB_PER_BROWSER = 500
+
+
+def available_memory_mb() -> Optional[float]:
+    """
+    Restituisce la memoria disponibile in MB
+
+    Returns:
+        MB disponibili, oppure None se non è possibile determinarli
+    """
+    # Linux (GitHub Actions): MemAvailable da /proc/meminfo
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # Altri sistemi: psutil se installato
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class BrowserWorkerPool:
+    """Esegue job in parallelo con un numero massimo di browser attivi"""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        mb_per_browser: float = DEFAULT_MB_PER_BROWSER,
+        poll_interval: float = 2.0
+    ):
+        """
+        Inizializza il pool
+
+        Args:
+            workers: Numero massimo di job contemporanei
+            mb_per_browser: Memoria libera (MB) richiesta per avviare un nuovo browser
+            poll_interval: Intervallo (secondi) tra i controlli di memoria e completamento
+        """
+        self.workers = max(1, workers)
+        self.mb_per_browser = mb_per_browser
+        self.poll_interval = poll_interval
+
+    def can_admit(self, running: int) -> bool:
+        """Verifica se c'è memoria sufficiente per avviare un altro browser"""
+        # Almeno un job deve sempre poter partire, altrimenti il pool si blocca
+        if running == 0:
+            return True
+
+        free_mb = available_memory_mb()
+        if free_mb is None:
+            return True
+
+        if free_mb < self.mb_per_browser:
+            print(f"  ⏳ Memoria libera insufficiente ({free_mb:.0f} MB < {self.mb_per_browser:.0f} MB), "
+                  f"attendo prima di avviare un altro browser ({running} attivi)")
+            return False
+
+        return True
+
+    def run(self, func: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Esegue func su ogni elemento e restituisce i risultati man mano che terminano
+
+        Args:
+            func: Funzione da eseguire per ogni elemento
+            items: Elementi da processare
+
+        Yields:
+            Tuple (elemento, risultato) nell'ordine di completamento
+        """
+        queue = list(items)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='locale') as executor:
+            futures = {}
+
+            while queue or futures:
+                # Avvia nuovi job finché ci sono worker liberi e memoria sufficiente
+                while queue and len(futures) < self.workers and self.can_admit(len(futures)):
+                    item = queue.pop(0)
+                    futures[executor.submit(func, item)] = item
+
+                done, _ = wait(list(futures), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    item = futures.pop(future)
+                    yield item, future.result()
+
+
+def get_workers_from_env(default: int = 1) -> int:
+    """Legge il numero di worker dalla variabile d'ambiente BOT_WORKERS"""
+    try:
+        return max(1, int(os.getenv('BOT_WORKERS', default)))
+    except ValueError:
+        return default
@@ -5,18 +5,42 @@ Legge i locali configurati dal database e esegue il download per ognuno
 """
 import os
 import sys
-from datetime import datetime, timedelta
+import atexit
+import argparse
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
 import pytz
 
 # Aggiungi il path del backend
 sys.path.insert(0, str(Path(__file__).parent / 'backend'))
 
-from backend.models import db, Locale, LocaleLog
+from backend.models import (
+    db, Locale, LocaleLog, LocaleLogStep, LocaleCheckpoint, SheetFingerprint, SheetContent,
+    HistoryPartition
+)
 from backend.crypto import CryptoManager
+from backend.migrations import upgrade
 from bot.config_manager import ConfigManager
-from bot.scraper import DashboardScraper
+from bot.scraper import DashboardScraper, get_report_date
+from bot.browser_pool import BrowserPool
 from bot.google_sheets import GoogleSheetsUploader
+from bot.rate_limit import configure_rate_limits, print_rate_limit_summary
+from bot.report_artifact import ReportArtifact
+from bot.session_cache import SessionCache
+from bot.timings import StepTimer, print_steps_summary
+from bot.upload_pipeline import UploadPipeline
+from bot.checkpoints import (
+    new_checkpoint, is_resumable, mark_downloaded, mark_parsed, mark_uploaded, prune_files, remove_file,
+    restore_artifact
+)
+from bot.sheet_fingerprint import new_fingerprint
+from bot.sheet_content import new_content_state
+from bot.sheets_history import DEFAULT_MAX_CELLS_PER_TAB, new_history_index, new_partition
+from bot.worker_pool import BrowserWorkerPool, DEFAULT_MB_PER_BROWSER, get_workers_from_env
+
+# Giorni dopo cui i checkpoint (e i file salvati) vengono eliminati
+CHECKPOINT_RETENTION_DAYS = 30
 
 
 def setup_database():
@@ -47,8 +71,9 @@ def setup_database():
 
     db.init_app(app)
 
+    # Schema allineato alle migrazioni (tabelle, colonne e indici mancanti)
     with app.app_context():
-        db.create_all()
+        upgrade(db.engine)
 
     return app
 
@@ -105,92 +130,738 @@ def should_run_locale(locale, app) -> bool:
     return True
 
 
-def process_locale(locale, config, crypto, credentials_file):
-    """Processa un singolo locale"""
-
-    print("\n" + "="*60)
-    print(f"LOCALE: {locale.nome}")
-    print("="*60)
+def snapshot_locale(locale):
+    """
+    Copia i campi del locale necessari al bot in un oggetto indipendente dalla sessione DB
 
-    log_entry = LocaleLog(
-        locale_id=locale.id,
-        eseguito_at=datetime.utcnow(),
-        successo=False
+    I worker paralleli non devono toccare gli oggetti ORM: dopo ogni commit
+    SQLAlchemy li fa scadere e un accesso da un altro thread ricaricherebbe
+    i dati usando la sessione del thread principale.
+    """
+    return SimpleNamespace(
+        id=locale.id,
+        nome=locale.nome,
+        username=locale.username,
+        password_encrypted=locale.password_encrypted,
+        pin_encrypted=locale.pin_encrypted,
+        locale_selector=locale.locale_selector,
+        google_sheet_id=locale.google_sheet_id
     )
 
-    try:
-        # Decifra le credenziali
-        password = crypto.decrypt(locale.password_encrypted)
-        pin = crypto.decrypt(locale.pin_encrypted) if locale.pin_encrypted else '123456'
 
-        # Crea AuthManager custom per questo locale
-        class LocaleAuthManager:
-            def __init__(self, username, password):
-                self.username = username
-                self.password = password
+class LocaleAuthManager:
+    """AuthManager con le credenziali (già decifrate) di un account iPratico"""
 
-            def get_credentials(self):
-                return self.username, self.password
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
 
-        auth = LocaleAuthManager(locale.username, password)
+    def get_credentials(self):
+        return self.username, self.password
 
-        # Step 1: Download
-        print(f"\n[STEP 1/2] DOWNLOAD DA iPRATICO")
-        print(f"Username: {locale.username}")
-        print(f"Locale Selector: {locale.locale_selector or 'Default'}")
-        print("-" * 60)
 
-        scraper = DashboardScraper(config, auth)
-        downloaded_file = scraper.run(pin=pin, locale_selector=locale.locale_selector)
+def group_locali_by_account(locali, crypto):
+    """
+    Raggruppa i locali che usano lo stesso account iPratico (username, password e PIN)
 
-        if not downloaded_file:
-            log_entry.messaggio = "Download fallito"
-            return log_entry
+    I locali dello stesso gruppo vengono scaricati con un'unica sessione del browser.
 
-        log_entry.file_scaricato = downloaded_file
-        print(f"\n✓ File scaricato: {downloaded_file}")
+    Args:
+        locali: Locali (o snapshot) da raggruppare
+        crypto: CryptoManager per decifrare le credenziali
 
-        # Step 2: Upload su Google Sheets
-        print(f"\n[STEP 2/2] UPLOAD SU GOOGLE SHEETS")
-        print(f"Sheet ID: {locale.google_sheet_id}")
-        print("-" * 60)
+    Returns:
+        Lista di gruppi (liste di locali), nell'ordine di prima apparizione
+    """
+    gruppi = {}
+    for locale in locali:
+        try:
+            password = crypto.decrypt(locale.password_encrypted)
+            pin = crypto.decrypt(locale.pin_encrypted) if locale.pin_encrypted else '123456'
+            key = (locale.username, password, pin)
+        except Exception:
+            # Credenziali non decifrabili: il locale resta da solo e l'errore verrà registrato nel log
+            key = ('locale', locale.id)
+        gruppi.setdefault(key, []).append(locale)
+    return list(gruppi.values())
+
+
+def get_worksheet_name(config, date_range=None):
+    """
+    Restituisce il foglio in cui scrivere il report
 
-        uploader = GoogleSheetsUploader()
+    Args:
+        config: ConfigManager del bot
+        date_range: Intervallo (data inizio, data fine) del backfill, None per l'esecuzione giornaliera
 
-        if not uploader.authenticate_service_account(credentials_file):
-            log_entry.messaggio = "Autenticazione Google fallita"
-            return log_entry
+    Returns:
+        Nome del foglio: quello giornaliero, oppure uno per ogni giorno/intervallo del backfill
+    """
+    sheets_config = config.get_google_sheets_config()
+    if not date_range:
+        return sheets_config.get('worksheet_name', 'Dati iPratico')
+
+    date_start, date_end = date_range
+    label = date_start.isoformat() if date_start == date_end else f"{date_start.isoformat()}_{date_end.isoformat()}"
+    return sheets_config.get('backfill_worksheet_name', 'Dati iPratico {date}').format(date=label)
+
+
+def build_date_ranges(date_from, date_to, single_export=False):
+    """
+    Costruisce gli intervalli di date del backfill
+
+    Args:
+        date_from: Primo giorno
+        date_to: Ultimo giorno (incluso)
+        single_export: Se True tutto l'intervallo viene richiesto con un solo export
+
+    Returns:
+        Lista di tuple (data inizio, data fine)
+    """
+    if single_export:
+        return [(date_from, date_to)]
+    days = [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+    return [(day, day) for day in days]
+
+
+def checkpoint_key(locale_id, date_range=None):
+    """
+    Chiave del checkpoint di un download: locale e giorni del report
+
+    Args:
+        locale_id: ID del locale
+        date_range: Intervallo (data inizio, data fine), None per il report giornaliero (ieri)
+
+    Returns:
+        Tupla (locale_id, data inizio, data fine)
+    """
+    date_start, date_end = date_range or (get_report_date(), get_report_date())
+    return (locale_id, date_start, date_end)
+
+
+def checkpoint_file_name(key, path):
+    """Nome del file di un checkpoint: chiave del download ed estensione del file scaricato"""
+    locale_id, date_start, date_end = key
+    return f"{locale_id}_{date_start.isoformat()}_{date_end.isoformat()}{os.path.splitext(path)[1]}"
+
+
+def load_checkpoints(locali, date_ranges=None):
+    """
+    Carica i checkpoint ancora da completare dei download di questa esecuzione
+
+    Va chiamata dal thread principale (con app context): i worker ricevono solo
+    gli snapshot e li aggiornano in memoria.
+
+    Args:
+        locali: Locali (o snapshot) da processare
+        date_ranges: Intervalli del backfill (default: solo ieri)
 
-        success = uploader.write_excel_to_sheet(
+    Returns:
+        Dizionario chiave (vedi checkpoint_key) -> checkpoint (SimpleNamespace)
+    """
+    wanted = {
+        checkpoint_key(locale.id, date_range)
+        for locale in locali for date_range in (date_ranges or [None])
+    }
+    checkpoints = {}
+    rows = LocaleCheckpoint.query.filter(
+        LocaleCheckpoint.locale_id.in_([locale.id for locale in locali])
+    ).all()
+    for row in rows:
+        key = (row.locale_id, row.report_start, row.report_end)
+        if key not in wanted or not is_resumable(row):
+            continue
+        checkpoint = new_checkpoint()
+        for field in ('stage', 'file_name', 'file_hash', 'file_size', 'rows', 'cols'):
+            setattr(checkpoint, field, getattr(row, field))
+        checkpoints[key] = checkpoint
+    return checkpoints
+
+
+def save_checkpoints(checkpoints, keys):
+    """
+    Salva nel database i checkpoint modificati dai worker (thread principale)
+
+    Args:
+        checkpoints: Dizionario chiave -> checkpoint, come restituito da load_checkpoints
+        keys: Chiavi dei download conclusi (le altre possono essere ancora in uso dai worker)
+    """
+    for key in keys:
+        checkpoint = checkpoints.get(key)
+        if checkpoint is None or not checkpoint.dirty:
+            continue
+        locale_id, report_start, report_end = key
+        row = LocaleCheckpoint.query.filter_by(
+            locale_id=locale_id, report_start=report_start, report_end=report_end
+        ).first()
+        if row is None:
+            row = LocaleCheckpoint(locale_id=locale_id, report_start=report_start, report_end=report_end)
+            db.session.add(row)
+        for field in ('stage', 'file_name', 'file_hash', 'file_size', 'rows', 'cols'):
+            setattr(row, field, getattr(checkpoint, field))
+        row.updated_at = datetime.utcnow()
+        checkpoint.dirty = False
+
+
+def fingerprint_keys(locali, config, date_ranges=None):
+    """Fogli (sheet_id, nome del foglio) scritti dai locali in questa esecuzione"""
+    return [
+        (locale.google_sheet_id, get_worksheet_name(config, date_range))
+        for locale in locali for date_range in (date_ranges or [None])
+    ]
+
+
+def load_fingerprints(locali, config, date_ranges=None):
+    """
+    Carica le impronte dei fogli da aggiornare in modo incrementale (thread principale)
+
+    Ogni foglio della run ha un'impronta, anche vuota: i worker la aggiornano
+    in memoria e il dizionario non cambia durante l'esecuzione.
+
+    Args:
+        locali: Locali (o snapshot) da processare
+        config: ConfigManager del bot
+        date_ranges: Intervalli del backfill (default: solo ieri)
+
+    Returns:
+        Dizionario (sheet_id, nome del foglio) -> impronta (SimpleNamespace)
+    """
+    fingerprints = {key: new_fingerprint() for key in fingerprint_keys(locali, config, date_ranges)}
+    rows = SheetFingerprint.query.filter(
+        SheetFingerprint.sheet_id.in_({sheet_id for sheet_id, _ in fingerprints})
+    ).all()
+    for row in rows:
+        fingerprint = fingerprints.get((row.sheet_id, row.worksheet_name))
+        if fingerprint is None:
+            continue
+        for field in ('worksheet_id', 'rows', 'cols', 'row_hashes'):
+            setattr(fingerprint, field, getattr(row, field))
+    return fingerprints
+
+
+def save_fingerprints(fingerprints, keys):
+    """
+    Salva nel database le impronte aggiornate dai worker (thread principale)
+
+    Args:
+        fingerprints: Dizionario come restituito da load_fingerprints
+        keys: Fogli dei locali conclusi
+    """
+    for key in keys:
+        fingerprint = fingerprints.get(key)
+        if fingerprint is None or not fingerprint.dirty:
+            continue
+        sheet_id, worksheet_name = key
+        row = SheetFingerprint.query.filter_by(sheet_id=sheet_id, worksheet_name=worksheet_name).first()
+        if row is None:
+            row = SheetFingerprint(sheet_id=sheet_id, worksheet_name=worksheet_name)
+            db.session.add(row)
+        for field in ('worksheet_id', 'rows', 'cols', 'row_hashes'):
+            setattr(row, field, getattr(fingerprint, field))
+        fingerprint.dirty = False
+
+
+def content_keys(locali, config, date_ranges=None):
+    """Fogli (id locale, sheet_id, nome del foglio) scritti dai locali in questa esecuzione"""
+    return [
+        (locale.id, locale.google_sheet_id, get_worksheet_name(config, date_range))
+        for locale in locali for date_range in (date_ranges or [None])
+    ]
+
+
+def load_contents(locali, config, date_ranges=None):
+    """
+    Carica gli hash dell'ultimo contenuto scritto su ogni foglio (thread principale)
+
+    Args:
+        locali: Locali (o snapshot) da processare
+        config: ConfigManager del bot
+        date_ranges: Intervalli del backfill (default: solo ieri)
+
+    Returns:
+        Dizionario (id locale, sheet_id, nome del foglio) -> stato (SimpleNamespace)
+    """
+    contents = {key: new_content_state() for key in content_keys(locali, config, date_ranges)}
+    rows = SheetContent.query.filter(
+        SheetContent.locale_id.in_({locale_id for locale_id, _, _ in contents})
+    ).all()
+    for row in rows:
+        state = contents.get((row.locale_id, row.sheet_id, row.worksheet_name))
+        if state is None:
+            continue
+        for field in ('worksheet_id', 'rows', 'cols', 'content_hash'):
+            setattr(state, field, getattr(row, field))
+    return contents
+
+
+def save_contents(contents, keys):
+    """
+    Salva nel database gli hash aggiornati dai worker (thread principale)
+
+    Args:
+        contents: Dizionario come restituito da load_contents
+        keys: Fogli dei locali conclusi
+    """
+    for key in keys:
+        state = contents.get(key)
+        if state is None or not state.dirty:
+            continue
+        locale_id, sheet_id, worksheet_name = key
+        row = SheetContent.query.filter_by(
+            locale_id=locale_id, sheet_id=sheet_id, worksheet_name=worksheet_name
+        ).first()
+        if row is None:
+            row = SheetContent(locale_id=locale_id, sheet_id=sheet_id, worksheet_name=worksheet_name)
+            db.session.add(row)
+        for field in ('worksheet_id', 'rows', 'cols', 'content_hash'):
+            setattr(row, field, getattr(state, field))
+        state.dirty = False
+
+
+def forget_sheet_state(app, fingerprint_key=None, content_key=None):
+    """
+    Elimina subito dal database impronta e hash del contenuto di un foglio (thread del worker)
+
+    Va chiamata prima di scrivere il foglio: se la scrittura si interrompe (processo
+    terminato o batchUpdate successivo fallito) il database non contiene un'impronta
+    che sembra valida e la run successiva riscrive tutto il foglio. I valori
+    aggiornati vengono salvati da save_fingerprints/save_contents a fine sessione.
+
+    Args:
+        app: Flask app (ogni chiamata usa un proprio app context e una propria sessione)
+        fingerprint_key: Chiave dell'impronta (vedi fingerprint_keys), None se non usata
+        content_key: Chiave dell'hash del contenuto (vedi content_keys), None se non usato
+    """
+    with app.app_context():
+        if fingerprint_key is not None:
+            sheet_id, worksheet_name = fingerprint_key
+            SheetFingerprint.query.filter_by(sheet_id=sheet_id, worksheet_name=worksheet_name).delete()
+        if content_key is not None:
+            locale_id, sheet_id, worksheet_name = content_key
+            SheetContent.query.filter_by(
+                locale_id=locale_id, sheet_id=sheet_id, worksheet_name=worksheet_name
+            ).delete()
+        db.session.commit()
+
+
+def history_key(locale_id, date_range=None):
+    """Periodo di un report nello storico: (id locale, data inizio, data fine)"""
+    date_start, date_end = date_range or (get_report_date(), get_report_date())
+    return (locale_id, date_start, date_end)
+
+
+def load_history(locali):
+    """
+    Carica l'indice dei fogli storici dei Google Sheet dei locali (thread principale)
+
+    Contiene anche i giorni di altri locali che scrivono sullo stesso Google
+    Sheet: una sostituzione sposta le righe di tutti i giorni che seguono.
+
+    Args:
+        locali: Locali (o snapshot) da processare
+
+    Returns:
+        Dizionario sheet_id -> indice dello storico (vedi sheets_history)
+    """
+    history = {locale.google_sheet_id: new_history_index() for locale in locali}
+    rows = HistoryPartition.query.filter(HistoryPartition.sheet_id.in_(set(history))).all()
+    for row in rows:
+        partition = new_partition(row.worksheet_name, row.start_row, row.rows, row.cols)
+        partition.dirty = False
+        history[row.sheet_id].partitions[(row.locale_id, row.report_start, row.report_end)] = partition
+    return history
+
+
+def save_history(history, sheet_ids):
+    """
+    Salva nel database le posizioni dello storico aggiornate dai worker (thread principale)
+
+    Args:
+        history: Dizionario come restituito da load_history
+        sheet_ids: Google Sheet dei locali conclusi
+    """
+    for sheet_id in set(sheet_ids):
+        index = history.get(sheet_id)
+        if index is None:
+            continue
+        # Gli upload di altri gruppi sullo stesso Google Sheet possono essere in corso
+        with index.lock:
+            for (locale_id, report_start, report_end), partition in index.partitions.items():
+                if not partition.dirty:
+                    continue
+                row = HistoryPartition.query.filter_by(
+                    locale_id=locale_id, report_start=report_start, report_end=report_end
+                ).first()
+                if row is None:
+                    row = HistoryPartition(locale_id=locale_id, report_start=report_start, report_end=report_end)
+                    db.session.add(row)
+                row.sheet_id = sheet_id
+                for field in ('worksheet_name', 'start_row', 'rows', 'cols'):
+                    setattr(row, field, getattr(partition, field))
+                partition.dirty = False
+
+
+def upload_locale(locale, downloaded_file, log_entry, credentials_file, worksheet_name="Dati iPratico", timer=None,
+                  checkpoint=None, fingerprint=None, content=None, history=None, report_key=None,
+                  history_config=None, before_write=None):
+    """
+    Carica su Google Sheets il file scaricato per un locale e aggiorna il log
+
+    Args:
+        locale: Locale (o snapshot del locale)
+        downloaded_file: File scaricato da iPratico (path o ReportArtifact dello scraper)
+        log_entry: LocaleLog da aggiornare
+        credentials_file: File delle credenziali Google
+        worksheet_name: Foglio di destinazione
+        timer: Registro dei tempi delle fasi (opzionale)
+        checkpoint: Checkpoint del locale da aggiornare con l'esito di lettura e upload (opzionale)
+        fingerprint: Impronta del foglio per l'aggiornamento incrementale (opzionale)
+        content: Hash dell'ultimo contenuto scritto sul foglio, per saltare gli upload invariati (opzionale)
+        history: Indice dello storico del Google Sheet; se presente il report viene aggiunto allo storico (opzionale)
+        report_key: Periodo del report nello storico (vedi history_key)
+        history_config: Sezione google_sheets.history della configurazione
+        before_write: Chiamata prima di scrivere il foglio (vedi forget_sheet_state)
+
+    Returns:
+        Il LocaleLog aggiornato
+    """
+    print(f"\n[STEP 2/2] UPLOAD SU GOOGLE SHEETS - {locale.nome}")
+    print(f"Sheet ID: {locale.google_sheet_id}")
+    print("-" * 60)
+
+    uploader = GoogleSheetsUploader(timer=timer)
+
+    if not uploader.authenticate_service_account(credentials_file):
+        log_entry.messaggio = "Autenticazione Google fallita"
+        return log_entry
+
+    success = uploader.write_excel_to_sheet(
+        excel_file=downloaded_file,
+        sheet_id=locale.google_sheet_id,
+        worksheet_name=worksheet_name,
+        clear_existing=True,
+        fingerprint=fingerprint,
+        content=content,
+        before_write=before_write
+    )
+
+    if not success:
+        # Il file resta nel checkpoint: il prossimo tentativo riparte da qui
+        if checkpoint is not None and uploader.last_read:
+            mark_parsed(checkpoint, uploader.last_read['rows'], uploader.last_read['cols'],
+                        uploader.last_read['sha256'])
+        log_entry.messaggio = "Upload Google Sheets fallito"
+        return log_entry
+
+    # Dati invariati e giorno già nello storico: niente da riscrivere
+    if history is not None and not (uploader.skipped_unchanged and report_key in history.partitions):
+        history_config = history_config or {}
+        if not uploader.append_history(
             excel_file=downloaded_file,
             sheet_id=locale.google_sheet_id,
-            worksheet_name="Dati iPratico",
-            clear_existing=True
-        )
-
-        if not success:
-            log_entry.messaggio = "Upload Google Sheets fallito"
+            key=report_key,
+            index=history,
+            worksheet_name=history_config.get('worksheet_name', 'Storico iPratico'),
+            max_cells=history_config.get('max_cells_per_tab', DEFAULT_MAX_CELLS_PER_TAB)
+        ):
+            # Il tentativo successivo sostituisce il giorno nello storico invece di duplicarlo
+            if checkpoint is not None and uploader.last_read:
+                mark_parsed(checkpoint, uploader.last_read['rows'], uploader.last_read['cols'],
+                            uploader.last_read['sha256'])
+            log_entry.sheet_aggiornato = True
+            log_entry.messaggio = "Storico Google Sheets non aggiornato"
             return log_entry
 
-        log_entry.successo = True
-        log_entry.sheet_aggiornato = True
+    if checkpoint is not None:
+        mark_uploaded(checkpoint, uploader.last_read['sha256'] if uploader.last_read else None)
+
+    log_entry.successo = True
+    log_entry.sheet_aggiornato = True
+    if uploader.skipped_unchanged:
+        log_entry.upload_saltato = True
+        log_entry.messaggio = "Completato: dati invariati, aggiornato solo il timestamp"
+    else:
         log_entry.messaggio = "Completato con successo"
 
-        print("\n✓✓✓ LOCALE COMPLETATO CON SUCCESSO! ✓✓✓")
+    print(f"\n✓✓✓ LOCALE {locale.nome} COMPLETATO CON SUCCESSO! ✓✓✓")
 
-        return log_entry
+    return log_entry
+
+
+def wait_uploads(futures):
+    """Attende gli upload messi in pipeline (gli errori sono già registrati nei log)"""
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"❌ Upload interrotto: {e}")
+
+
+def process_locale_group(locali, config, crypto, credentials_file, download_path=None, session_cache=None,
+                         browser_pool=None, date_ranges=None, checkpoints=None, fingerprints=None,
+                         contents=None, history=None, upload_pipeline=None, forget_state=None):
+    """
+    Processa un gruppo di locali che condividono lo stesso account iPratico
+
+    Il login (con PIN e navigazione ai report) avviene una sola volta per tutto il
+    gruppo; ogni locale viene poi selezionato, scaricato e caricato su Google Sheets.
+    In backfill ogni locale viene scaricato per ogni intervallo di date e caricato
+    nel foglio di quel giorno. I download con un checkpoint ancora da caricare
+    ripartono dall'upload del file salvato, senza aprire il browser.
+
+    Con upload_pipeline gli upload vengono eseguiti dai thread della pipeline
+    mentre lo scraper prosegue con il download successivo; la funzione termina
+    (e i LocaleLog sono completi) quando entrambe le fasi di ogni download sono finite.
+
+    Args:
+        locali: Locali (o snapshot) dello stesso account
+        config: ConfigManager del bot
+        crypto: CryptoManager per decifrare le credenziali
+        credentials_file: File delle credenziali Google
+        download_path: Directory base dei download (opzionale, ogni esecuzione usa una sottodirectory univoca)
+        session_cache: Cache cifrata delle sessioni iPratico (opzionale)
+        browser_pool: Pool di browser pre-avviati (opzionale)
+        date_ranges: Intervalli (data inizio, data fine) del backfill (default: solo ieri)
+        checkpoints: Checkpoint condivisi con il thread principale (vedi load_checkpoints), aggiornati in memoria
+        fingerprints: Impronte dei fogli per gli aggiornamenti incrementali (vedi load_fingerprints, opzionale)
+        contents: Hash dei contenuti per saltare gli upload invariati (vedi load_contents, opzionale)
+        history: Indici dei fogli storici (vedi load_history, opzionale)
+        upload_pipeline: Pipeline condivisa degli upload (opzionale, default: upload nel thread dello scraper)
+        forget_state: Funzione (chiave impronta, chiave contenuto) che elimina dal database lo stato
+            di un foglio prima di scriverlo (vedi forget_sheet_state, opzionale)
+
+    Returns:
+        Lista di LocaleLog (non ancora salvati), per locale e poi per intervallo
+    """
+    account = locali[0]
+
+    print("\n" + "="*60)
+    print(f"ACCOUNT: {account.username} - {len(locali)} locale/i")
+    for locale in locali:
+        print(f"  • {locale.nome} (selector: {locale.locale_selector or 'Default'})")
+    print("="*60)
+
+    # Un download per locale e intervallo, nello stesso ordine dei risultati di run_many
+    downloads = [(locale, date_range) for locale in locali for date_range in (date_ranges or [None])]
+    log_entries = [
+        LocaleLog(locale_id=locale.id, eseguito_at=datetime.utcnow(), successo=False)
+        for locale, _ in downloads
+    ]
+    # Tempi delle fasi: le fasi di sessione (browser, login, PIN) finiscono nel primo log
+    timer = StepTimer()
+    if checkpoints is None:
+        checkpoints = {}
+    download_keys = [checkpoint_key(locale.id, date_range) for locale, date_range in downloads]
+    for key in download_keys:
+        checkpoints.setdefault(key, new_checkpoint())
+
+    def upload_file(idx, artifact, resumed, steps):
+        """Fase 2: upload su Google Sheets (thread della pipeline o dello scraper)"""
+        locale, date_range = downloads[idx]
+        log_entry = log_entries[idx]
+        # Timer proprio: StepTimer non è condiviso tra thread, l'origine sì
+        upload_timer = StepTimer(origin=timer.origin)
+
+        try:
+            worksheet_name = get_worksheet_name(config, date_range)
+            fingerprint_key = (locale.google_sheet_id, worksheet_name)
+            content_key = (locale.id, locale.google_sheet_id, worksheet_name)
+            before_write = None
+            if forget_state is not None:
+                before_write = lambda: forget_state(
+                    fingerprint_key if fingerprints is not None else None,
+                    content_key if contents is not None else None
+                )
+            upload_locale(locale, artifact, log_entry, credentials_file,
+                          worksheet_name=worksheet_name, timer=upload_timer,
+                          checkpoint=checkpoints[download_keys[idx]],
+                          fingerprint=(fingerprints or {}).get(fingerprint_key),
+                          content=(contents or {}).get(content_key),
+                          history=(history or {}).get(locale.google_sheet_id),
+                          report_key=history_key(locale.id, date_range),
+                          history_config=config.get_google_sheets_config().get('history'),
+                          before_write=before_write)
+        except Exception as e:
+            log_entry.messaggio = f"Errore: {str(e)}"
+            print(f"\n❌ ERRORE: {e}")
+            import traceback
+            traceback.print_exc()
+
+        if resumed:
+            log_entry.messaggio += " (ripreso dal checkpoint, download saltato)"
+        finish_log(idx, steps + upload_timer.drain())
+
+    def finish_log(idx, steps):
+        date_range = downloads[idx][1]
+        log_entry = log_entries[idx]
+        if date_range:
+            log_entry.messaggio = f"[{get_worksheet_name(config, date_range)}] {log_entry.messaggio}"
+        log_entry.steps = [LocaleLogStep.from_record(record) for record in steps]
+
+    uploads = []
+
+    def handle_file(idx, artifact, resumed=False):
+        """Fine della fase 1 (download): il report passa all'upload"""
+        locale = downloads[idx][0]
+        log_entry = log_entries[idx]
+        steps = timer.drain()
+
+        if not artifact:
+            log_entry.messaggio = "Download fallito"
+            finish_log(idx, steps)
+            return
+
+        log_entry.file_scaricato = artifact.path
+        if not resumed:
+            print(f"\n✓ File scaricato per {locale.nome}: {artifact.path} ({artifact.format})")
+            try:
+                key = download_keys[idx]
+                mark_downloaded(checkpoints[key], artifact.path, checkpoint_file_name(key, artifact.path))
+            except OSError as e:
+                print(f"⚠ Checkpoint non salvato: {e}")
+
+        if upload_pipeline is None:
+            upload_file(idx, artifact, resumed, steps)
+        else:
+            # Attende solo se la coda degli upload è piena (backpressure)
+            uploads.append(upload_pipeline.submit(upload_file, idx, artifact, resumed, steps))
+
+    # Download già scaricati in un'esecuzione precedente: riparte dall'upload
+    da_scaricare = []
+    for idx, (locale, date_range) in enumerate(downloads):
+        checkpoint = checkpoints[download_keys[idx]]
+        restored = None
+        if is_resumable(checkpoint):
+            restored = restore_artifact(checkpoint)
+        if restored:
+            print(f"\n↻ {locale.nome}: file ripreso dal checkpoint ({checkpoint.stage}), download saltato")
+            handle_file(idx, ReportArtifact.open(restored), resumed=True)
+        else:
+            da_scaricare.append(idx)
+
+    if not da_scaricare:
+        wait_uploads(uploads)
+        return log_entries
+
+    try:
+        # Decifra le credenziali
+        password = crypto.decrypt(account.password_encrypted)
+        pin = crypto.decrypt(account.pin_encrypted) if account.pin_encrypted else '123456'
+
+        auth = LocaleAuthManager(account.username, password)
+
+        # Step 1: Download (una sola sessione per tutti i locali dell'account)
+        print(f"\n[STEP 1/2] DOWNLOAD DA iPRATICO")
+        print(f"Username: {account.username}")
+        print("-" * 60)
+
+        scraper = DashboardScraper(config, auth, download_path=download_path,
+                                   session_cache=session_cache, browser_pool=browser_pool, timer=timer)
+        richieste = []
+        for idx in da_scaricare:
+            locale, date_range = downloads[idx]
+            date_start, date_end = date_range or (None, None)
+            richieste.append((locale.locale_selector, date_start, date_end))
+        scraper.run_downloads(richieste, pin=pin,
+                              on_result=lambda n, artifact: handle_file(da_scaricare[n], artifact))
 
     except Exception as e:
-        log_entry.messaggio = f"Errore: {str(e)}"
         print(f"\n❌ ERRORE: {e}")
         import traceback
         traceback.print_exc()
-        return log_entry
+        for log_entry in log_entries:
+            if log_entry.messaggio is None:
+                log_entry.messaggio = f"Errore: {str(e)}"
+
+    # Il gruppo è concluso quando anche gli upload in pipeline sono terminati
+    wait_uploads(uploads)
+    return log_entries
+
+
+def process_locale(locale, config, crypto, credentials_file, download_path=None):
+    """
+    Processa un singolo locale
+
+    Args:
+        locale: Locale (o snapshot del locale) da processare
+        config: ConfigManager del bot
+        crypto: CryptoManager per decifrare le credenziali
+        credentials_file: File delle credenziali Google
+        download_path: Directory base dei download (opzionale, ogni esecuzione usa una sottodirectory univoca)
+
+    Returns:
+        LocaleLog con l'esito dell'esecuzione (non ancora salvato)
+    """
+    return process_locale_group([locale], config, crypto, credentials_file, download_path)[0]
+
+
+def prune_checkpoints(max_age_days=CHECKPOINT_RETENTION_DAYS):
+    """Elimina i checkpoint più vecchi di max_age_days (thread principale, con app context)"""
+    limite = datetime.utcnow() - timedelta(days=max_age_days)
+    vecchi = LocaleCheckpoint.query.filter(LocaleCheckpoint.updated_at < limite)
+    # File dei download mai caricati
+    for (file_name,) in vecchi.with_entities(LocaleCheckpoint.file_name):
+        if file_name:
+            remove_file(file_name)
+    eliminati = vecchi.delete(synchronize_session=False)
+    # File rimasti senza checkpoint (es. run interrotta prima del salvataggio sul database)
+    prune_files(max_age_days)
+    if eliminati:
+        print(f"🧹 Eliminati {eliminati} checkpoint più vecchi di {max_age_days} giorni")
+
+
+def parse_args():
+    """Legge gli argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(
+        description='Bot iPratico: download e upload su Google Sheets per tutti i locali attivi'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=get_workers_from_env(),
+        help='Numero di locali da processare in parallelo (default: BOT_WORKERS o 1)'
+    )
+    parser.add_argument(
+        '--min-free-mb',
+        type=float,
+        default=float(os.getenv('BOT_MIN_FREE_MB', DEFAULT_MB_PER_BROWSER)),
+        help=f'Memoria libera minima (MB) per avviare un altro browser '
+             f'(default: BOT_MIN_FREE_MB o {DEFAULT_MB_PER_BROWSER})'
+    )
+    parser.add_argument(
+        '--from',
+        dest='date_from',
+        type=date.fromisoformat,
+        help='Backfill: primo giorno da scaricare (YYYY-MM-DD), per tutti i locali attivi'
+    )
+    parser.add_argument(
+        '--to',
+        dest='date_to',
+        type=date.fromisoformat,
+        help='Backfill: ultimo giorno da scaricare (YYYY-MM-DD, default: ieri)'
+    )
+    parser.add_argument(
+        '--single-export',
+        action='store_true',
+        help="Backfill: richiede tutto l'intervallo con un solo export invece di un file per giorno"
+    )
+    args = parser.parse_args()
+
+    if args.date_to and not args.date_from:
+        parser.error('--to richiede --from')
+    if args.date_from:
+        args.date_to = args.date_to or get_report_date()
+        if args.date_from > args.date_to:
+            parser.error('--from deve precedere --to')
+
+    return args
 
 
 def main():
     """Esegue il processo completo per tutti i locali attivi"""
 
+    args = parse_args()
+
     # Ottieni l'ora corrente italiana
     italy_tz = pytz.timezone('Europe/Rome')
     now_italy = datetime.now(italy_tz)
@@ -219,9 +890,25 @@ def main():
 
     crypto = CryptoManager(encryption_key)
 
+    # Quote dell'API di Google Sheets condivise da tutti gli upload del processo
+    configure_rate_limits(config.get_google_sheets_config().get('rate_limit'))
+
+    # Cache cifrata delle sessioni iPratico: salta login e PIN finché la sessione è valida
+    cache_config = config.get_session_cache_config()
+    session_cache = None
+    if cache_config.get('enabled', False):
+        session_cache = SessionCache(crypto, encryption_key, max_age_hours=cache_config.get('max_age_hours', 8))
+
     # Controlla se è stata richiesta l'esecuzione di un locale specifico
     locale_id_richiesto = os.getenv('LOCALE_ID')
 
+    # Backfill: un download per ogni giorno (o uno solo per tutto l'intervallo) nella stessa sessione
+    date_ranges = None
+    if args.date_from:
+        date_ranges = build_date_ranges(args.date_from, args.date_to, args.single_export)
+        print(f"📅 BACKFILL dal {args.date_from.isoformat()} al {args.date_to.isoformat()} "
+              f"({len(date_ranges)} download per locale)\n")
+
     # Leggi i locali attivi dal database
     with app.app_context():
         if locale_id_richiesto:
@@ -254,8 +941,8 @@ def main():
         print(f"✓ Trovati {len(locali_attivi)} locali attivi nel database\n")
 
         # Filtra i locali che devono essere eseguiti ora
-        if locale_id_richiesto:
-            # Esecuzione manuale: esegui subito il locale richiesto
+        if locale_id_richiesto or date_ranges:
+            # Esecuzione manuale o backfill: esegui subito i locali richiesti
             locali_da_processare = locali_attivi
         else:
             # Esecuzione automatica: filtra in base all'orario
@@ -278,24 +965,123 @@ def main():
         print(f"✓ {len(locali_da_processare)} locale/i da processare alle {now_italy.strftime('%H:%M')}")
         print(f"{'='*60}\n")
 
-        # Processa ogni locale
-        risultati = []
-        for idx, locale in enumerate(locali_da_processare, 1):
+        # Processa i locali (in parallelo se richiesto, ognuno con la propria directory di download)
+        locali_per_id = {locale.id: locale for locale in locali_da_processare}
+        snapshots = [snapshot_locale(locale) for locale in locali_da_processare]
+        ordine = {snapshot.id: idx for idx, snapshot in enumerate(snapshots)}
+
+        # I locali dello stesso account condividono una sola sessione del browser
+        gruppi = group_locali_by_account(snapshots, crypto)
+        if len(gruppi) < len(snapshots):
+            print(f"🔑 {len(snapshots)} locali raggruppati in {len(gruppi)} sessioni (account condivisi)\n")
+
+        workers = min(args.workers, len(gruppi))
+        pool = BrowserWorkerPool(workers=workers, mb_per_browser=args.min_free_mb)
+
+        # Pool di browser: solo se ci sono sessioni da eseguire, un Chrome per worker avviato in
+        # background (con lo stesso controllo di memoria dei worker) mentre si leggono i checkpoint
+        pool_config = config.get_browser_pool_config()
+        browser_pool = None
+        if pool_config.get('enabled', False):
+            browser_pool = BrowserPool(config, size=workers, max_uses=pool_config.get('max_uses', 20),
+                                       can_admit=pool.can_admit)
+            browser_pool.start()
+            atexit.register(browser_pool.shutdown)
+
+        # Checkpoint dei download non ancora caricati (es. upload fallito nell'esecuzione precedente)
+        prune_checkpoints()
+        checkpoints = load_checkpoints(snapshots, date_ranges)
+        if checkpoints:
+            print(f"↻ {len(checkpoints)} download da riprendere dal checkpoint\n")
+
+        # Aggiornamenti incrementali: si riscrivono solo le righe cambiate dall'ultima run
+        fingerprints = None
+        if config.get_google_sheets_config().get('incremental_updates', False):
+            fingerprints = load_fingerprints(snapshots, config, date_ranges)
+
+        # Report identico all'ultimo upload: si aggiorna solo il timestamp
+        contents = None
+        if config.get_google_sheets_config().get('skip_unchanged', False):
+            contents = load_contents(snapshots, config, date_ranges)
+
+        # Impronta e hash di un foglio vengono eliminati dal database prima di scriverlo:
+        # una scrittura interrotta a metà non lascia uno stato che sembra valido
+        forget_state = None
+        if fingerprints is not None or contents is not None:
+            forget_state = lambda fingerprint_key, content_key: forget_sheet_state(app, fingerprint_key, content_key)
+
+        # Storico: ogni giorno viene anche accodato (o sostituito) nei fogli storici
+        history = None
+        if config.get_google_sheets_config().get('history', {}).get('enabled', False):
+            history = load_history(snapshots)
+
+        if workers > 1:
+            print(f"⚙️  Esecuzione parallela con {workers} worker "
+                  f"(min {args.min_free_mb:.0f} MB liberi per browser)\n")
+
+        def run_job(job):
+            idx, gruppo = job
             print(f"\n{'='*60}")
-            print(f"LOCALE {idx}/{len(locali_da_processare)}")
+            print(f"SESSIONE {idx}/{len(gruppi)}")
             print(f"{'='*60}")
-
-            log_entry = process_locale(locale, config, crypto, credentials_file)
-            db.session.add(log_entry)
-
-            # Resetta il flag esegui_ora dopo l'esecuzione
-            if locale.esegui_ora:
-                locale.esegui_ora = False
-                print(f"  ✓ Flag esecuzione manuale resettato")
-
+            return process_locale_group(gruppo, config, crypto, credentials_file,
+                                        session_cache=session_cache, browser_pool=browser_pool,
+                                        date_ranges=date_ranges, checkpoints=checkpoints,
+                                        fingerprints=fingerprints, contents=contents, history=history,
+                                        upload_pipeline=upload_pipeline, forget_state=forget_state)
+
+        # Pipeline: gli upload su Google Sheets procedono mentre lo scraper scarica il locale successivo
+        pipeline_config = config.get_pipeline_config()
+        upload_pipeline = None
+        if pipeline_config.get('enabled', False):
+            upload_pipeline = UploadPipeline(
+                workers=pipeline_config.get('upload_workers', 2),
+                max_pending=pipeline_config.get('max_pending', 4)
+            )
+            upload_pipeline.start()
+            print(f"⚙️  Pipeline upload con {upload_pipeline.workers} thread\n")
+
+        # I risultati vengono salvati dal thread principale man mano che le sessioni terminano
+        risultati = []
+        fasi = []
+        for (_, gruppo), log_entries in pool.run(run_job, enumerate(gruppi, 1)):
+            # In backfill ogni locale ha un log per ogni intervallo di date
+            per_locale = len(log_entries) // len(gruppo)
+            for i, snapshot in enumerate(gruppo):
+                locale = locali_per_id[snapshot.id]
+                locale_logs = log_entries[i * per_locale:(i + 1) * per_locale]
+                db.session.add_all(locale_logs)
+
+                # Resetta il flag esegui_ora dopo l'esecuzione
+                if locale.esegui_ora:
+                    locale.esegui_ora = False
+                    print(f"  ✓ Flag esecuzione manuale resettato ({snapshot.nome})")
+
+                nome = snapshot.nome
+                if date_ranges:
+                    nome += f" ({sum(1 for log in locale_logs if log.successo)}/{len(locale_logs)} intervalli)"
+                fasi_locale = [step.to_dict() for log in locale_logs for step in log.steps]
+                if fasi_locale:
+                    nome += f" - {sum(step['durata_s'] for step in fasi_locale):.1f}s"
+                fasi.extend(fasi_locale)
+                risultati.append((ordine[snapshot.id], nome, all(log.successo for log in locale_logs)))
+
+            save_checkpoints(checkpoints, [
+                checkpoint_key(snapshot.id, date_range)
+                for snapshot in gruppo for date_range in (date_ranges or [None])
+            ])
+            if fingerprints is not None:
+                save_fingerprints(fingerprints, fingerprint_keys(gruppo, config, date_ranges))
+            if contents is not None:
+                save_contents(contents, content_keys(gruppo, config, date_ranges))
+            if history is not None:
+                save_history(history, [locale.google_sheet_id for locale in gruppo])
             db.session.commit()
 
-            risultati.append((locale.nome, log_entry.successo))
+        if upload_pipeline is not None:
+            upload_pipeline.shutdown()
+
+        risultati = [(nome, success) for _, nome, success in sorted(risultati)]
 
         # Riepilogo finale
         print("\n\n" + "="*60)
@@ -310,6 +1096,12 @@ def main():
             print(f"{status} {nome}")
 
         print(f"\nTotale: {successi} successi, {fallimenti} fallimenti")
+
+        # Tempi per fase (aggregati su tutti i locali)
+        print_steps_summary(fasi)
+        print_rate_limit_summary()
+        if upload_pipeline is not None:
+            upload_pipeline.print_summary()
         print("="*60 + "\n")
 
         # Exit code